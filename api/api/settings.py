@@ -23,14 +23,27 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'CHANGE ME')
 
+# Run mode, `development` or `production`. Production turns debug off, keeps
+# database connections open and serves the app with gunicorn (see entrypoint.sh).
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development')
+PRODUCTION = DJANGO_ENV == 'production'
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '0' if PRODUCTION else '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 AUTH_USER_MODEL = 'user.User'
 
 CART_SESSION_ID = os.environ.get('CART_SESSION_ID', 'cart')
+COUPON_SESSION_ID = os.environ.get('COUPON_SESSION_ID', 'coupon')
+
+CART_STORAGE = os.environ.get('CART_STORAGE', 'cart.storage.SessionCartStorage')
+
+INVENTORY_SHARDS = int(os.environ.get('INVENTORY_SHARDS', 8))
+
+# Serve the product list and detail and the cart detail from async views, for ASGI servers.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
 
 # Application definition
 
@@ -50,9 +63,12 @@ INSTALLED_APPS = [
     'shop',
     'user',
     'cart',
+    'orders',
+    'coupons',
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +76,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.replica_pin_middleware',
 ]
 
 ROOT_URLCONF = 'api.urls'
@@ -94,9 +111,82 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': 5432,
+        # ASGI requests run their queries in a thread of their own, whose
+        # connection cannot be reused, so they are only kept open under WSGI.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60 if PRODUCTION and not ASYNC_VIEWS else 0)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+    }
+}
+
+# Read replica of the primary, used for catalogue reads when REPLICA_DATABASE
+# names it. In tests it mirrors the default test database.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': os.environ.get('DB_REPLICA_HOST') or DATABASES['default']['HOST'],
+    'PORT': int(os.environ.get('DB_REPLICA_PORT', 5432)),
+    'CONN_MAX_AGE': int(os.environ.get('DB_REPLICA_CONN_MAX_AGE', DATABASES['default']['CONN_MAX_AGE'])),
+    'TEST': {'MIRROR': 'default'},
+}
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+REPLICA_DATABASE = os.environ.get('REPLICA_DATABASE', 'replica' if os.environ.get('DB_REPLICA_HOST') else '')
+# Clients are kept on the primary this long after a write, to read their own writes.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_COOKIE = os.environ.get('REPLICA_PIN_COOKIE', 'pin_primary')
+# Responses read from the replica may lag behind the generation they are
+# cached under, so they are cached this long at most.
+REPLICA_CACHE_TIMEOUT = int(os.environ.get('REPLICA_CACHE_TIMEOUT', 30))
+
+# Per-request timings and query counts, see core.instrumentation. Requests over
+# a budget are logged as warnings.
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '1') == '1'
+INSTRUMENTATION_SERVER_TIMING = os.environ.get('INSTRUMENTATION_SERVER_TIMING', '1') == '1'
+INSTRUMENTATION_QUERY_BUDGET = int(os.environ.get('INSTRUMENTATION_QUERY_BUDGET', 30))
+INSTRUMENTATION_TIME_BUDGET = int(os.environ.get('INSTRUMENTATION_TIME_BUDGET', 500))
+
+# Prometheus histograms of the shop, cart and user routes served at /metrics,
+# see core.metrics. With several worker processes METRICS_DIR must be set to a
+# directory shared by all of them, emptied before the workers start. The gunicorn
+# config merges the files of exited workers into one.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('INSTRUMENTATION_LOG_LEVEL', 'INFO' if PRODUCTION else 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+TOKEN_CACHE_TIMEOUT = int(os.environ.get('TOKEN_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -135,8 +225,14 @@ USE_TZ = True
 STATIC_URL = 'static/static/'
 MEDIA_URL = 'static/media/'
 
-STATIC_ROOT = 'vol/web/static'
-MEDIA_ROOT = 'vol/web/media'
+STATIC_ROOT = os.environ.get('STATIC_ROOT', 'vol/web/static')
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', 'vol/web/media')
+
+if PRODUCTION:
+    # Hashed file names, so the proxy can let clients cache them for good.
+    STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+    # The proxy in front of the app terminates the client connection.
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
@@ -147,6 +243,27 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Render the product list and detail from `values()` rows rather than
+# serializers, see shop.rows.
+FAST_PRODUCT_READS = os.environ.get('FAST_PRODUCT_READS', '1') == '1'
+
+# Render and parse JSON with orjson when it is installed, see core.fastjson.
+if os.environ.get('FAST_JSON', '1') == '1':
+    REST_FRAMEWORK.update({
+        'DEFAULT_RENDERER_CLASSES': [
+            'core.fastjson.FastJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer',
+        ],
+        'DEFAULT_PARSER_CLASSES': [
+            'core.fastjson.FastJSONParser',
+            'rest_framework.parsers.FormParser',
+            'rest_framework.parsers.MultiPartParser',
+        ],
+    })
+
+PAGINATION_PAGE_SIZE = int(os.environ.get('PAGINATION_PAGE_SIZE', 50))
+PAGINATION_MAX_PAGE_SIZE = int(os.environ.get('PAGINATION_MAX_PAGE_SIZE', 500))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Sync WSGI against ASGI serving at high concurrency with a slow database.
+
+    python -m benchmarks.asgi [--requests 2000] [--workers 8] [--concurrency 200] [--latency 50]
+
+Sends a mix of product list, product detail and cart detail requests through
+the real Django handlers: the WSGI application with `--workers` threads, like
+a threaded WSGI server, and the ASGI application with `--concurrency` requests
+in flight, serving the async views. Every query sleeps `--latency` ms to
+simulate a remote database. The response cache is disabled so every request
+queries the database.
+
+On Django 4.1 the async ORM still runs each query in a thread, and the stock
+middleware and every query hop between the event loop and a per-request
+thread, which opens its own database connection. ASGI gains from not tying a
+worker to every waiting request, so it only pays off once the database is slow
+enough for the WSGI workers to spend most of their time waiting.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import utils
+
+def slow_database(latency):
+    """Make every query on every connection sleep `latency` seconds first."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def execute(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def add_wrapper(connection, **kwargs):
+        connection.execute_wrappers.append(execute)
+
+    connection_created.connect(add_wrapper, weak=False)
+    for connection in connections.all():
+        add_wrapper(connection)
+
+def async_urlconf():
+    """Return a urlconf serving the async catalogue and cart views."""
+    from types import ModuleType
+
+    from django.test import override_settings
+    from django.urls import include, path
+    from rest_framework import routers
+
+    from cart.views import cart_detail_async
+    from shop import views
+
+    with override_settings(ASYNC_VIEWS=True):
+        router = routers.DefaultRouter()
+        router.register('products', views.ProductViewSet)
+        router.register('categories', views.CategoryViewSet)
+        routes = router.urls
+
+    urlconf = ModuleType('benchmarks.asgi_urls')
+    urlconf.urlpatterns = [
+        path('api/shop/', include((routes, 'shop'))),
+        path('api/cart/', cart_detail_async),
+        path('', include('api.urls')),
+    ]
+    return urlconf
+
+def create_data():
+    """Create the catalogue and a session cart, returning the urls and the session cookie."""
+    from decimal import Decimal
+
+    from django.conf import settings
+    from django.contrib.sessions.backends.db import SessionStore
+
+    from shop.models import Category, Product
+
+    category = Category.objects.create(name='benchmark', slug='benchmark')
+    products = Product.objects.bulk_create([
+        Product(category=category, name=f'product {i:04d}', slug=f'product-{i:04d}', price=Decimal('9.99'))
+        for i in range(200)
+    ])
+
+    session = SessionStore()
+    session[settings.CART_SESSION_ID] = {str(product.id): {'quantity': 1, 'price': '9.99'} for product in products[:10]}
+    session.create()
+
+    urls = ['/api/shop/products/', '/api/shop/products/?page_size=20&ordering=-price', '/api/cart/']
+    urls += [f'/api/shop/products/{product.slug}/' for product in products[:20]]
+    return urls, f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+def run_wsgi(urls, cookie, requests, workers):
+    from django.core.handlers.wsgi import WSGIHandler
+
+    application = WSGIHandler()
+
+    def request(url):
+        path, _, query = url.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_COOKIE': cookie,
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = application(environ, lambda status, headers: statuses.append(status))
+        b''.join(response)
+        response.close()
+        elapsed = time.perf_counter() - start
+        assert statuses[0].startswith('200'), (url, statuses[0])
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        timings = list(executor.map(request, itertools.islice(itertools.cycle(urls), requests)))
+    return timings, time.perf_counter() - started
+
+def run_asgi(urls, cookie, requests, concurrency):
+    from django.core.handlers.asgi import ASGIHandler
+
+    application = ASGIHandler()
+
+    async def request(url):
+        path, _, query = url.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        start = time.perf_counter()
+        await application(scope, receive, send)
+        elapsed = time.perf_counter() - start
+        assert messages[0]['status'] == 200, (url, messages[0]['status'])
+        return elapsed
+
+    async def serve():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(url):
+            async with semaphore:
+                return await request(url)
+
+        return await asyncio.gather(*(limited(url) for url in itertools.islice(itertools.cycle(urls), requests)))
+
+    started = time.perf_counter()
+    timings = asyncio.run(serve())
+    return timings, time.perf_counter() - started
+
+def run(requests, workers, concurrency, latency):
+    from django.db import connection
+    from django.test import override_settings
+
+    urls, cookie = create_data()
+    slow_database(latency / 1000)
+
+    results = {}
+    with override_settings(RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=['testserver']):
+        timings, elapsed = run_wsgi(urls, cookie, requests, workers)
+        results['wsgi'] = {'workers': workers, 'requests_per_second': round(requests / elapsed, 1), **utils.summarize(timings)}
+
+        with override_settings(ROOT_URLCONF=async_urlconf()):
+            timings, elapsed = run_asgi(urls, cookie, requests, concurrency)
+        results['asgi'] = {'concurrency': concurrency, 'requests_per_second': round(requests / elapsed, 1), **utils.summarize(timings)}
+
+    results['speedup'] = round(results['asgi']['requests_per_second'] / results['wsgi']['requests_per_second'], 2)
+    results['latency_ms'] = latency
+    results['vendor'] = connection.vendor
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=50)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.requests, args.workers, args.concurrency, args.latency)
+    utils.report('asgi', results)
+
+if __name__ == '__main__':
+    main()
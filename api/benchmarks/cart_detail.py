@@ -0,0 +1,74 @@
+"""
+Cart detail latency against cart size.
+
+    python -m benchmarks.cart_detail [--repeat 100] [--storage cart.storage.SessionCartStorage]
+
+Reports `GET /api/cart/` latency and query count for carts of 1, 20 and 200
+products, with the details cache disabled (every request renders the cart)
+and enabled (repeated requests for an unchanged cart).
+"""
+import argparse
+
+from benchmarks import utils
+
+SIZES = (1, 20, 200)
+
+def fill_cart(client, products):
+    """Add every product to the cart through the batch endpoint."""
+    from django.urls import reverse
+
+    operations = [{'op': 'add', 'product_id': product.id, 'quantity': 1} for product in products]
+    for start in range(0, len(operations), 100):
+        response = client.post(reverse('cart:cart_batch'), {'operations': operations[start:start + 100]}, format='json')
+        assert response.status_code == 200, response.data
+
+def run(repeat, storage):
+    from decimal import Decimal
+
+    from django.core.cache import cache
+    from django.test import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from shop.models import Category, Product
+
+    category = Category.objects.create(name='benchmark', slug='benchmark')
+    products = Product.objects.bulk_create([
+        Product(category=category, name=f'product {i:04d}', slug=f'product-{i:04d}', price=Decimal('9.99'))
+        for i in range(max(SIZES))
+    ])
+
+    results = []
+    with override_settings(CART_STORAGE=storage):
+        for size in SIZES:
+            client = APIClient()
+            fill_cart(client, products[:size])
+            url = reverse('cart:cart_detail')
+
+            for cached in (False, True):
+                cache.clear()
+                with override_settings(RESPONSE_CACHE_ENABLED=cached):
+                    request = lambda: client.get(url)
+                    timings = utils.measure(request, repeat=repeat)
+                    results.append({
+                        'cart_size': size,
+                        'cached': cached,
+                        'queries': utils.count_queries(request),
+                        **timings,
+                    })
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--storage', default='cart.storage.SessionCartStorage')
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.repeat, args.storage)
+    utils.report('cart_detail', results)
+
+if __name__ == '__main__':
+    main()
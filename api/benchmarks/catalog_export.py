@@ -0,0 +1,71 @@
+"""
+Memory and throughput of the streaming catalogue export.
+
+    python -m benchmarks.catalog_export [--products 10000 100000]
+
+For each catalogue size, streams the CSV export through the API and reports
+the rows per second and the peak Python memory traced while streaming. The
+peak should stay flat as the catalogue grows.
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks import utils
+
+def seed(products, batch_size=5000):
+    from decimal import Decimal
+
+    from shop.models import Category, Product
+
+    Product.objects.all().delete()
+    category, _ = Category.objects.get_or_create(name='shirts', slug='shirts')
+    for start in range(0, products, batch_size):
+        Product.objects.bulk_create([
+            Product(category=category, name=f'shirt {i}', slug=f'shirt-{i}', description=f'Shirt number {i}.', price=Decimal(i % 1000))
+            for i in range(start, min(start + batch_size, products))
+        ])
+
+def run(sizes):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='benchmark')
+    client = APIClient()
+    client.force_authenticate(admin)
+    url = reverse('shop:product-export', args=['csv'])
+
+    results = []
+    for products in sizes:
+        seed(products)
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.get(url)
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append({
+            'products': products,
+            'bytes': size,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(products / elapsed),
+            'peak_memory_kib': round(peak / 1024),
+        })
+
+    return {'vendor': connection.vendor, 'runs': results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.products)
+    utils.report('catalog_export', results)
+
+if __name__ == '__main__':
+    main()
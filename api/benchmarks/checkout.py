@@ -0,0 +1,111 @@
+"""
+Checkout throughput with contended stock.
+
+    python -m benchmarks.checkout [--orders 2000] [--threads 8] [--products 5] [--shards 0]
+
+Places `--orders` single-line orders from `--threads` threads over a few hot
+products whose stock covers only part of the demand, then reports orders per
+second, the checkout latency and whether any product was oversold. With
+`--shards`, the stock of each product is spread over that many rows. SQLite
+serializes writers, so it runs with one thread and is reported for reference.
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks import utils
+
+class StaticCart:
+    def __init__(self, items):
+        self.items = items
+
+    def clear(self):
+        self.items = {}
+
+    def save(self):
+        pass
+
+def run(orders, threads, products, shards=0):
+    from decimal import Decimal
+
+    from django.db import connection, connections
+
+    from orders.checkout import CheckoutError, place_order
+    from orders.models import OrderItem
+    from shop import inventory
+    from shop.models import Category, Product
+
+    if connection.vendor == 'sqlite':
+        threads = 1
+    category, _ = Category.objects.get_or_create(slug='hot', defaults={'name': 'hot'})
+    stock = orders // products // 2
+    hot = Product.objects.bulk_create([
+        Product(category=category, name=f'hot {shards} {i}', slug=f'hot-{shards}-{i}', price=Decimal('10.00'), stock=stock)
+        for i in range(products)
+    ])
+    if shards:
+        for product in hot:
+            inventory.rebalance(product, shards)
+
+    timings, outcomes = [], {'placed': 0, 'rejected': 0}
+    lock = threading.Lock()
+
+    def worker(count, seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(count):
+                product = rng.choice(hot)
+                start = time.perf_counter()
+                try:
+                    place_order(StaticCart({product.id: {'quantity': 1, 'price': product.price}}))
+                    outcome = 'placed'
+                except CheckoutError:
+                    outcome = 'rejected'
+                elapsed = time.perf_counter() - start
+                with lock:
+                    timings.append(elapsed)
+                    outcomes[outcome] += 1
+        finally:
+            if threads > 1:
+                connections.close_all()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(orders // threads, i)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    oversold = [
+        product.slug for product in inventory.with_stock(Product.objects.filter(pk__in=[product.pk for product in hot]))
+        if OrderItem.objects.filter(product=product).count() + product.total_stock != stock
+    ]
+    return {
+        'vendor': connection.vendor,
+        'threads': threads,
+        'products': products,
+        'shards': shards,
+        'stock_per_product': stock,
+        **outcomes,
+        'orders_per_second': round(len(timings) / elapsed),
+        'latency': utils.summarize(timings),
+        'oversold': oversold,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--products', type=int, default=5)
+    parser.add_argument('--shards', type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.orders, args.threads, args.products, args.shards)
+    utils.report('checkout', results)
+
+if __name__ == '__main__':
+    main()
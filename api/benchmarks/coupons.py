@@ -0,0 +1,79 @@
+"""
+Coupon rule evaluation.
+
+    python -m benchmarks.coupons [--coupons 1000] [--items 50] [--repeat 50]
+
+Creates `--coupons` coupons mixing percentage and fixed amounts, category
+scopes and minimum totals, then reports the time to compile them all (one
+query), to evaluate every one of them against a cart of `--items` lines, and
+the queries made by a lookup once compiled.
+"""
+import argparse
+
+from benchmarks import utils
+
+def run(coupons, items, repeat):
+    from decimal import Decimal
+
+    from django.core.cache import cache
+    from django.db import connection
+
+    from coupons import rules
+    from coupons.models import Coupon
+    from shop.models import Category, Product
+
+    categories = Category.objects.bulk_create([Category(name=f'category {i}', slug=f'category-{i}') for i in range(10)])
+    products = Product.objects.bulk_create([
+        Product(category=categories[i % len(categories)], name=f'product {i:04d}', slug=f'product-{i:04d}', price=Decimal('9.99'))
+        for i in range(items)
+    ])
+    Coupon.objects.bulk_create([
+        Coupon(
+            code=f'CODE{i:05d}',
+            kind=Coupon.PERCENTAGE if i % 2 else Coupon.FIXED,
+            value=Decimal(5 + i % 20),
+            category=categories[i % len(categories)] if i % 3 == 0 else None,
+            min_total=Decimal(i % 7 * 50),
+            usage_limit=100 if i % 5 == 0 else None,
+        )
+        for i in range(coupons)
+    ])
+    lines = [(product.category_id, product.price * (1 + i % 3)) for i, product in enumerate(products)]
+
+    compiled = list(rules.compile_coupons().values())
+
+    def evaluate():
+        # Summing the cart once is part of the work, every coupon then reads its totals.
+        cart = rules.CartTotals(lines)
+        for coupon in compiled:
+            if coupon.check(cart) is None:
+                coupon.discount(cart)
+
+    cache.clear()
+    rules.registry.clear()
+    rules.get_coupon('CODE00000')
+    evaluation = utils.measure(evaluate, repeat=repeat)
+    return {
+        'vendor': connection.vendor,
+        'coupons': len(compiled),
+        'cart_items': len(lines),
+        'compile': {'queries': utils.count_queries(rules.compile_coupons), **utils.measure(rules.compile_coupons, repeat=max(1, repeat // 5), warmup=1)},
+        'evaluate_all': evaluation,
+        'per_coupon_us': round(evaluation['mean_ms'] * 1000 / len(compiled), 2),
+        'lookup_queries': utils.count_queries(lambda: rules.get_coupon('CODE00001')),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coupons', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.coupons, args.items, args.repeat)
+    utils.report('coupons', results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Checkout throughput on a single hot product, single-row against sharded stock.
+
+    python -m benchmarks.hot_sku [--orders 2000] [--threads 16] [--shards 8]
+
+Runs the checkout benchmark twice on one product, first with its stock in the
+product row, where every checkout queues on the same row lock, then spread
+over `--shards` rows, and reports both runs and the throughput ratio. SQLite locks the whole database for writes, so it runs
+with one thread and shows only the overhead of the sharded path.
+"""
+import argparse
+
+from benchmarks import checkout, utils
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--shards', type=int, default=8)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = {
+            mode: checkout.run(args.orders, args.threads, 1, shards)
+            for mode, shards in (('single_row', 0), ('sharded', args.shards))
+        }
+    results['speedup'] = round(results['sharded']['orders_per_second'] / results['single_row']['orders_per_second'], 2)
+    utils.report('hot_sku', results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Throughput of the `import_catalog` command.
+
+    python -m benchmarks.import_catalog [--rows 100000] [--batch-size 2000]
+
+Writes a synthetic CSV catalogue, imports it into an empty database and then
+imports it again, so both the insert and the update path of the upsert are
+reported in rows per second.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+
+from benchmarks import utils
+
+NOUNS = ['shirt', 'jacket', 'trousers', 'dress', 'skirt', 'coat', 'sweater', 'shoe', 'boot', 'scarf']
+
+def write_catalogue(path, rows):
+    rng = random.Random(0)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'slug', 'category', 'price', 'available', 'description'])
+        for i in range(rows):
+            noun = rng.choice(NOUNS)
+            writer.writerow([f'{noun} {i}', f'product-{i}', noun, f'{rng.randint(100, 20000) / 100:.2f}', rng.random() > 0.1, f'A {noun}.'])
+
+def run(rows, batch_size):
+    from django.core.management import call_command
+    from django.db import connection
+
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_catalogue(path, rows)
+        results = {'vendor': connection.vendor, 'rows': rows, 'batch_size': batch_size}
+        for run in ('insert', 'update'):
+            start = time.perf_counter()
+            call_command('import_catalog', path, batch_size=batch_size, stdout=io.StringIO())
+            elapsed = time.perf_counter() - start
+            results[run] = {'seconds': round(elapsed, 3), 'rows_per_second': round(rows / elapsed)}
+    finally:
+        os.remove(path)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.rows, args.batch_size)
+    utils.report('import_catalog', results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Overhead of the request instrumentation middleware.
+
+    python -m benchmarks.instrumentation [--repeat 500]
+
+Reports the median latency of the product list, a product detail and the cart
+detail with `INSTRUMENTATION_ENABLED` off and on, over rounds alternating the
+two, and the time added per request. The response cache is disabled so every
+request queries the database.
+"""
+import argparse
+import statistics
+
+from benchmarks import utils
+
+def run(repeat, rounds=10):
+    from decimal import Decimal
+
+    from django.test import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from shop.models import Category, Product
+
+    category = Category.objects.create(name='benchmark', slug='benchmark')
+    products = Product.objects.bulk_create([
+        Product(category=category, name=f'product {i:04d}', slug=f'product-{i:04d}', price=Decimal('9.99'))
+        for i in range(100)
+    ])
+    client = APIClient()
+    for product in products[:10]:
+        client.post(reverse('cart:cart_add'), {'product_id': product.id, 'quantity': 1})
+
+    urls = {
+        'product_list': reverse('shop:product-list'),
+        'product_detail': reverse('shop:product-detail', args=[products[0].slug]),
+        'cart_detail': reverse('cart:cart_detail'),
+    }
+
+    results = []
+    for name, url in urls.items():
+        timings = {False: [], True: []}
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            # Alternate the two modes so drift affects both alike.
+            for _ in range(rounds):
+                for enabled in (False, True):
+                    with override_settings(INSTRUMENTATION_ENABLED=enabled):
+                        timings[enabled].append(utils.measure(lambda: client.get(url), repeat=max(1, repeat // rounds))['p50_ms'])
+        off, on = statistics.median(timings[False]), statistics.median(timings[True])
+        results.append({
+            'endpoint': name,
+            'off_p50_ms': off,
+            'on_p50_ms': on,
+            'overhead_ms': round(on - off, 3),
+            'overhead_percent': round((on / off - 1) * 100, 1),
+        })
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.repeat)
+    utils.report('instrumentation', results)
+
+if __name__ == '__main__':
+    main()
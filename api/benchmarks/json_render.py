@@ -0,0 +1,76 @@
+"""
+JSON rendering and parsing of product lists.
+
+    python -m benchmarks.json_render [--products 10000] [--repeat 20]
+
+Serializes `--products` products of the `seed_catalog` catalogue, with image
+variants, with `ProductSerializer` once, then reports the time DRF's
+`JSONRenderer` and `core.fastjson.FastJSONRenderer` take to render the rows
+and the time the matching parsers take to parse them back, with orjson and
+with the stdlib fallback. The renderers are checked to give the same bytes.
+"""
+import argparse
+import io
+from unittest.mock import patch
+
+from benchmarks import utils
+
+def run(products, repeat):
+    from django.core.management import call_command
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+
+    from core import fastjson
+    from shop.models import Product
+    from shop.serializers import ProductSerializer
+
+    call_command('seed_catalog', products=products, categories=20, stdout=io.StringIO())
+    Product.objects.update(
+        image='products/01/10/2022/product.jpg',
+        image_variants={
+            variant: {'webp': f'products/01/10/2022/product_{variant}.webp', 'jpeg': f'products/01/10/2022/product_{variant}.jpg'}
+            for variant in ('thumbnail', 'medium', 'full')
+        },
+    )
+    request = APIRequestFactory().get('/api/shop/products/')
+    data = ProductSerializer(Product.objects.select_related('category'), many=True, context={'request': request}).data
+    content = JSONRenderer().render(data)
+    assert fastjson.FastJSONRenderer().render(data) == content
+
+    cases = [
+        ('drf', JSONRenderer(), JSONParser(), fastjson.orjson),
+        ('fast', fastjson.FastJSONRenderer(), fastjson.FastJSONParser(), fastjson.orjson),
+        ('fast without orjson', fastjson.FastJSONRenderer(), fastjson.FastJSONParser(), None),
+    ]
+    results = []
+    for name, renderer, parser, orjson in cases:
+        with patch.object(fastjson, 'orjson', orjson):
+            render = utils.measure(lambda: renderer.render(data), repeat=repeat, warmup=2)
+            parse = utils.measure(lambda: parser.parse(io.BytesIO(content)), repeat=repeat, warmup=2)
+        results.append({
+            'renderer': name,
+            'rows': len(data),
+            'bytes': len(content),
+            'render_p50_ms': render['p50_ms'],
+            'parse_p50_ms': parse['p50_ms'],
+        })
+
+    for result in results:
+        result['render_speedup'] = round(results[0]['render_p50_ms'] / result['render_p50_ms'], 2)
+        result['parse_speedup'] = round(results[0]['parse_p50_ms'] / result['parse_p50_ms'], 2)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.products, args.repeat)
+    utils.report('json_render', results)
+
+if __name__ == '__main__':
+    main()
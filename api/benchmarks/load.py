@@ -0,0 +1,239 @@
+"""
+Load test of scripted API scenarios against a server.
+
+    python -m benchmarks.load [--url http://127.0.0.1:8000] [--iterations 50] [--concurrency 1]
+                              [--scenario browse --scenario cart ...] [--products 1000] [--categories 20]
+
+Without `--url`, a server is started in this process on a throwaway test
+database seeded with `seed_catalog --products N --categories M`, so runs are
+reproducible without any network access. With `--url`, the scenarios run
+against that server, which should have been seeded the same way first:
+
+    python manage.py seed_catalog --products 1000 --categories 20
+
+Each of the `--concurrency` clients runs every scenario `--iterations` times:
+
+* browse: the first `--pages` product list pages, following the next links
+* product_detail: the products of the first list page, by slug
+* cart: add a product, get the cart and remove the product
+* login: get an authentication token
+
+and each scenario reports its p50/p95/p99 latency, its throughput in requests
+per second and the mean queries per request, read from the `Server-Timing`
+header of the instrumentation middleware (null when the server does not send
+it).
+"""
+import argparse
+import http.client
+import json
+import re
+import statistics
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from benchmarks import utils
+
+PASSWORD = 'benchmark-password'
+
+class Client:
+    """
+    HTTP client keeping the cookies of a session. Every request opens a new
+    connection, as the development server writes the headers and the body of
+    a response separately, which delayed ACKs stall by 40 ms on a kept-alive
+    connection.
+    """
+    QUERIES = re.compile(r'(?:^|,)\s*db;[^,]*desc="(\d+) queries"')
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.cookies = {}
+        self.timings = []
+        self.queries = []
+        self.errors = 0
+
+    def request(self, method, path, data=None):
+        """Send a request, record its latency and query count and return the status and JSON body."""
+        headers = {'Accept': 'application/json', 'Connection': 'close'}
+        body = None
+        if data is not None:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if path.startswith('http'):
+            path = urlsplit(path)._replace(scheme='', netloc='').geturl()
+        else:
+            path = self.prefix + path
+
+        start = time.perf_counter()
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            content = response.read()
+        finally:
+            connection.close()
+        self.timings.append(time.perf_counter() - start)
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        match = self.QUERIES.search(response.headers.get('Server-Timing', ''))
+        if match is not None:
+            self.queries.append(int(match.group(1)))
+        if response.status >= 400:
+            self.errors += 1
+
+        is_json = response.headers.get('Content-Type', '').startswith('application/json')
+        return response.status, json.loads(content) if is_json else None
+
+def browse(client, context):
+    """Get the first list pages, following the next links."""
+    url = '/api/shop/products/'
+    for _ in range(context['pages']):
+        status, data = client.request('GET', url)
+        if status != 200 or not data.get('next'):
+            break
+        url = data['next']
+
+def product_detail(client, context):
+    """Get the products of the first list page."""
+    for slug in context['slugs']:
+        client.request('GET', f'/api/shop/products/{slug}/')
+
+def cart(client, context):
+    """Add, get and remove a few products of the cart."""
+    for product_id in context['product_ids'][:5]:
+        client.request('POST', '/api/cart/add/', {'product_id': product_id, 'quantity': 1})
+        client.request('GET', '/api/cart/')
+        client.request('DELETE', f'/api/cart/remove/{product_id}/')
+
+def login(client, context):
+    """Get an authentication token."""
+    client.request('POST', '/api/user/token/', {'email': context['email'], 'password': PASSWORD})
+
+SCENARIOS = {
+    'browse': browse,
+    'product_detail': product_detail,
+    'cart': cart,
+    'login': login,
+}
+
+def prepare(url, pages):
+    """Read the products the scenarios use and create the login user."""
+    client = Client(url)
+    status, data = client.request('GET', '/api/shop/products/')
+    if status != 200 or not data.get('results'):
+        raise SystemExit(f'{url} has no products, seed it with `manage.py seed_catalog` first.')
+
+    email = 'load-test@example.com'
+    client.request('POST', '/api/user/create/', {'email': email, 'password': PASSWORD, 'first_name': 'Load', 'last_name': 'Test'})
+    status, _ = client.request('POST', '/api/user/token/', {'email': email, 'password': PASSWORD})
+    if status != 200:
+        raise SystemExit(f'Could not log in as {email}.')
+
+    return {
+        'pages': pages,
+        'slugs': [product['slug'] for product in data['results'][:10]],
+        'product_ids': [product['id'] for product in data['results'] if product['available']],
+        'email': email,
+    }
+
+def run_scenario(url, scenario, context, iterations, concurrency):
+    """Run `scenario` `iterations` times on each of `concurrency` clients in parallel."""
+    clients = [Client(url) for _ in range(concurrency)]
+
+    def loop(client):
+        for _ in range(iterations):
+            scenario(client, context)
+
+    threads = [threading.Thread(target=loop, args=(client,)) for client in clients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    timings = [timing for client in clients for timing in client.timings]
+    queries = [count for client in clients for count in client.queries]
+    return {
+        'requests': len(timings),
+        'errors': sum(client.errors for client in clients),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        'queries_per_request': round(statistics.mean(queries), 2) if queries else None,
+        **utils.summarize(timings),
+    }
+
+def run(url, scenarios, iterations, concurrency, pages):
+    context = prepare(url, pages)
+    # One untimed pass so every scenario starts with warm caches.
+    for name in scenarios:
+        SCENARIOS[name](Client(url), context)
+
+    return [
+        {'scenario': name, 'concurrency': concurrency, **run_scenario(url, SCENARIOS[name], context, iterations, concurrency)}
+        for name in scenarios
+    ]
+
+def run_local(products, categories, scenarios, iterations, concurrency, pages):
+    """Run the scenarios against a server started on a seeded test database."""
+    import logging
+    from io import StringIO
+
+    from django.core.management import call_command
+    from django.db import connections
+    from django.test import override_settings
+    from django.test.testcases import LiveServerThread, _StaticFilesHandler
+
+    call_command('seed_catalog', products=products, categories=categories, stdout=StringIO())
+
+    # An in-memory SQLite database only exists on this connection, share it with the server threads.
+    shared = {connection.alias: connection for connection in connections.all() if connection.vendor == 'sqlite' and connection.is_in_memory_db()}
+    if shared and concurrency > 1:
+        raise SystemExit('A shared in-memory SQLite database cannot take concurrent writes, use PostgreSQL or --url.')
+    for connection in shared.values():
+        connection.inc_thread_sharing()
+
+    # Keep the over budget warnings of the server out of the report.
+    logging.getLogger('core.instrumentation').setLevel(logging.ERROR)
+    with override_settings(ALLOWED_HOSTS=['localhost'], INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_SERVER_TIMING=True):
+        server = LiveServerThread('localhost', _StaticFilesHandler, connections_override=shared)
+        server.daemon = True
+        server.start()
+        server.is_ready.wait()
+        if server.error:
+            raise server.error
+        try:
+            return run(f'http://localhost:{server.port}', scenarios, iterations, concurrency, pages)
+        finally:
+            server.terminate()
+            for connection in shared.values():
+                connection.dec_thread_sharing()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=20)
+    args = parser.parse_args()
+    scenarios = args.scenario or list(SCENARIOS)
+
+    if args.url:
+        results = run(args.url, scenarios, args.iterations, args.concurrency, args.pages)
+    else:
+        utils.setup()
+        with utils.test_database():
+            results = run_local(args.products, args.categories, scenarios, args.iterations, args.concurrency, args.pages)
+    utils.report('load', results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Product list and detail latency with and without the row renderer.
+
+    python -m benchmarks.product_rows [--products 2000] [--repeat 50]
+
+Seeds the catalogue with `seed_catalog`, with image variants, and reports the
+latency of a 500 product list page and of a product detail with
+`FAST_PRODUCT_READS` off (instances and serializers) and on (`values()` rows
+rendered by `shop.rows`). The response cache is disabled so every request
+renders.
+"""
+import argparse
+import io
+
+from benchmarks import utils
+
+PAGE_SIZE = 500
+
+def run(products, repeat):
+    from django.core.management import call_command
+    from django.test import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from shop.models import Product
+
+    call_command('seed_catalog', products=products, categories=20, stdout=io.StringIO())
+    Product.objects.update(
+        image='products/01/10/2022/product.jpg',
+        image_variants={
+            variant: {'webp': f'products/01/10/2022/product_{variant}.webp', 'jpeg': f'products/01/10/2022/product_{variant}.jpg'}
+            for variant in ('thumbnail', 'medium', 'full')
+        },
+    )
+
+    client = APIClient()
+    urls = {
+        'product_list': f'{reverse("shop:product-list")}?page_size={PAGE_SIZE}',
+        'product_detail': reverse('shop:product-detail', args=[Product.objects.order_by('id').first().slug]),
+    }
+    results = []
+    with override_settings(RESPONSE_CACHE_ENABLED=False):
+        for name, url in urls.items():
+            contents = set()
+            for fast in (False, True):
+                with override_settings(FAST_PRODUCT_READS=fast):
+                    request = lambda: client.get(url)
+                    contents.add(request().content)
+                    results.append({
+                        'endpoint': name,
+                        'rows': fast,
+                        'queries': utils.count_queries(request),
+                        **utils.measure(request, repeat=repeat),
+                    })
+            assert len(contents) == 1, f'{name} differs with the row renderer'
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.products, args.repeat)
+    utils.report('product_rows', results)
+
+if __name__ == '__main__':
+    main()
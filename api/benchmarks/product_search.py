@@ -0,0 +1,85 @@
+"""
+Product search latency over a synthetic catalogue.
+
+    python -m benchmarks.product_search [--products 100000] [--repeat 50]
+
+Seeds the catalogue, fills the search vectors and reports the latency of
+`GET /api/shop/products/?search=...` for a few typical queries. On PostgreSQL
+the searches use the GIN index and should stay under the 50ms target; other
+databases use the substring fallback and are reported for reference only.
+"""
+import argparse
+import random
+
+from benchmarks import utils
+
+TARGET_MS = 50
+ADJECTIVES = ['linen', 'flannel', 'denim', 'wool', 'silk', 'cotton', 'leather', 'suede', 'velvet', 'canvas']
+NOUNS = ['shirt', 'jacket', 'trousers', 'dress', 'skirt', 'coat', 'sweater', 'shoe', 'boot', 'scarf']
+COLOURS = ['red', 'blue', 'green', 'black', 'white', 'grey', 'navy', 'olive', 'beige', 'brown']
+QUERIES = ['linen', 'red shirt', 'wool coa', 'navy suede boot', 'xylophone']
+
+def seed(products, batch_size=5000):
+    from decimal import Decimal
+
+    from shop.models import Category, Product
+
+    rng = random.Random(0)
+    categories = Category.objects.bulk_create([Category(name=noun, slug=noun) for noun in NOUNS])
+    for start in range(0, products, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, products)):
+            adjective, colour, category = rng.choice(ADJECTIVES), rng.choice(COLOURS), rng.choice(categories)
+            batch.append(Product(
+                category=category,
+                name=f'{colour} {adjective} {category.name} {i}',
+                slug=f'product-{i}',
+                description=f'A {colour} {category.name} made of {adjective}, style {rng.randint(1, 1000)}.',
+                price=Decimal(rng.randint(100, 20000)) / 100,
+            ))
+        Product.objects.bulk_create(batch)
+
+    Product.objects.all().update_search_vector()
+
+def run(products, repeat):
+    from django.db import connection
+    from django.test import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from shop.models import Product
+
+    seed(products)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE shop_product')
+
+    client = APIClient()
+    url = reverse('shop:product-list')
+    results = []
+    # Measure the database, not the response cache.
+    with override_settings(RESPONSE_CACHE_ENABLED=False):
+        for query in QUERIES:
+            timings = utils.measure(lambda: client.get(url, {'search': query, 'page_size': 20}), repeat=repeat)
+            results.append({
+                'query': query,
+                'matches': Product.objects.search(query).count(),
+                'under_target': timings['p95_ms'] < TARGET_MS,
+                **timings,
+            })
+
+    return {'vendor': connection.vendor, 'products': products, 'target_ms': TARGET_MS, 'queries': results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.test_database():
+        results = run(args.products, args.repeat)
+    utils.report('product_search', results)
+
+if __name__ == '__main__':
+    main()
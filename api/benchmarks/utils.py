@@ -0,0 +1,80 @@
+"""
+Helpers shared by the benchmarks.
+
+Each benchmark is a module runnable from the `api` directory, e.g.
+`python -m benchmarks.cart_detail`, and prints its results as JSON. Data is
+created in a throwaway test database, so the configured database is never
+touched.
+"""
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+
+def setup():
+    """Configure Django for a standalone benchmark script."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+    import django
+    django.setup()
+
+@contextlib.contextmanager
+def test_database():
+    """Create a test database for the duration of the block."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+def percentile(values, percent):
+    """Return the `percent` percentile of `values` using nearest-rank."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(timings):
+    """Return latency statistics in milliseconds for timings in seconds."""
+    milliseconds = [timing * 1000 for timing in timings]
+    return {
+        'runs': len(milliseconds),
+        'mean_ms': round(statistics.mean(milliseconds), 3),
+        'p50_ms': round(percentile(milliseconds, 50), 3),
+        'p95_ms': round(percentile(milliseconds, 95), 3),
+        'p99_ms': round(percentile(milliseconds, 99), 3),
+        'max_ms': round(max(milliseconds), 3),
+    }
+
+def measure(func, repeat=100, warmup=5):
+    """Call `func` `warmup + repeat` times and summarize the timed runs."""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return summarize(timings)
+
+def count_queries(func):
+    """Return the number of database queries `func` issues."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context.captured_queries)
+
+def report(name, results, stream=sys.stdout):
+    """Print the benchmark results as JSON."""
+    json.dump({'benchmark': name, 'results': results}, stream, indent=2, default=str)
+    stream.write('\n')
@@ -1,85 +1,179 @@
 from django.conf import settings
 
+from asgiref.sync import sync_to_async
+
+import hashlib
 from decimal import Decimal
 
+from core.cache import get_cache, get_generations, stats
+from coupons.models import Coupon
+from coupons.rules import CartTotals, get_coupon
 from shop import models
+from .storage import get_storage_class
+
+DETAILS_KEY = 'cart:details:%s'
 
 class Cart:
     """
-    Cart system class to manage session.
+    Cart system class on top of the configured cart storage.
     """
 
     def __init__(self, request):
         """Initialize the cart."""
-        self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        self.storage = get_storage_class()(request)
+        self._items = None
+
+    @property
+    def items(self):
+        """Return the storage items, loaded once until the cart changes."""
+        if self._items is None:
+            self._items = self.storage.items()
+        return self._items
 
     def __iter__(self):
         """Iterate over all products in the cart and fetch them from the database."""
-        product_ids = self.cart.keys()
-        products = models.Product.objects.filter(id__in=product_ids)
+        return self.lines()
+
+    def lines(self):
+        """
+        Yield the cart lines with their products fetched in one query.
+        Every line is a new dictionary, so the stored cart is never modified.
+        """
+        items = self.items
+        for product in self.get_products(items):
+            yield self.make_line(product, items[product.id])
+
+    async def alines(self):
+        """Async `lines`, fetching the products with the async ORM."""
+        if self._items is None:
+            self._items = await sync_to_async(self.storage.items)()
+        items = self._items
+        async for product in self.get_products(items).aiterator():
+            yield self.make_line(product, items[product.id])
+
+    def get_products(self, items):
+        """Return the queryset of the products of `items` with their categories."""
+        return models.Product.objects.select_related('category').filter(id__in=items.keys())
 
-        cart = self.cart.copy()
-        for product in products:
-            cart[str(product.id)]['product'] = product
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
+    def make_line(self, product, item):
+        """Return the cart line of a product and its stored item."""
+        return {
+            'product': product,
+            'quantity': item['quantity'],
+            'price': item['price'],
+            'total_price': item['price'] * item['quantity'],
+        }
 
     def __len__(self):
         """Return the number of products in the cart."""
-        return sum(item['quantity'] for item in self.cart.values())
+        return self.storage.count()
+
+    @property
+    def coupon_code(self):
+        """Return the code of the coupon applied to the cart, if any."""
+        return self.storage.session.get(settings.COUPON_SESSION_ID)
+
+    def get_coupon(self):
+        """Return the compiled coupon applied to the cart, or None if it cannot be used anymore."""
+        return get_coupon(self.coupon_code)
+
+    def set_coupon(self, code):
+        """Apply the coupon of `code` to the cart."""
+        self.storage.session[settings.COUPON_SESSION_ID] = code.upper()
+
+    def remove_coupon(self):
+        """Remove the coupon from the cart."""
+        self.storage.session.pop(settings.COUPON_SESSION_ID, None)
 
     def get_details(self):
         """Return dictionary with data of the cart details."""
-        cart = self.cart.copy()
-        products = [
-            {
-                'product': item['product'], 
-                'quantity': item['quantity'], 
-                'total_price': item['total_price'],
-            } for item in cart
-        ]
+        # Not list(self): that would call __len__, which is a query for some storages.
+        return self.make_details(list(self.lines()), self.get_coupon())
+
+    async def aget_details(self):
+        """Async `get_details`."""
+        products = [line async for line in self.alines()]
+        return self.make_details(products, await sync_to_async(self.get_coupon)())
+
+    def make_details(self, products, coupon):
+        """Return the details of the cart lines with the coupon applied."""
+        total_price = sum((line['total_price'] for line in products), Decimal('0'))
+        # The products come with their category id, so evaluating the coupon needs no query.
+        discount = coupon.discount(CartTotals((line['product'].category_id, line['total_price']) for line in products)) if coupon else Decimal('0')
         data = {
             'products': products,
-            'total_price': Decimal(str(self.get_total_price()))
+            'total_price': total_price,
+            'coupon': coupon.code if coupon else None,
+            'discount': discount,
+            'total_price_after_discount': total_price - discount,
         }
         return data
 
+    def get_details_cache_key(self):
+        """
+        Return the cache key of the cart details. The key is derived from the
+        cart content, its coupon and the catalogue and coupon generations, so
+        it changes whenever the cart, its coupon or any product shown in it does.
+        """
+        content = sorted((product_id, item['quantity'], str(item['price'])) for product_id, item in self.items.items())
+        parts = [repr(content), repr(self.coupon_code), repr(get_generations((models.Product, models.Category, Coupon)))]
+        return DETAILS_KEY % hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def get_cached_details(self, render):
+        """Return `render(details)`, cached until the cart or the catalogue changes."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return render(self.get_details())
+
+        cache = get_cache()
+        key = self.get_details_cache_key()
+        data = cache.get(key)
+        stats.record(hit=data is not None)
+        if data is None:
+            data = render(self.get_details())
+            cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+
+        return data
+
+    async def aget_cached_details(self, render):
+        """Async `get_cached_details`."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return render(await self.aget_details())
+
+        cache = get_cache()
+        key = await sync_to_async(self.get_details_cache_key)()
+        data = await cache.aget(key)
+        stats.record(hit=data is not None)
+        if data is None:
+            data = render(await self.aget_details())
+            await cache.aset(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+
+        return data
+
     def add(self, product, quantity=1, update_quantity=False):
         """Add a product to the cart or change its quantity."""
-        product_id = str(product.id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                'quantity': 0,
-                'price': str(product.price),
-            }
-        if update_quantity:
-            self.cart[product_id]['quantity'] = quantity
-        else:
-            self.cart[product_id]['quantity'] += quantity
-        self.save()
+        self.storage.add(product, quantity=quantity, update_quantity=update_quantity)
+        self._items = None
+
+    def apply(self, operations):
+        """Apply a batch of `(op, product, quantity)` operations."""
+        self.storage.apply(operations)
+        self._items = None
 
     def save(self):
         """Mark the cart as modified."""
-        self.session.modified = True
+        self.storage.save()
 
     def remove(self, product):
         """Remove a product from the cart."""
-        product_id = str(product.id)
-        if product_id in self.cart:
-            del self.cart[product_id]
-            self.save()
+        self.storage.remove(product.id)
+        self._items = None
 
     def get_total_price(self):
         """Return the total price of items in the cart."""
-        return sum(Decimal(item['price']) * item['quantity'] for item in self.cart.values())
+        return self.storage.total_price()
 
     def clear(self):
-        """Delete the cart from the session."""
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
\ No newline at end of file
+        """Delete the cart and its coupon."""
+        self.storage.clear()
+        self.remove_coupon()
+        self._items = None
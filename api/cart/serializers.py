@@ -1,21 +1,56 @@
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
 
+from core.instrumentation import TimedSerializerMixin
 from shop.serializers import ProductSerializer
 
 PRODUCT_QUANTITY_CHOICES = [(i, str(i)) for i in range(1,21)]
+BATCH_OPERATION_CHOICES = [('add', 'add'), ('set', 'set'), ('remove', 'remove')]
+BATCH_MAX_OPERATIONS = 100
 
 class CartAddProductSerializer(serializers.Serializer):
     quantity = serializers.ChoiceField(choices=PRODUCT_QUANTITY_CHOICES)
     product_id = serializers.IntegerField()
 
+class CartBatchOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=BATCH_OPERATION_CHOICES)
+    product_id = serializers.IntegerField()
+    quantity = serializers.ChoiceField(choices=PRODUCT_QUANTITY_CHOICES, required=False)
+
+    def validate(self, attrs):
+        """Require a quantity for everything but removals."""
+        if attrs['op'] != 'remove' and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': [_('This field is required.')]}, code='required')
+
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartBatchOperationSerializer(many=True, allow_empty=False, max_length=BATCH_MAX_OPERATIONS)
+
+class CartBatchResultSerializer(serializers.Serializer):
+    op = serializers.CharField(required=False)
+    product_id = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=[('ok', 'ok'), ('error', 'error')])
+    errors = serializers.DictField(required=False)
+
+class CartBatchResponseSerializer(serializers.Serializer):
+    results = CartBatchResultSerializer(many=True)
+
 class CartProductSerializer(serializers.Serializer):
     product = ProductSerializer()
     quantity = serializers.IntegerField()
     total_price = serializers.DecimalField(decimal_places=2, max_digits=15)
 
-class CartDetailSerializer(serializers.Serializer):
+class CartDetailSerializer(TimedSerializerMixin, serializers.Serializer):
     products = CartProductSerializer(many=True)
     total_price = serializers.DecimalField(decimal_places=2, max_digits=15)
+    coupon = serializers.CharField(allow_null=True)
+    discount = serializers.DecimalField(decimal_places=2, max_digits=15)
+    total_price_after_discount = serializers.DecimalField(decimal_places=2, max_digits=15)
 
     class Meta:
-        read_only_fields = ['products', 'total_price']
+        read_only_fields = ['products', 'total_price', 'coupon', 'discount', 'total_price_after_discount']
+
+class CartCouponSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=50)
@@ -0,0 +1,280 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, Sum
+from django.utils.module_loading import import_string
+
+from decimal import Decimal
+
+from cart import models
+
+def get_storage_class():
+    """Return the cart storage backend configured by the `CART_STORAGE` setting."""
+    return import_string(settings.CART_STORAGE)
+
+class BaseCartStorage:
+    """
+    Interface of cart storage backends.
+
+    Items are exposed as `{product_id: {'quantity': int, 'price': Decimal}}`,
+    where `price` is the unit price at the time the product was added.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.session = request.session
+
+    def items(self):
+        """Return the items of the cart."""
+        raise NotImplementedError
+
+    def add(self, product, quantity=1, update_quantity=False):
+        """Add a product to the cart or change its quantity."""
+        raise NotImplementedError
+
+    def remove(self, product_id):
+        """Remove a product from the cart."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove every product from the cart."""
+        raise NotImplementedError
+
+    def save(self):
+        """Persist pending changes, for backends that defer writes."""
+
+    def apply(self, operations):
+        """Apply a batch of `(op, product, quantity)` operations, `op` being add, set or remove."""
+        for op, product, quantity in operations:
+            if op == 'remove':
+                self.remove(product.id)
+            else:
+                self.add(product, quantity=quantity, update_quantity=op == 'set')
+
+    def count(self):
+        """Return the number of products in the cart."""
+        return sum(item['quantity'] for item in self.items().values())
+
+    def total_price(self):
+        """Return the total price of items in the cart."""
+        return sum((item['price'] * item['quantity'] for item in self.items().values()), Decimal('0'))
+
+class SessionCartStorage(BaseCartStorage):
+    """Keep the cart as a dictionary inside the session."""
+
+    def __init__(self, request):
+        super().__init__(request)
+        cart = self.session.get(settings.CART_SESSION_ID)
+        if not cart:
+            cart = self.session[settings.CART_SESSION_ID] = {}
+        self.cart = cart
+
+    def items(self):
+        return {
+            int(product_id): {'quantity': item['quantity'], 'price': Decimal(item['price'])}
+            for product_id, item in self.cart.items()
+        }
+
+    def add(self, product, quantity=1, update_quantity=False):
+        product_id = str(product.id)
+        if product_id not in self.cart:
+            self.cart[product_id] = {
+                'quantity': 0,
+                'price': str(product.price),
+            }
+        if update_quantity:
+            self.cart[product_id]['quantity'] = quantity
+        else:
+            self.cart[product_id]['quantity'] += quantity
+        self.save()
+
+    def remove(self, product_id):
+        product_id = str(product_id)
+        if product_id in self.cart:
+            del self.cart[product_id]
+            self.save()
+
+    def clear(self):
+        del self.session[settings.CART_SESSION_ID]
+        self.save()
+
+    def save(self):
+        """Mark the session as modified."""
+        self.session.modified = True
+
+class DatabaseCartStorage(BaseCartStorage):
+    """
+    Keep the cart in the `Cart`/`CartItem` tables.
+
+    The session only holds the cart id and owner, so it is written when the
+    cart is created or changes hands, not on every update. An anonymous cart
+    is attached to the user (or merged into their existing cart) the first
+    time the session is seen authenticated, which keeps it across login.
+    """
+    session_key = f'{settings.CART_SESSION_ID}_db'
+    # Django 4.1 renders `unique_fields` verbatim in ON CONFLICT, so use column names.
+    unique_fields = ['cart_id', 'product_id']
+
+    def __init__(self, request):
+        super().__init__(request)
+        user = getattr(request, 'user', None)
+        self.user_id = user.id if user is not None and user.is_authenticated else None
+        self.cart_id = self._resolve_cart_id()
+
+    def _resolve_cart_id(self):
+        stored = self.session.get(self.session_key)
+        if stored and stored['user'] == self.user_id:
+            return stored['id']
+        if self.user_id is None:
+            return None
+
+        cart_id = models.Cart.objects.filter(user_id=self.user_id).values_list('id', flat=True).first()
+        if stored and stored['user'] is None:
+            cart_id = self._adopt(stored['id'], cart_id)
+        if cart_id is not None:
+            self._remember(cart_id)
+
+        return cart_id
+
+    @transaction.atomic
+    def _adopt(self, anonymous_id, cart_id):
+        """
+        Attach the anonymous cart to the user, merging it into theirs if they
+        have one. Quantities of products in both carts are added up, as adding
+        them to the cart one by one would.
+        """
+        if cart_id is None:
+            try:
+                with transaction.atomic():
+                    if models.Cart.objects.filter(id=anonymous_id, user=None).update(user_id=self.user_id):
+                        return anonymous_id
+                    return None
+            except IntegrityError:
+                # Another request gave the user a cart in the meantime.
+                cart_id = self._user_cart_id()
+
+        incoming = {
+            product_id: (quantity, price)
+            for product_id, quantity, price in models.CartItem.objects.filter(cart_id=anonymous_id).values_list('product_id', 'quantity', 'price')
+        }
+        existing = dict(
+            models.CartItem.objects.select_for_update()
+            .filter(cart_id=cart_id, product_id__in=incoming).values_list('product_id', 'quantity')
+        )
+        items = [
+            models.CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity + existing.get(product_id, 0), price=price)
+            for product_id, (quantity, price) in incoming.items()
+        ]
+
+        models.CartItem.objects.bulk_create(
+            items,
+            update_conflicts=True,
+            unique_fields=self.unique_fields,
+            update_fields=['quantity', 'price'],
+        )
+        models.Cart.objects.filter(id=anonymous_id, user=None).delete()
+        return cart_id
+
+    def _user_cart_id(self):
+        return models.Cart.objects.filter(user_id=self.user_id).values_list('id', flat=True).get()
+
+    def _remember(self, cart_id):
+        self.session[self.session_key] = {'id': cart_id, 'user': self.user_id}
+
+    def _get_or_create_cart_id(self):
+        if self.cart_id is None:
+            try:
+                with transaction.atomic():
+                    self.cart_id = models.Cart.objects.create(user_id=self.user_id).id
+            except IntegrityError:
+                # Only one cart per user: another request created theirs first.
+                if self.user_id is None:
+                    raise
+                self.cart_id = self._user_cart_id()
+            self._remember(self.cart_id)
+
+        return self.cart_id
+
+    def _items(self):
+        return models.CartItem.objects.filter(cart_id=self.cart_id)
+
+    def items(self):
+        if self.cart_id is None:
+            return {}
+
+        return {
+            product_id: {'quantity': quantity, 'price': price}
+            for product_id, quantity, price in self._items().values_list('product_id', 'quantity', 'price')
+        }
+
+    def add(self, product, quantity=1, update_quantity=False):
+        cart_id = self._get_or_create_cart_id()
+        if not update_quantity:
+            updated = self._items().filter(product_id=product.id).update(quantity=F('quantity') + quantity)
+            if updated:
+                return
+
+        models.CartItem.objects.bulk_create(
+            [models.CartItem(cart_id=cart_id, product_id=product.id, quantity=quantity, price=product.price)],
+            update_conflicts=True,
+            unique_fields=self.unique_fields,
+            update_fields=['quantity'],
+        )
+
+    @transaction.atomic
+    def apply(self, operations):
+        """Coalesce the operations in memory and write them with one upsert and one delete."""
+        cart_id = self._get_or_create_cart_id()
+        current = {
+            product_id: (quantity, price)
+            for product_id, quantity, price in self._items().select_for_update().values_list('product_id', 'quantity', 'price')
+        }
+        lines = dict(current)
+        touched = set()
+        for op, product, quantity in operations:
+            touched.add(product.id)
+            if op == 'remove':
+                lines.pop(product.id, None)
+            elif product.id not in lines:
+                lines[product.id] = (quantity, product.price)
+            elif op == 'set':
+                lines[product.id] = (quantity, lines[product.id][1])
+            else:
+                lines[product.id] = (lines[product.id][0] + quantity, lines[product.id][1])
+
+        removed = [product_id for product_id in touched if product_id not in lines and product_id in current]
+        if removed:
+            self._items().filter(product_id__in=removed).delete()
+        upserts = [
+            models.CartItem(cart_id=cart_id, product_id=product_id, quantity=lines[product_id][0], price=lines[product_id][1])
+            for product_id in touched if product_id in lines and lines[product_id] != current.get(product_id)
+        ]
+        if upserts:
+            models.CartItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=self.unique_fields,
+                update_fields=['quantity'],
+            )
+
+    def remove(self, product_id):
+        if self.cart_id is not None:
+            self._items().filter(product_id=product_id).delete()
+
+    def clear(self):
+        if self.cart_id is not None:
+            self._items().delete()
+
+    def count(self):
+        if self.cart_id is None:
+            return 0
+
+        return self._items().aggregate(count=Sum('quantity'))['count'] or 0
+
+    def total_price(self):
+        if self.cart_id is None:
+            return Decimal('0')
+
+        total = self._items().aggregate(
+            total=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=15, decimal_places=2))
+        )['total']
+        return total or Decimal('0')
@@ -0,0 +1,96 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import include, path
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+import asyncio
+from decimal import Decimal
+
+from cart import views
+from cart.tests.test_views import CART_ADD_URL, CART_URL
+from coupons import rules
+from coupons.tests.test_rules import create_coupon
+from coupons.tests.test_views import CART_COUPON_URL
+from shop.tests.test_views import create_category, create_product
+
+# Served as ROOT_URLCONF, so the async cart detail answers at the usual url.
+urlpatterns = [
+    path('api/cart/', views.cart_detail_async),
+    path('', include('api.urls')),
+]
+
+class AsyncCartDetailTestsMixin:
+    """Test the async cart detail matches the sync one."""
+
+    def setUp(self):
+        cache.clear()
+        rules.registry.clear()
+        self.client = APIClient()
+        category = create_category(name='shirts')
+        self.shirt = create_product(category=category, name='Super shirt', slug='super-shirt', price=Decimal('13.99'))
+        self.pants = create_product(category=category, name='Super pants', slug='super-pants', price=Decimal('20.00'))
+
+    def get_both(self):
+        """Return the responses of the sync and the async cart detail."""
+        sync_response = self.client.get(CART_URL)
+        with self.settings(ROOT_URLCONF=__name__):
+            async_response = self.client.get(CART_URL)
+        return sync_response, async_response
+
+    def test_view_is_async(self):
+        """Test the view is a coroutine function."""
+        self.assertTrue(asyncio.iscoroutinefunction(views.cart_detail_async))
+
+    def test_empty_cart(self):
+        """Test an empty cart renders the same."""
+        sync_response, async_response = self.get_both()
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response['Content-Type'], 'application/json')
+        self.assertEqual(async_response.content, sync_response.content)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_cart_matches_sync(self):
+        """Test a cart with products and a coupon renders the same."""
+        create_coupon()
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 2})
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 1})
+        self.client.post(CART_COUPON_URL, {'code': 'SAVE10'})
+
+        sync_response, async_response = self.get_both()
+
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(async_response.json()['discount'], '4.80')
+
+    def test_cache_shared_with_sync(self):
+        """Test the async view serves the details cached by the sync view."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.client.get(CART_URL)
+
+        with self.settings(ROOT_URLCONF=__name__):
+            with self.assertNumQueries(self.cached_queries):
+                response = self.client.get(CART_URL)
+
+        self.assertEqual(response.json()['total_price'], '13.99')
+
+    def test_write_methods_not_allowed(self):
+        """Test the async view only answers reads."""
+        with self.settings(ROOT_URLCONF=__name__):
+            response = self.client.post(CART_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+class SessionAsyncCartDetailTests(AsyncCartDetailTestsMixin, TestCase):
+    """Test the async cart detail with the session storage."""
+
+    # The session load.
+    cached_queries = 1
+
+@override_settings(CART_STORAGE='cart.storage.DatabaseCartStorage')
+class DatabaseAsyncCartDetailTests(AsyncCartDetailTestsMixin, TestCase):
+    """Test the async cart detail with the database storage."""
+
+    # The session load and the cart items.
+    cached_queries = 2
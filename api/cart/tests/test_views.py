@@ -0,0 +1,334 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from decimal import Decimal
+
+from cart import models
+from cart.storage import DatabaseCartStorage
+from shop.tests.test_views import create_category, create_product
+
+CART_URL = reverse('cart:cart_detail')
+CART_ADD_URL = reverse('cart:cart_add')
+CART_CLEAR_URL = reverse('cart:cart_clear')
+CART_BATCH_URL = reverse('cart:cart_batch')
+
+def remove_url(product_id):
+    """Create and return a cart remove url for a product."""
+    return reverse('cart:cart_remove', args=[product_id])
+
+class CartApiTestsMixin:
+    """
+    Test the cart API, run against every storage backend.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = create_category(name='shirts')
+        self.shirt = create_product(category=category, name='Super shirt', slug='super-shirt', price=Decimal('13.99'))
+        self.pants = create_product(category=category, name='Super pants', slug='super-pants', price=Decimal('20.00'))
+
+    def test_cart_empty(self):
+        """Test an empty cart has no products."""
+        response = self.client.get(CART_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['products'], [])
+        self.assertEqual(response.data['total_price'], '0.00')
+
+    def test_add_products(self):
+        """Test adding products accumulates quantities and totals."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 2})
+        response = self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 1})
+
+        response = self.client.get(CART_URL)
+
+        quantities = {item['product']['slug']: item['quantity'] for item in response.data['products']}
+        self.assertEqual(quantities, {'super-shirt': 3, 'super-pants': 1})
+        self.assertEqual(response.data['total_price'], '61.97')
+
+    def test_update_quantity(self):
+        """Test PUT replaces the quantity of a product."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 2})
+
+        response = self.client.put(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(CART_URL)
+        self.assertEqual(response.data['products'][0]['quantity'], 5)
+        self.assertEqual(response.data['total_price'], '69.95')
+
+    def test_add_missing_product(self):
+        """Test adding a missing product returns not found."""
+        response = self.client.post(CART_ADD_URL, {'product_id': 0, 'quantity': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_price_kept_from_time_of_adding(self):
+        """Test the cart keeps the price the product had when added."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.shirt.price = Decimal('99.00')
+        self.shirt.save()
+
+        response = self.client.get(CART_URL)
+
+        self.assertEqual(response.data['total_price'], '13.99')
+
+    def test_remove_product(self):
+        """Test removing a product from the cart."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 1})
+
+        response = self.client.delete(remove_url(self.shirt.id))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get(CART_URL)
+        self.assertEqual([item['product']['slug'] for item in response.data['products']], ['super-pants'])
+
+    def test_clear_cart(self):
+        """Test clearing the cart removes every product."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+
+        response = self.client.delete(CART_CLEAR_URL)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get(CART_URL)
+        self.assertEqual(response.data['products'], [])
+
+    def test_cart_survives_login(self):
+        """Test the anonymous cart is kept after logging in."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 2})
+        user = get_user_model().objects.create_user(email='user@example.com', first_name='John', last_name='Doe', password='test12345')
+
+        self.client.force_login(user)
+        response = self.client.get(CART_URL)
+
+        self.assertEqual(response.data['products'][0]['quantity'], 2)
+
+    def cart_quantities(self):
+        """Return the quantities in the cart keyed by product slug."""
+        response = self.client.get(CART_URL)
+        return {item['product']['slug']: item['quantity'] for item in response.data['products']}
+
+    def test_batch_operations(self):
+        """Test a batch of add, set and remove operations is applied in order."""
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 1})
+        payload = {'operations': [
+            {'op': 'add', 'product_id': self.shirt.id, 'quantity': 2},
+            {'op': 'add', 'product_id': self.shirt.id, 'quantity': 3},
+            {'op': 'set', 'product_id': self.pants.id, 'quantity': 4},
+            {'op': 'remove', 'product_id': self.pants.id},
+            {'op': 'set', 'product_id': self.pants.id, 'quantity': 1},
+        ]}
+
+        response = self.client.post(CART_BATCH_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']], ['ok'] * 5)
+        self.assertEqual(self.cart_quantities(), {'super-shirt': 5, 'super-pants': 1})
+
+    def test_batch_resolves_products_in_one_query(self):
+        """Test the batch looks all products up with a single query."""
+        payload = {'operations': [
+            {'op': 'add', 'product_id': product.id, 'quantity': 1} for product in (self.shirt, self.pants)
+        ]}
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(CART_BATCH_URL, payload, format='json')
+
+        product_queries = [query for query in context.captured_queries if 'FROM "shop_product"' in query['sql']]
+        self.assertEqual(len(product_queries), 1)
+
+    def test_batch_invalid_item_applies_nothing(self):
+        """Test an invalid operation is reported per item and nothing is applied."""
+        payload = {'operations': [
+            {'op': 'add', 'product_id': self.shirt.id, 'quantity': 1},
+            {'op': 'add', 'product_id': self.pants.id, 'quantity': 50},
+            {'op': 'set', 'product_id': self.pants.id},
+        ]}
+
+        response = self.client.post(CART_BATCH_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['ok', 'error', 'error'])
+        self.assertIn('quantity', results[1]['errors'])
+        self.assertIn('quantity', results[2]['errors'])
+        self.assertEqual(self.cart_quantities(), {})
+
+    def test_batch_missing_product(self):
+        """Test an unknown product is reported for its item."""
+        payload = {'operations': [
+            {'op': 'add', 'product_id': self.shirt.id, 'quantity': 1},
+            {'op': 'remove', 'product_id': 0},
+        ]}
+
+        response = self.client.post(CART_BATCH_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results'][1]['errors'], {'product_id': ['Product not found.']})
+        self.assertEqual(self.cart_quantities(), {})
+
+    def test_batch_empty(self):
+        """Test an empty batch is rejected."""
+        response = self.client.post(CART_BATCH_URL, {'operations': []}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('operations', response.data)
+
+    def test_detail_product_query(self):
+        """Test the detail fetches products and categories in a single query."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 1})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(CART_URL)
+
+        catalogue_queries = [query for query in context.captured_queries if '"shop_' in query['sql']]
+        self.assertEqual(len(catalogue_queries), 1)
+        self.assertEqual(response.data['products'][0]['product']['category']['slug'], 'shirts')
+
+    def test_detail_cached_until_cart_changes(self):
+        """Test the detail is served from the cache until the cart changes."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.client.get(CART_URL)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(CART_URL)
+        self.assertFalse([query for query in context.captured_queries if '"shop_' in query['sql']])
+
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        response = self.client.get(CART_URL)
+        self.assertEqual(response.data['products'][0]['quantity'], 2)
+
+    def test_detail_cache_invalidated_by_product_change(self):
+        """Test the cached detail follows product changes."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.client.get(CART_URL)
+
+        self.shirt.name = 'Mega shirt'
+        self.shirt.save()
+        response = self.client.get(CART_URL)
+
+        self.assertEqual(response.data['products'][0]['product']['name'], 'Mega shirt')
+
+class SessionCartApiTests(CartApiTestsMixin, TestCase):
+    """Test the cart API with the session storage."""
+
+    def test_detail_does_not_modify_session(self):
+        """Test rendering the detail leaves the stored cart untouched."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 2})
+        stored = self.client.session[settings.CART_SESSION_ID]
+
+        self.client.get(CART_URL)
+
+        self.assertEqual(self.client.session[settings.CART_SESSION_ID], stored)
+        self.assertEqual(stored, {str(self.shirt.id): {'quantity': 2, 'price': '13.99'}})
+
+@override_settings(CART_STORAGE='cart.storage.DatabaseCartStorage')
+class DatabaseCartApiTests(CartApiTestsMixin, TestCase):
+    """Test the cart API with the database storage."""
+
+    def login(self):
+        user = get_user_model().objects.create_user(email='user@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_login(user)
+        return user
+
+    def test_update_is_single_upsert(self):
+        """Test adding to an existing line is a single UPDATE."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+
+        # Session load, product lookup and the upsert itself.
+        with self.assertNumQueries(3):
+            self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+
+        self.assertEqual(models.CartItem.objects.get().quantity, 2)
+
+    def test_cart_attached_to_user(self):
+        """Test logging in attaches the anonymous cart to the user."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        user = self.login()
+
+        self.client.get(CART_URL)
+
+        self.assertEqual(models.Cart.objects.get().user, user)
+
+    def test_cart_merged_into_user_cart(self):
+        """Test an anonymous cart is merged into the cart the user already has."""
+        user = self.login()
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 1})
+        self.client.logout()
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 2})
+
+        self.client.force_login(user)
+        response = self.client.get(CART_URL)
+
+        quantities = {item['product']['slug']: item['quantity'] for item in response.data['products']}
+        self.assertEqual(quantities, {'super-shirt': 2, 'super-pants': 1})
+        self.assertEqual(models.Cart.objects.get().user, user)
+
+    def test_cart_merge_adds_quantities(self):
+        """Test products in both carts get the sum of the quantities."""
+        user = self.login()
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 3})
+        self.client.logout()
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 2})
+        self.client.post(CART_ADD_URL, {'product_id': self.pants.id, 'quantity': 2})
+
+        self.client.force_login(user)
+        response = self.client.get(CART_URL)
+
+        quantities = {item['product']['slug']: item['quantity'] for item in response.data['products']}
+        self.assertEqual(quantities, {'super-shirt': 3, 'super-pants': 5})
+
+    def storage(self, user):
+        """Return the database storage of a request of `user` with a new session."""
+        request = APIRequestFactory().get(CART_URL)
+        request.session, request.user = SessionStore(), user
+        return DatabaseCartStorage(request)
+
+    def test_cart_created_concurrently(self):
+        """Test a user cart created by another request meanwhile is used rather than failing."""
+        user = self.login()
+        storage = self.storage(user)
+        cart = models.Cart.objects.create(user=user)
+
+        storage.add(self.shirt)
+
+        self.assertEqual(storage.cart_id, cart.id)
+        self.assertEqual(models.CartItem.objects.get().cart, cart)
+
+    def test_cart_adopted_concurrently(self):
+        """Test an anonymous cart is merged into a user cart created meanwhile."""
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+        anonymous = models.Cart.objects.get()
+        user = self.login()
+        storage = self.storage(user)
+        cart = models.Cart.objects.create(user=user)
+
+        self.assertEqual(storage._adopt(anonymous.id, None), cart.id)
+        self.assertEqual(models.CartItem.objects.get().cart, cart)
+        self.assertFalse(models.Cart.objects.filter(pk=anonymous.pk).exists())
+
+    def test_cart_shared_between_sessions(self):
+        """Test the user's cart is available from another session."""
+        user = self.login()
+        self.client.post(CART_ADD_URL, {'product_id': self.shirt.id, 'quantity': 1})
+
+        client = APIClient()
+        client.force_login(user)
+        response = client.get(CART_URL)
+
+        self.assertEqual(response.data['products'][0]['product']['slug'], 'super-shirt')
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -5,8 +6,10 @@ from . import views
 app_name = 'cart'
 
 urlpatterns = [
-    path('', views.cart_detail, name='cart_detail'),
+    path('', views.cart_detail_async if settings.ASYNC_VIEWS else views.cart_detail, name='cart_detail'),
     path('add/', views.cart_add, name='cart_add'),
+    path('batch/', views.cart_batch, name='cart_batch'),
+    path('coupon/', views.cart_coupon, name='cart_coupon'),
     path('remove/<int:product_id>/', views.cart_remove, name='cart_remove'),
     path('clear/', views.cart_clear, name='cart_clear'),
 ]
\ No newline at end of file
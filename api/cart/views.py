@@ -1,11 +1,16 @@
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from django.http import HttpResponse, HttpResponseNotAllowed
 from django.shortcuts import get_object_or_404
 
+from asgiref.sync import sync_to_async
+
 from drf_spectacular.utils import extend_schema
 
+from coupons.rules import get_coupon
 from shop.models import Product
 from .cart import Cart
 from . import serializers
@@ -19,9 +24,26 @@ from decimal import Decimal
 def cart_detail(request):
     """Show cart details."""
     cart = Cart(request)
-    data = cart.get_details()
-    serializer = serializers.CartDetailSerializer(data)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    data = cart.get_cached_details(lambda details: serializers.CartDetailSerializer(details).data)
+    return Response(data, status=status.HTTP_200_OK)
+
+async def cart_detail_async(request):
+    """
+    Async variant of `cart_detail` for ASGI servers, rendering with the
+    default JSON renderer only.
+    The session is loaded in a thread, as sessions have no async API.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    cart = await sync_to_async(Cart)(request)
+    data = await cart.aget_cached_details(lambda details: serializers.CartDetailSerializer(details).data)
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), content_type=renderer.media_type)
+
+# Documented like the sync view it replaces.
+cart_detail_async.cls = cart_detail.cls
+cart_detail_async.initkwargs = cart_detail.initkwargs
 
 @extend_schema(
     request=serializers.CartAddProductSerializer,
@@ -47,6 +69,70 @@ def cart_add(request):
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@extend_schema(
+    request=serializers.CartBatchSerializer,
+    responses=serializers.CartBatchResponseSerializer
+)
+@api_view(['POST'])
+def cart_batch(request):
+    """
+    Apply a list of add, set and remove operations to the cart.
+    Either every operation is applied or, if any is invalid, none is.
+    """
+    serializer = serializers.CartBatchSerializer(data=request.data)
+    if serializer.is_valid():
+        operations = serializer.validated_data['operations']
+        products = Product.objects.in_bulk({operation['product_id'] for operation in operations})
+        errors = [
+            {} if operation['product_id'] in products else {'product_id': ['Product not found.']}
+            for operation in operations
+        ]
+    else:
+        errors = serializer.errors.get('operations')
+        if not isinstance(errors, list):
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operations = [data if isinstance(data, dict) else {} for data in request.data['operations']]
+
+    results = [
+        {
+            'op': operation.get('op'),
+            'product_id': operation.get('product_id'),
+            'status': 'error' if error else 'ok',
+            **({'errors': error} if error else {}),
+        } for operation, error in zip(operations, errors)
+    ]
+    if any(errors):
+        return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+    cart = Cart(request)
+    cart.apply([
+        (operation['op'], products[operation['product_id']], operation.get('quantity'))
+        for operation in operations
+    ])
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+@extend_schema(
+    request=serializers.CartCouponSerializer,
+    responses=serializers.CartCouponSerializer
+)
+@api_view(['POST', 'DELETE'])
+def cart_coupon(request):
+    """Apply a discount coupon to the cart or remove it."""
+    cart = Cart(request)
+    if request.method == 'DELETE':
+        cart.remove_coupon()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    serializer = serializers.CartCouponSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    coupon = get_coupon(serializer.validated_data['code'])
+    if coupon is None:
+        return Response({'code': ['Coupon is not valid.']}, status=status.HTTP_400_BAD_REQUEST)
+
+    cart.set_coupon(coupon.code)
+    return Response({'code': coupon.code}, status=status.HTTP_200_OK)
+
 @extend_schema()
 @api_view(['DELETE'])
 def cart_remove(request, product_id):
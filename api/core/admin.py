@@ -1,6 +1,12 @@
+from django import forms
 from django.contrib import admin
+from django.db.models import F
+from django.db.models.functions import Greatest
 
-from shop.models import Category, Product
+from coupons.models import Coupon
+from orders.models import Order, OrderItem
+from shop import inventory
+from shop.models import Category, Product, ProductImageJob
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -8,10 +14,94 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug']
     prepopulated_fields = {'slug': ('name',)}
 
+class ProductAdminForm(forms.ModelForm):
+    """Product form adjusting the stock by a number of units rather than setting it."""
+    add_stock = forms.IntegerField(
+        required=False,
+        label='Add stock',
+        help_text='Units to add to the stock, or to remove with a negative number.',
+    )
+
+    class Meta:
+        model = Product
+        fields = '__all__'
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     """Custom product display in admin panel."""
-    list_display = ['name', 'slug', 'price', 'available', 'created', 'updated']
+    form = ProductAdminForm
+    list_display = ['name', 'slug', 'price', 'available', 'stock', 'total_stock', 'stock_shards', 'created', 'updated']
     list_filter = ['available', 'created', 'updated']
+    # Stock is left out: saving a row would write back the stock the page was loaded with.
     list_editable = ['price', 'available']
-    prepopulated_fields = {'slug': ('name',)}
\ No newline at end of file
+    prepopulated_fields = {'slug': ('name',)}
+    actions = ['rebalance_stock_shards', 'merge_stock_shards']
+
+    def get_queryset(self, request):
+        return inventory.with_stock(super().get_queryset(request))
+
+    def get_readonly_fields(self, request, obj=None):
+        """Set the stock when adding a product; existing products are adjusted with `add_stock`."""
+        return ['stock'] if obj is not None else []
+
+    def get_fields(self, request, obj=None):
+        fields = super().get_fields(request, obj)
+        return fields if obj is not None else [field for field in fields if field != 'add_stock']
+
+    def save_model(self, request, obj, form, change):
+        """Save the product, applying `add_stock` as one update so concurrent checkouts are kept."""
+        super().save_model(request, obj, form, change)
+        units = form.cleaned_data.get('add_stock')
+        if change and units:
+            Product.objects.filter(pk=obj.pk).update(stock=Greatest(F('stock') + units, 0))
+
+    @admin.display(description='total stock', ordering='total_stock')
+    def total_stock(self, product):
+        return product.total_stock
+
+    @admin.action(description='Rebalance stock shards of selected products')
+    def rebalance_stock_shards(self, request, queryset):
+        """Spread the stock of each product, including its row, evenly over INVENTORY_SHARDS shards."""
+        for product in queryset:
+            inventory.rebalance(product)
+        self.message_user(request, f'Rebalanced the stock of {len(queryset)} products.')
+
+    @admin.action(description='Merge stock shards of selected products')
+    def merge_stock_shards(self, request, queryset):
+        """Move the stock of each product back into its row."""
+        for product in queryset:
+            inventory.merge(product)
+        self.message_user(request, f'Merged the stock shards of {len(queryset)} products.')
+
+@admin.register(ProductImageJob)
+class ProductImageJobAdmin(admin.ModelAdmin):
+    """Custom image job display in admin panel."""
+    list_display = ['product', 'status', 'attempts', 'created', 'updated']
+    list_filter = ['status']
+    list_select_related = ['product']
+    readonly_fields = ['product', 'source', 'attempts', 'error', 'created', 'updated']
+
+@admin.register(Coupon)
+class CouponAdmin(admin.ModelAdmin):
+    """Custom coupon display in admin panel."""
+    list_display = ['code', 'kind', 'value', 'category', 'min_total', 'usage_limit', 'used', 'active']
+    list_filter = ['kind', 'active']
+    list_select_related = ['category']
+    search_fields = ['code']
+    readonly_fields = ['used', 'created', 'updated']
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    fields = ['product', 'name', 'price', 'quantity']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    """Custom order display in admin panel."""
+    list_display = ['id', 'user', 'status', 'total_price', 'created']
+    list_filter = ['status', 'created']
+    list_select_related = ['user']
+    readonly_fields = ['user', 'coupon', 'discount', 'total_price', 'created', 'updated']
+    inlines = [OrderItemInline]
\ No newline at end of file
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from asgiref.sync import sync_to_async
+
+from rest_framework.mixins import ListModelMixin
+from rest_framework.response import Response
+
+from core.cache import CachedResponseMixin, get_cache, get_response_cache_timeout, stats
+from core.conditional import ConditionalGetMixin
+from core.pagination import KeysetPagination
+
+READ_ACTIONS = ('list', 'retrieve')
+
+class AsyncReadMixin:
+    """
+    Viewset mixin serving `list` and `retrieve` from async views when
+    `ASYNC_VIEWS` is set, for ASGI deployments.
+
+    Rows are fetched with the async ORM and everything else is shared with the
+    sync actions: filtering, pagination, the response cache and the conditional
+    validators. The sync steps (authentication, cache and validator lookups)
+    run together in one thread hop. Other actions run the usual sync view in a
+    thread.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if settings.ASYNC_VIEWS:
+            return cls.as_async_view(view)
+        return view
+
+    @classmethod
+    def as_async_view(cls, sync_view):
+        """Wrap a view returned by `as_view` so its read actions run async."""
+        actions = sync_view.actions
+        if not any(action in READ_ACTIONS for action in actions.values()):
+            return sync_view
+        run_sync = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            method = request.method.lower()
+            action = actions.get('get' if method == 'head' else method)
+            if action not in READ_ACTIONS:
+                return await run_sync(request, *args, **kwargs)
+
+            self = cls(**sync_view.initkwargs)
+            self.action_map = {**actions, 'head': actions['get']}
+            self.request = request
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.__name__ = sync_view.__name__
+        view.__doc__ = sync_view.__doc__
+        view.cls = cls
+        view.initkwargs = sync_view.initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Async counterpart of `dispatch` for the read actions."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if self.action == 'list':
+                response = await self.aread(self.alist, request)
+            else:
+                response = await self.aread(self.aretrieve, request)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aread(self, render, request):
+        """
+        Serve a read action like `ConditionalGetMixin` and `CachedResponseMixin`
+        do, calling the async `render` when there is no 304 or cached response.
+        """
+        conditional = isinstance(self, ConditionalGetMixin)
+        cached = isinstance(self, CachedResponseMixin) and settings.RESPONSE_CACHE_ENABLED
+
+        def lookup():
+            validators = self.get_validators(request) if conditional else (None, None)
+            key = self.get_response_cache_key(request) if cached else None
+            return validators, key, get_cache().get(key) if cached else None
+
+        (etag, last_modified), key, data = await sync_to_async(lookup)()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified) if conditional else None
+        if response is None:
+            if data is not None:
+                stats.record(hit=True)
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+            else:
+                response = await render(request)
+                if cached:
+                    stats.record(hit=False)
+                    if response.status_code == 200:
+                        await get_cache().aset(key, response.data, get_response_cache_timeout())
+                    response['X-Cache'] = 'MISS'
+            if response.status_code != 200:
+                return response
+
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
+
+    async def alist(self, request):
+        """Async `list`, for keyset paginated or unpaginated views."""
+        if self.paginator is not None and not isinstance(self.paginator, KeysetPagination):
+            # Other paginators fetch their page themselves.
+            return await sync_to_async(ListModelMixin.list)(self, request)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page_queryset = self.paginator.get_page_queryset(queryset, request, self)
+            if page_queryset is not None:
+                page = self.paginator.build_page([instance async for instance in page_queryset.aiterator()])
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        instances = [instance async for instance in queryset.aiterator()]
+        return Response(self.get_serializer(instances, many=True).data)
+
+    async def aretrieve(self, request):
+        """Async `retrieve`."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+
+        self.check_object_permissions(request, instance)
+        return Response(self.get_serializer(instance).data)
@@ -0,0 +1,59 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache import get_cache
+
+TOKEN_KEY = 'auth:token:v2:%s'
+# What the permission checks read. Other fields, the password hash included,
+# stay out of the cache and are loaded from the database when first read.
+CACHED_USER_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+def _token_cache_key(key):
+    # Hash the token so raw credentials never end up in the cache.
+    return TOKEN_KEY % hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def evict_tokens(*keys):
+    """Drop the cached users of the given token keys."""
+    get_cache().delete_many([_token_cache_key(key) for key in keys])
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication caching the key to user lookup.
+
+    The id and flags of users are kept in the shared cache for
+    `TOKEN_CACHE_TIMEOUT` seconds. Signals evict them when a token is deleted
+    or its user is saved or deleted, which every process sees on its next
+    request as there is no per-process copy to outlive the eviction.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_cache()
+        cache_key = _token_cache_key(key)
+        entry = cache.get(cache_key)
+        if entry is None:
+            user = self.fetch_user(key)
+            entry = (user._state.db, user.pk, *(getattr(user, field) for field in CACHED_USER_FIELDS))
+            cache.set(cache_key, entry, settings.TOKEN_CACHE_TIMEOUT)
+
+        user = self.build_user(entry)
+        return (user, self.get_token(key, user))
+
+    def build_user(self, entry):
+        """Return a user instance holding the cached fields, deferring the others."""
+        db, pk, *flags = entry
+        model = get_user_model()
+        return model.from_db(db, [model._meta.pk.attname, *CACHED_USER_FIELDS], [pk, *flags])
+
+    def fetch_user(self, key):
+        """Return the active user owning the token, or fail authentication."""
+        user, token = super().authenticate_credentials(key)
+        return user
+
+    def get_token(self, key, user):
+        """Return an unsaved token instance standing in for `request.auth`."""
+        model = self.get_model()
+        return model(key=key, user=user)
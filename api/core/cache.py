@@ -0,0 +1,162 @@
+import hashlib
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.response import Response
+
+from core.instrumentation import get_metrics
+from core.replicas import reading_from_replica
+
+GENERATION_KEY = 'generation:%s'
+RESPONSE_KEY = 'response:%s'
+VALIDATORS_KEY = 'validators:%s'
+
+_batched_models = ContextVar('batched_models', default=None)
+
+def get_cache():
+    """Return the cache backend used for generations and responses."""
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+def get_response_cache_timeout():
+    """Return how long to cache what is rendered now."""
+    if reading_from_replica():
+        return min(settings.RESPONSE_CACHE_TIMEOUT, settings.REPLICA_CACHE_TIMEOUT)
+    return settings.RESPONSE_CACHE_TIMEOUT
+
+def _generation_key(model):
+    return GENERATION_KEY % model._meta.label_lower
+
+def get_generations(models):
+    """Return the current generation of each model, initialising missing ones."""
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # A random starting point means a counter evicted from the cache can
+            # never come back at a value that older response entries were keyed on.
+            cache.add(key, secrets.randbits(48), timeout=None)
+            generations[key] = cache.get(key)
+
+    return [generations[key] for key in keys]
+
+def bump_generation(*models):
+    """Invalidate every cached response depending on the given models."""
+    batched = _batched_models.get()
+    if batched is not None:
+        batched.update(models)
+        return
+
+    cache = get_cache()
+    for model in models:
+        key = _generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, secrets.randbits(48), timeout=None)
+
+@contextmanager
+def batch_invalidation():
+    """
+    Defer the generation bumps made inside the block, including the ones of
+    signals and on_commit callbacks, and bump each model once on exit. Wrap
+    bulk writes in it, around their transaction, to invalidate once per batch.
+    """
+    if _batched_models.get() is not None:
+        yield
+        return
+
+    batched = set()
+    token = _batched_models.set(batched)
+    try:
+        yield
+    finally:
+        _batched_models.reset(token)
+        bump_generation(*batched)
+
+class ResponseCacheStats:
+    """In-process hit/miss counters of the response cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.record_cache(hit)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+stats = ResponseCacheStats()
+
+class CachedResponseMixin:
+    """
+    Viewset mixin caching `list` and `retrieve` responses.
+
+    Entries are keyed on the request and the generation of every model in
+    `cache_dependencies`, so bumping a generation makes all dependent entries
+    unreachable without having to find and delete them.
+    """
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request, template=RESPONSE_KEY):
+        """Return the cache key for the request at the current generations."""
+        parts = [
+            type(self).__module__,
+            type(self).__qualname__,
+            self.action,
+            request.scheme,
+            request.get_host(),
+            request.accepted_renderer.format,
+            repr(sorted(self.kwargs.items())),
+            repr(sorted(request.query_params.lists())),
+            repr(get_generations(self.cache_dependencies)),
+        ]
+        return template % hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def cached_response(self, view, request, *args, **kwargs):
+        """Serve the response from the cache, or call `view` and cache its result."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return view(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            stats.record(hit=True)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        stats.record(hit=False)
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, get_response_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
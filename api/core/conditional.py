@@ -0,0 +1,86 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from core.cache import VALIDATORS_KEY, CachedResponseMixin, get_cache, get_response_cache_timeout
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin adding strong `ETag` and `Last-Modified` headers to `list`
+    and `retrieve`, and answering matching conditional requests with 304.
+
+    Validators are derived from `max()` of `conditional_fields` and the row
+    count of the filtered queryset, so checking them costs one aggregate query
+    (none when the view also caches responses) and no serialization.
+
+    Lists only get an `ETag`: deleting a row changes their count but not the
+    latest update time, so `If-Modified-Since` would keep matching.
+    """
+    conditional_fields = ('updated',)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_conditional_queryset(self):
+        """Return the queryset the response is rendered from."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        return queryset
+
+    def compute_validators(self, request):
+        """Return `(etag, last_modified)` for the request, or `(None, None)` if there is nothing to render."""
+        aggregates = {f'max_{i}': Max(field) for i, field in enumerate(self.conditional_fields)}
+        values = self.get_conditional_queryset().order_by().aggregate(count=Count('pk'), **aggregates)
+        if self.action == 'retrieve' and not values['count']:
+            return None, None
+
+        timestamps = [values[f'max_{i}'] for i in range(len(self.conditional_fields))]
+        parts = [
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(values['count']),
+        ] + [timestamp.isoformat() if timestamp else '' for timestamp in timestamps]
+        etag = '"%s"' % hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+        timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+        last_modified = int(max(timestamps).timestamp()) if timestamps and self.action != 'list' else None
+
+        return etag, last_modified
+
+    def get_validators(self, request):
+        """Return the validators, cached next to the responses when the view caches them."""
+        if not isinstance(self, CachedResponseMixin) or not settings.RESPONSE_CACHE_ENABLED:
+            return self.compute_validators(request)
+
+        cache = get_cache()
+        key = self.get_response_cache_key(request, VALIDATORS_KEY)
+        validators = cache.get(key)
+        if validators is None:
+            validators = self.compute_validators(request)
+            cache.set(key, validators, get_response_cache_timeout())
+
+        return validators
+
+    def conditional_response(self, view, request, *args, **kwargs):
+        """Return 304 if the client copy is current, otherwise call `view`."""
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
@@ -0,0 +1,66 @@
+import codecs
+import io
+
+from django.conf import settings
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Dates and times go through the DRF encoder, which spells UTC as `Z`.
+DUMPS_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` rendering with orjson when it is installed, for the same
+    bytes as the DRF renderer. Types orjson does not know natively, like
+    `Decimal` and lazy strings, are converted by the DRF encoder, and data
+    orjson rejects (like integers over 64 bits) or output it cannot produce
+    (indented, ASCII only or non compact JSON) is rendered by DRF.
+
+    Floats are the one difference: orjson spells those below 1e-4 or from 1e16
+    up without the padded exponent (`1e16`, not `1e+16`) and renders NaN as
+    null rather than failing. Serializers render decimals as strings, so the
+    responses of this API hold no floats.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=DUMPS_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Let the stdlib render it, or fail the way DRF does.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped like DRF does, so the output stays a strict javascript subset.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+class FastJSONParser(JSONParser):
+    """
+    `JSONParser` parsing with orjson when it is installed. Invalid documents,
+    and the integers over 64 bits orjson rejects, are parsed again by DRF so
+    errors and results are the same.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        content = stream.read()
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(content), media_type, parser_context)
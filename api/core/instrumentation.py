@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from asgiref.sync import sync_to_async
+
+from core import metrics as request_metrics
+
+logger = logging.getLogger(__name__)
+
+_metrics = ContextVar('request_metrics', default=None)
+
+class RequestMetrics:
+    """Timings and counters of one request."""
+    __slots__ = ('started', 'queries', 'sql_time', 'serializer_time', 'cache_hits', 'cache_misses', '_serializing')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._serializing = False
+
+    def record_query(self, execute, sql, params, many, context):
+        """`execute_wrapper` counting the queries and their time."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - start
+
+    def record_cache(self, hit):
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+def get_metrics():
+    """Return the metrics of the current request, or None outside an instrumented request."""
+    return _metrics.get()
+
+@contextmanager
+def time_serializer():
+    """Add the time spent in the block to the serializer time of the current request."""
+    metrics = _metrics.get()
+    if metrics is None or metrics._serializing:
+        # Nested serializers are part of the outer one's time.
+        yield
+        return
+
+    metrics._serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+        metrics._serializing = False
+
+class TimedSerializerMixin:
+    """Serializer mixin counting `to_representation` in the request serializer time."""
+
+    def to_representation(self, instance):
+        with time_serializer():
+            return super().to_representation(instance)
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+class InstrumentationMiddleware:
+    """
+    Record the wall time, SQL query count and time, serializer time and
+    response size of each request. They are sent in a `Server-Timing` header
+    and logged as one JSON line, at warning level when the request goes over
+    `INSTRUMENTATION_QUERY_BUDGET` queries or `INSTRUMENTATION_TIME_BUDGET`
+    milliseconds. Requests to the routes of `core.metrics.NAMESPACES` are also
+    aggregated into the `/metrics` histograms.
+
+    Queries are counted with `execute_wrapper` on the connections of the
+    request thread. Under ASGI the wrappers are installed from the thread the
+    async ORM and `sync_to_async` run the request's queries in, so the chain
+    stays async and async views are not run through `async_to_sync`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function, as `MiddlewareMixin` does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not settings.INSTRUMENTATION_ENABLED:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        stack = ExitStack()
+        try:
+            await sync_to_async(self.wrap_connections)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _metrics.reset(token)
+
+        return self.finish(request, response, metrics)
+
+    def wrap_connections(self, stack, metrics):
+        """Count the queries of the connections of the current thread until the stack is closed."""
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        if settings.INSTRUMENTATION_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={_milliseconds(metrics.sql_time)};desc="{metrics.queries} queries"',
+                f'serializer;dur={_milliseconds(metrics.serializer_time)}',
+                f'total;dur={_milliseconds(duration)}',
+            ])
+        self.log(request, response, metrics, duration)
+        self.observe(request, response, metrics, duration)
+        return response
+
+    def observe(self, request, response, metrics, duration):
+        match = request.resolver_match
+        if not settings.METRICS_ENABLED or match is None or not match.namespaces:
+            return
+        if match.namespaces[0] not in request_metrics.NAMESPACES:
+            return
+
+        request_metrics.observe_request(
+            match.view_name,
+            response.status_code,
+            duration,
+            metrics.queries,
+            metrics.cache_hits,
+            metrics.cache_misses,
+        )
+
+    def log(self, request, response, metrics, duration):
+        over_budget = []
+        if metrics.queries > settings.INSTRUMENTATION_QUERY_BUDGET:
+            over_budget.append('queries')
+        if duration * 1000 > settings.INSTRUMENTATION_TIME_BUDGET:
+            over_budget.append('time')
+
+        level = logging.WARNING if over_budget else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match is not None else None,
+            'status': response.status_code,
+            'duration_ms': _milliseconds(duration),
+            'queries': metrics.queries,
+            'sql_ms': _milliseconds(metrics.sql_time),
+            'serializer_ms': _milliseconds(metrics.serializer_time),
+            'size': None if response.streaming else len(response.content),
+            'over_budget': over_budget,
+        }
+        logger.log(level, json.dumps(record), extra={'metrics': record})
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+import time
+from contextlib import nullcontext
+
+from shop.export import CHUNK_SIZE, EXPORT_FORMATS, export_catalog
+from shop.models import Product
+
+class Command(BaseCommand):
+    """Django command exporting the product catalogue."""
+    help = 'Write every product as CSV or JSON lines, in the format read by import_catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help='File to write, `-` writes standard output.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        start = time.perf_counter()
+        _, content = export_catalog(Product.objects.all(), options['format'], chunk_size=options['chunk_size'])
+
+        output = options['output']
+        stream = nullcontext(self.stdout) if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+        with stream as file:
+            for chunk in content:
+                file.write(chunk)
+
+        if output != '-':
+            self.stderr.write(f'Exported the catalogue to {output} in {time.perf_counter() - start:.1f}s.')
@@ -0,0 +1,192 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, IntegrityError, transaction
+from django.utils.text import slugify
+
+import csv
+import json
+import sys
+import time
+from contextlib import nullcontext
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from core.cache import bump_generation
+from shop.models import Category, Product
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', 'off'}
+UPDATE_FIELDS = ['name', 'category_id', 'price', 'available', 'description', 'updated']
+# Checked while parsing, so an oversized value is reported with its line rather than failing the write.
+MAX_LENGTHS = {
+    'name': Product._meta.get_field('name').max_length,
+    'slug': Product._meta.get_field('slug').max_length,
+    'category': Category._meta.get_field('slug').max_length,
+    'category_name': Category._meta.get_field('name').max_length,
+}
+PRICE_FIELD = Product._meta.get_field('price')
+
+class Command(BaseCommand):
+    """Django command importing products from a CSV or JSON lines file."""
+    help = (
+        'Create or update products from a CSV or JSON lines file. Rows have the '
+        'name, slug, category, price, description, available and category_name '
+        'fields; products are matched on slug and missing categories are created. '
+        'A row describes the whole product, so missing optional values are reset '
+        'to their defaults.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, `-` reads standard input.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows upserted per transaction.')
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        path = options['path']
+        format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.created_categories = 0
+        imported = 0
+        start = time.perf_counter()
+
+        stream = nullcontext(sys.stdin) if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            with stream as file:
+                rows = self.read_csv(file) if format == 'csv' else self.read_jsonl(file)
+                while batch := list(islice(rows, batch_size)):
+                    imported += self.import_batch(batch)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(self.throughput(imported, start))
+        finally:
+            # Bulk writes skip the signals, so invalidate cached responses once for the whole import.
+            if imported:
+                bump_generation(Product, Category)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} products, created {self.created_categories} categories. {self.throughput(imported, start)}'
+        ))
+
+    def throughput(self, rows, start):
+        elapsed = time.perf_counter() - start
+        return f'{rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s).'
+
+    def read_csv(self, file):
+        """Yield `(line, row)` pairs of a CSV file with a header row."""
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+
+    def read_jsonl(self, file):
+        """Yield `(line, row)` pairs of a JSON lines file."""
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as error:
+                raise CommandError(f'Line {line}: {error}')
+            if not isinstance(row, dict):
+                raise CommandError(f'Line {line}: expected an object.')
+            yield line, row
+
+    def import_batch(self, batch):
+        """Upsert a batch of rows in one transaction and return the number of products written."""
+        parsed = []
+        for line, row in batch:
+            try:
+                parsed.append(self.parse_row(row))
+            except ValueError as error:
+                raise CommandError(f'Line {line}: {error}')
+
+        first, last = batch[0][0], batch[-1][0]
+        try:
+            with transaction.atomic():
+                self.create_categories(parsed)
+                # Later rows win, as one upsert cannot touch the same row twice.
+                products = {}
+                for fields, category_slug, _ in parsed:
+                    products[fields['slug']] = Product(category_id=self.categories[category_slug], **fields)
+                Product.objects.bulk_create(
+                    products.values(),
+                    update_conflicts=True,
+                    unique_fields=['slug'],
+                    update_fields=UPDATE_FIELDS,
+                )
+                Product.objects.filter(slug__in=products.keys()).update_search_vector()
+        except (ArithmeticError, DataError, IntegrityError, ValueError) as error:
+            raise CommandError(f'Lines {first}-{last}: {error}')
+
+        return len(products)
+
+    def parse_row(self, row):
+        """Return the product fields, category slug and category name of a row."""
+        name = self.get_text(row, 'name')
+        category_slug = self.get_text(row, 'category')
+        price = self.get_price(row, 'price')
+        fields = {
+            'name': name,
+            'slug': self.get_text(row, 'slug', required=False) or slugify(name),
+            'price': price,
+            'available': self.get_bool(row, 'available'),
+            'description': self.get_text(row, 'description', required=False),
+        }
+
+        return fields, category_slug, self.get_text(row, 'category_name', required=False) or category_slug
+
+    def get_text(self, row, field, required=True):
+        value = row.get(field)
+        value = '' if value is None else str(value).strip()
+        if required and not value:
+            raise ValueError(f'missing {field}.')
+        if field in MAX_LENGTHS and len(value) > MAX_LENGTHS[field]:
+            raise ValueError(f'{field} longer than {MAX_LENGTHS[field]} characters.')
+        return value
+
+    def get_price(self, row, field):
+        # Rounded like the database column is, then checked to fit it.
+        integer_digits = PRICE_FIELD.max_digits - PRICE_FIELD.decimal_places
+        try:
+            price = Decimal(self.get_text(row, field)).quantize(Decimal(1).scaleb(-PRICE_FIELD.decimal_places))
+        except InvalidOperation:
+            price = None
+        if price is None or not price.is_finite() or price < 0 or price.adjusted() >= integer_digits:
+            raise ValueError(f'invalid {field} {row[field]!r}.')
+        return price
+
+    def get_bool(self, row, field):
+        value = row.get(field)
+        if value is None or value == '':
+            return True
+        if isinstance(value, bool):
+            return value
+        value = str(value).strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        raise ValueError(f'invalid {field} {row[field]!r}.')
+
+    def create_categories(self, parsed):
+        """Create the categories of the batch missing from the slug to id map."""
+        missing = {}
+        for _, category_slug, category_name in parsed:
+            if category_slug not in self.categories:
+                missing.setdefault(category_slug, category_name)
+        if not missing:
+            return
+
+        Category.objects.bulk_create(
+            [Category(slug=slug, name=name) for slug, name in missing.items()],
+            ignore_conflicts=True,
+        )
+        created = dict(Category.objects.filter(slug__in=missing).values_list('slug', 'id'))
+        unresolved = set(missing) - set(created)
+        if unresolved:
+            raise ValueError(f'could not create categories {sorted(unresolved)}, their names are probably taken.')
+
+        self.categories.update(created)
+        self.created_categories += len(created)
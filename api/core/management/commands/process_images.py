@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from shop.jobs import process_image_jobs
+from shop.models import ProductImageJob
+
+class Command(BaseCommand):
+    """Django command processing the queued product image jobs."""
+    help = 'Generate the resized variants of uploaded product images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Rendering processes, 0 renders in this process.')
+        parser.add_argument('--batch', type=int, default=10, help='Jobs claimed at a time.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--stale-after', type=int, default=600, help='Seconds after which processing jobs are requeued.')
+        parser.add_argument('--max-attempts', type=int, default=3)
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        executor = None
+        if options['workers'] > 0:
+            # Children must not inherit the parent's database connections.
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=options['workers'])
+
+        processed = 0
+        try:
+            while True:
+                ProductImageJob.objects.requeue_stale(timedelta(seconds=options['stale_after']), options['max_attempts'])
+                claimed = process_image_jobs(limit=options['batch'], executor=executor)
+                processed += claimed
+                if claimed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} image jobs.'))
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+import random
+import time
+from decimal import Decimal
+from itertools import islice
+
+from core.cache import bump_generation
+from shop.models import Category, Product
+
+CATEGORY_PREFIX = 'seed-category-'
+PRODUCT_PREFIX = 'seed-product-'
+WORDS = (
+    'linen', 'wool', 'cotton', 'silk', 'denim', 'leather', 'shirt', 'coat',
+    'jacket', 'scarf', 'hat', 'boots', 'dress', 'skirt', 'sweater', 'belt',
+    'blue', 'red', 'green', 'black', 'white', 'grey', 'light', 'warm',
+)
+
+class Command(BaseCommand):
+    """Django command filling the catalogue with synthetic products."""
+    help = (
+        'Create a synthetic catalogue of categories and products for load tests '
+        'and benchmarks. The data only depends on the options, so runs with the '
+        'same options can be compared; existing seeded rows are left as they are.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Number of products.')
+        parser.add_argument('--categories', type=int, default=20, help='Number of categories the products are spread over.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated values.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows inserted per query.')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded categories and products first.')
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        products, categories, batch_size = options['products'], options['categories'], options['batch_size']
+        if products < 0 or categories < 1 or batch_size < 1:
+            raise CommandError('--categories and --batch-size must be positive and --products not negative.')
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            if options['clear']:
+                Product.objects.filter(slug__startswith=PRODUCT_PREFIX).delete()
+                Category.objects.filter(slug__startswith=CATEGORY_PREFIX).delete()
+
+            slugs = [f'{CATEGORY_PREFIX}{i:04d}' for i in range(categories)]
+            Category.objects.bulk_create(
+                [Category(name=f'Seed category {i:04d}', slug=slug) for i, slug in enumerate(slugs)],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            category_ids = dict(Category.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+            if len(category_ids) != categories:
+                raise CommandError('Could not create the seed categories, their names are probably taken.')
+
+            rows = self.generate_products(products, [category_ids[slug] for slug in slugs], options['seed'])
+            while batch := list(islice(rows, batch_size)):
+                Product.objects.bulk_create(batch, ignore_conflicts=True)
+            Product.objects.filter(slug__startswith=PRODUCT_PREFIX).update_search_vector()
+
+        # Bulk writes skip the signals, so invalidate cached responses once for the whole seed.
+        bump_generation(Product, Category)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {products} products in {categories} categories in {elapsed:.1f}s.'
+        ))
+
+    def generate_products(self, count, category_ids, seed):
+        """Yield `count` products with values drawn from a generator seeded with `seed`."""
+        rng = random.Random(seed)
+        for i in range(count):
+            words = rng.sample(WORDS, 3)
+            yield Product(
+                category_id=category_ids[i % len(category_ids)],
+                name=f'{" ".join(words).capitalize()} {i:06d}',
+                slug=f'{PRODUCT_PREFIX}{i:06d}',
+                description=' '.join(rng.choices(WORDS, k=12)),
+                price=Decimal(rng.randrange(100, 50000)) / 100,
+                available=rng.random() < 0.9,
+                stock=rng.randrange(0, 500),
+            )
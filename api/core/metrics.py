@@ -0,0 +1,256 @@
+import contextlib
+import fcntl
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+
+# Only the routes of these url namespaces are measured.
+NAMESPACES = ('shop', 'cart', 'user')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+
+FAMILIES = {
+    'api_request_duration_seconds': ('histogram', 'Request latency in seconds by url name.', DURATION_BUCKETS),
+    'api_request_queries': ('histogram', 'Database queries per request by url name.', QUERY_BUCKETS),
+    'api_requests_total': ('counter', 'Requests by url name and status code.', None),
+    'api_response_cache_requests_total': ('counter', 'Response cache lookups by url name and result.', None),
+}
+
+# The values of the workers that exited, see `mark_process_dead`.
+AGGREGATE_FILE = 'aggregate.db'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class MmapValues:
+    """
+    Float values keyed by string in a memory mapped file written by a single
+    process, so writes need no lock between processes. Entries are appended as
+    the key length, the padded key and an 8-byte aligned double, and the
+    header holds the number of bytes in use, written after each new entry so
+    readers never see a partial one.
+    """
+    INITIAL_SIZE = 1 << 16
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._positions = {}
+        self._used = struct.unpack_from('i', self._map, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            struct.pack_into('i', self._map, 0, self._used)
+        for key, _, position in self._entries(self._map, self._used):
+            self._positions[key] = position
+
+    @staticmethod
+    def _entries(data, used):
+        position = 8
+        while position < used:
+            length = struct.unpack_from('i', data, position)[0]
+            key_end = position + 4 + length
+            value_position = key_end + (-key_end % 8)
+            key = bytes(data[position + 4:key_end]).decode('utf-8')
+            yield key, struct.unpack_from('d', data, value_position)[0], value_position
+            position = value_position + 8
+
+    @classmethod
+    def read(cls, path):
+        """Return the `(key, value)` pairs of a file written by any process."""
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < 8:
+            return []
+        return [(key, value) for key, value, _ in cls._entries(data, struct.unpack_from('i', data, 0)[0])]
+
+    def _add_entry(self, key):
+        encoded = key.encode('utf-8')
+        key_end = self._used + 4 + len(encoded)
+        entry = struct.pack('i', len(encoded)) + encoded + b'\0' * (-key_end % 8) + struct.pack('d', 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        struct.pack_into('i', self._map, 0, self._used)
+        self._positions[key] = self._used - 8
+        return self._used - 8
+
+    def inc(self, key, amount):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._add_entry(key)
+        struct.pack_into('d', self._map, position, struct.unpack_from('d', self._map, position)[0] + amount)
+
+    def items(self):
+        return [(key, value) for key, value, _ in self._entries(self._map, self._used)]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+class LocalValues:
+    """Float values keyed by string, for a single process."""
+
+    def __init__(self):
+        self._values = {}
+
+    def inc(self, key, amount):
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self):
+        return list(self._values.items())
+
+_lock = threading.Lock()
+_store = None
+_store_owner = None
+
+def get_store():
+    """
+    Return the values of this process, kept in a file of `METRICS_DIR` when it
+    is set so the values of every worker process can be read and summed.
+    """
+    global _store, _store_owner
+    owner = (os.getpid(), settings.METRICS_DIR)
+    if _store_owner != owner:
+        if settings.METRICS_DIR:
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            _store = MmapValues(os.path.join(settings.METRICS_DIR, f'{os.getpid()}.db'))
+        else:
+            _store = LocalValues()
+        _store_owner = owner
+    return _store
+
+def reset():
+    """Drop the values of this process."""
+    global _store, _store_owner
+    with _lock:
+        _store = _store_owner = None
+
+@contextlib.contextmanager
+def _locked(directory, operation):
+    """Hold a lock on the metrics directory, shared between readers."""
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        fcntl.flock(descriptor, operation)
+        yield
+    finally:
+        os.close(descriptor)
+
+def mark_process_dead(pid, directory):
+    """
+    Add the values of a worker that exited to the aggregate file of the
+    `directory` and drop its file, so recycled workers don't leave one file
+    each behind. Every value is a counter, so they are summed. Called from the
+    gunicorn master, the only writer of the aggregate file.
+    """
+    path = os.path.join(directory, f'{pid}.db')
+    if not os.path.exists(path):
+        return
+
+    # Scrapes wait for the merge, so they never count the values twice or miss them.
+    with _locked(directory, fcntl.LOCK_EX):
+        aggregate = MmapValues(os.path.join(directory, AGGREGATE_FILE))
+        try:
+            for key, value in MmapValues.read(path):
+                aggregate.inc(key, value)
+        finally:
+            aggregate.close()
+        os.remove(path)
+
+def _key(name, **labels):
+    return json.dumps([name, sorted(labels.items())])
+
+def _observe(store, name, buckets, value, **labels):
+    bound = next((str(bucket) for bucket in buckets if value <= bucket), '+Inf')
+    store.inc(_key(f'{name}_bucket', le=bound, **labels), 1)
+    store.inc(_key(f'{name}_sum', **labels), value)
+    store.inc(_key(f'{name}_count', **labels), 1)
+
+def observe_request(view, status, duration, queries, cache_hits=0, cache_misses=0):
+    """Record a request of the `view` url name."""
+    with _lock:
+        store = get_store()
+        _observe(store, 'api_request_duration_seconds', DURATION_BUCKETS, duration, view=view)
+        _observe(store, 'api_request_queries', QUERY_BUCKETS, queries, view=view)
+        store.inc(_key('api_requests_total', view=view, status=str(status)), 1)
+        if cache_hits:
+            store.inc(_key('api_response_cache_requests_total', view=view, result='hit'), cache_hits)
+        if cache_misses:
+            store.inc(_key('api_response_cache_requests_total', view=view, result='miss'), cache_misses)
+
+def collect():
+    """Return the values summed over every process, keyed by `(name, labels)`."""
+    if settings.METRICS_DIR:
+        with _locked(settings.METRICS_DIR, fcntl.LOCK_SH):
+            pairs = [pair for path in sorted(glob.glob(os.path.join(settings.METRICS_DIR, '*.db'))) for pair in MmapValues.read(path)]
+    else:
+        with _lock:
+            pairs = get_store().items()
+
+    values = {}
+    for key, value in pairs:
+        name, labels = json.loads(key)
+        key = (name, tuple(tuple(label) for label in labels))
+        values[key] = values.get(key, 0.0) + value
+    return values
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def _sample(name, labels, value):
+    text = ','.join(f'{label}="{_escape(label_value)}"' for label, label_value in labels)
+    return f'{name}{{{text}}} {float(value)!r}'
+
+def render():
+    """Return the metrics in the Prometheus text exposition format."""
+    values = collect()
+    lines = []
+    for family, (kind, help_text, buckets) in FAMILIES.items():
+        lines += [f'# HELP {family} {help_text}', f'# TYPE {family} {kind}']
+        if kind == 'counter':
+            lines += [_sample(family, labels, value) for (name, labels), value in sorted(values.items()) if name == family]
+            continue
+
+        series = sorted(labels for name, labels in values if name == f'{family}_count')
+        for labels in series:
+            cumulative = 0.0
+            for bound in [str(bucket) for bucket in buckets] + ['+Inf']:
+                cumulative += values.get((f'{family}_bucket', tuple(sorted(labels + (('le', bound),)))), 0.0)
+                lines.append(_sample(f'{family}_bucket', labels + (('le', bound),), cumulative))
+            lines.append(_sample(f'{family}_sum', labels, values[(f'{family}_sum', labels)]))
+            lines.append(_sample(f'{family}_count', labels, values[(f'{family}_count', labels)]))
+
+    lines += [
+        '# HELP api_response_cache_hit_ratio Share of response cache lookups served from the cache by url name.',
+        '# TYPE api_response_cache_hit_ratio gauge',
+    ]
+    lookups = {}
+    for (name, labels), value in values.items():
+        if name == 'api_response_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['view'], (0.0, 0.0))
+            lookups[labels['view']] = (hits + (value if labels['result'] == 'hit' else 0.0), total + value)
+    for view, (hits, total) in sorted(lookups.items()):
+        lines.append(_sample('api_response_cache_hit_ratio', (('view', view),), hits / total))
+
+    return '\n'.join(lines) + '\n'
+
+def metrics_view(request):
+    """Expose the request metrics of every worker process to Prometheus."""
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,166 @@
+import datetime
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+class PositionEncoder(DjangoJSONEncoder):
+    """JSON encoder keeping the microseconds that DjangoJSONEncoder drops, as keyset comparisons need them."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the full queryset ordering.
+
+    DRF's cursor pagination only keys on the first ordering field and falls back
+    to an OFFSET for duplicates. This one compares the whole ordering tuple
+    (always ending with `id` as a tiebreaker), so every page is a single indexed
+    range scan no matter how deep the client pages.
+    """
+    page_size = settings.PAGINATION_PAGE_SIZE
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    tiebreaker = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.build_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Return the sliced queryset of the requested page plus one extra row."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*[self._flip(field) for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            queryset = queryset.filter(self._get_keyset_filter(position, reverse))
+
+        return queryset[:self.page_size + 1]
+
+    def build_page(self, results):
+        """Turn fetched rows into the page and compute the neighbouring cursors."""
+        reverse, position = self.cursor if self.cursor is not None else (False, None)
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+
+        if self.page:
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            self.next_position = self.previous_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Return the queryset ordering, falling back to the model ordering, with an `id` tiebreaker."""
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = list(queryset.model._meta.ordering)
+        ordering = ['id' if field.lstrip('-') == 'pk' else field for field in ordering]
+        if self.tiebreaker not in [field.lstrip('-') for field in ordering]:
+            # Follow the direction of the leading field, so one index scan can serve both.
+            descending = ordering and ordering[0].startswith('-')
+            ordering.append('-' + self.tiebreaker if descending else self.tiebreaker)
+
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return self.encode_cursor((False, self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        return self.encode_cursor((True, self.previous_position))
+
+    def decode_cursor(self, request):
+        """Decode the cursor into a `(reverse, position)` pair."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            data = json.loads(urlsafe_b64decode((encoded + padding).encode('ascii')))
+            reverse, position = bool(data['r']), data['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, position
+
+    def encode_cursor(self, cursor):
+        """Encode a `(reverse, position)` pair into the page url."""
+        reverse, position = cursor
+        data = json.dumps({'r': int(reverse), 'p': position}, cls=PositionEncoder, separators=(',', ':'))
+        encoded = urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            return [instance[field] for field in fields]
+        return [getattr(instance, field) for field in fields]
+
+    def _get_keyset_filter(self, position, reverse):
+        """
+        Build `(a, b, c) > (x, y, z)` as `a > x OR (a = x AND b > y) OR ...`,
+        with the comparison flipped for descending fields and reverse cursors.
+        """
+        conditions = []
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            name = field.lstrip('-')
+            equal = {f.lstrip('-'): value for f, value in zip(self.ordering[:i], position)}
+            lookup = '%s__%s' % (name, 'lt' if descending else 'gt')
+            conditions.append(Q(**equal, **{lookup: position[i]}))
+
+        return reduce(or_, conditions)
+
+    def _flip(self, field):
+        return field[1:] if field.startswith('-') else '-' + field
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from rest_framework.permissions import SAFE_METHODS
+
+_read_alias = ContextVar('read_alias', default=None)
+# Only the catalogue is read from the replica. Users, tokens and sessions are
+# read on the primary even inside `use_replica`, so authentication never
+# caches or accepts what a lagging replica still holds.
+REPLICA_APP_LABELS = {'shop'}
+
+def get_replica():
+    """Return the alias reads may be sent to, or None when no replica is configured."""
+    alias = settings.REPLICA_DATABASE
+    return alias if alias in settings.DATABASES else None
+
+@contextmanager
+def use_replica():
+    """Send the reads made inside the block to the replica, if there is one."""
+    token = _read_alias.set(get_replica())
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+def reading_from_replica():
+    """Return whether reads are currently sent to the replica."""
+    return _read_alias.get() is not None
+
+def is_pinned(request):
+    """Return whether the client wrote recently enough to be kept on the primary."""
+    try:
+        return float(request.COOKIES[settings.REPLICA_PIN_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+def pin(response):
+    """Keep the client on the primary for `REPLICA_PIN_SECONDS`, so it reads its own writes."""
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(
+        settings.REPLICA_PIN_COOKIE,
+        str(int(time.time()) + seconds),
+        max_age=seconds,
+        httponly=True,
+        samesite='Lax',
+    )
+
+class ReplicaRouter:
+    """
+    Database router sending the catalogue reads made inside `use_replica` to
+    the replica, and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APP_LABELS:
+            return None
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        databases = {'default', get_replica()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+class ReplicaReadMixin:
+    """
+    Viewset mixin serving safe-method requests from the replica, unless the
+    client is pinned to the primary after a write.
+    """
+
+    def use_replica(self, request):
+        return request.method in SAFE_METHODS and not is_pinned(request) and get_replica() is not None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.use_replica(request):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        if not self.use_replica(request):
+            return await super().adispatch(request, *args, **kwargs)
+        with use_replica():
+            return await super().adispatch(request, *args, **kwargs)
+
+@sync_and_async_middleware
+def replica_pin_middleware(get_response):
+    """Pin the client to the primary after every successful write."""
+
+    def process_response(request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and get_replica() is not None:
+            pin(response)
+        return response
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            return process_response(request, await get_response(request))
+    else:
+        def middleware(request):
+            return process_response(request, get_response(request))
+
+    return middleware
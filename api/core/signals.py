@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import evict_tokens
+
+def _evict(keys):
+    evict_tokens(*keys)
+    # Evict again once committed, so a request that cached the old row before
+    # the commit became visible cannot keep it.
+    transaction.on_commit(lambda: evict_tokens(*keys))
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def evict_token(sender, instance, **kwargs):
+    """Evict a token when it is deleted or rewritten."""
+    _evict([instance.key])
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """
+    Evict the tokens of a user on every update, so deactivation, `is_staff`
+    changes and profile edits are seen by the next request. Deleting a user
+    cascades to its token, which is evicted by `evict_token`.
+    """
+    if created:
+        return
+
+    keys = list(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+    if keys:
+        _evict(keys)
@@ -0,0 +1,138 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import CachedTokenAuthentication, _token_cache_key, evict_tokens
+
+ME_URL = reverse('user:me')
+
+def create_user(**params):
+    """Create and return a new user."""
+    defaults = {'email': 'test@example.com', 'first_name': 'John', 'last_name': 'Doe', 'password': 'testpass123'}
+    defaults.update(params)
+    return get_user_model().objects.create_user(**defaults)
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Test authenticating with cached tokens.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_requests_skip_the_database(self):
+        """Test only the first request looks the token up."""
+        self.client.get(ME_URL)
+
+        # The profile itself is read from the database.
+        with self.assertNumQueries(1):
+            response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected and not cached."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(cache.get(_token_cache_key('invalid')))
+
+    def test_token_delete_evicts(self):
+        """Test a deleted token stops authenticating immediately."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+
+        response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_eviction_seen_by_other_processes(self):
+        """Test a deactivation is seen at once, as no process keeps a copy of the cached user."""
+        self.client.get(ME_URL)
+
+        # Deactivated without the signals, then evicted as another process would.
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        evict_tokens(self.token.key)
+
+        response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_deactivation_evicts(self):
+        """Test a deactivated user is rejected on the next request."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_staff_change_evicts(self):
+        """Test granting staff status is seen by the next request."""
+        self.client.get(reverse('shop:category-list'))
+
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.post(reverse('shop:category-list'), {'name': 'shirts', 'slug': 'shirts'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_user_delete_evicts(self):
+        """Test a deleted user's token stops authenticating."""
+        self.client.get(ME_URL)
+
+        self.user.delete()
+
+        response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_stale(self):
+        """Test an update through the API is returned by the next request."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'first_name': 'Jane'})
+
+        response = self.client.get(ME_URL)
+        self.assertEqual(response.data['first_name'], 'Jane')
+
+    def test_cache_holds_no_credentials(self):
+        """Test only the user id and flags are cached, not the password hash."""
+        self.client.get(ME_URL)
+
+        entry = cache.get(_token_cache_key(self.token.key))
+        self.assertNotIn(self.user.password, entry)
+        self.assertIn(self.user.pk, entry)
+
+    def test_uncached_fields_loaded(self):
+        """Test fields of the user that are not cached are read when used."""
+        self.client.get(ME_URL)
+
+        user, token = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+        self.assertFalse(user.is_staff)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+
+    def test_profile_update_keeps_other_changes(self):
+        """Test a profile update does not write back a stale cached user."""
+        self.client.get(ME_URL)
+        # Changed elsewhere without the signals, so the cached entry is stale.
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True, password='changed')
+
+        response = self.client.patch(ME_URL, {'first_name': 'Jane'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.is_staff, self.user.password), ('Jane', True, 'changed'))
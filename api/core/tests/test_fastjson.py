@@ -0,0 +1,153 @@
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+import datetime
+import io
+import uuid
+import zoneinfo
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from core import fastjson
+from shop import models
+from shop.serializers import ProductDetailSerializer, ProductSerializer
+from shop.tests.test_views import create_category, create_product, detail_url
+
+PAYLOAD = {
+    'decimal': Decimal('19.99'),
+    'whole': Decimal('20'),
+    'aware': datetime.datetime(2022, 10, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'offset': datetime.datetime(2022, 10, 1, 12, 30, tzinfo=zoneinfo.ZoneInfo('Europe/Warsaw')),
+    'naive': datetime.datetime(2022, 10, 1, 12, 30),
+    'date': datetime.date(2022, 10, 1),
+    'time': datetime.time(12, 30, 15),
+    'delta': datetime.timedelta(hours=1, seconds=1),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('Not found.'),
+    'text': 'zażółć "gęślą" \\ jaźń \n\t\x00\x1f\x7f \u2028 \u2029 \U0001f600',
+    'numbers': [0, -1, 2 ** 63 - 1, 1.5, 0.1, True, False, None],
+    'nested': ReturnDict([('b', 1), ('a', (1, 2))], serializer=None),
+    1: 'integer key',
+    None: 'null key',
+}
+
+def render_drf(data, accepted_media_type=None, renderer_context=None):
+    return JSONRenderer().render(data, accepted_media_type, renderer_context)
+
+def render_fast(data, accepted_media_type=None, renderer_context=None):
+    return fastjson.FastJSONRenderer().render(data, accepted_media_type, renderer_context)
+
+def parse_fast(content, **parser_context):
+    return fastjson.FastJSONParser().parse(io.BytesIO(content), parser_context=parser_context)
+
+@skipIf(fastjson.orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer output is the DRF renderer output."""
+
+    def test_same_output(self):
+        """Test decimals, dates, lazy strings and escapes are rendered like DRF does."""
+        self.assertEqual(render_fast(PAYLOAD), render_drf(PAYLOAD))
+
+    def test_uses_orjson(self):
+        """Test the data is rendered by orjson."""
+        with patch.object(fastjson.orjson, 'dumps', wraps=fastjson.orjson.dumps) as dumps:
+            render_fast(PAYLOAD)
+
+        dumps.assert_called_once()
+
+    def test_fallbacks(self):
+        """Test what orjson rejects is rendered by DRF, or fails like it does with DRF."""
+        self.assertEqual(render_fast({'big': 2 ** 64}), render_drf({'big': 2 ** 64}))
+        for data in ({'surrogate': '\ud800'}, {gettext_lazy('key'): 1}, {'object': object()}):
+            with self.subTest(data=data):
+                with self.assertRaises(Exception) as drf:
+                    render_drf(data)
+                with self.assertRaises(type(drf.exception)):
+                    render_fast(data)
+
+    def test_indent(self):
+        """Test indented output is rendered by DRF."""
+        self.assertEqual(render_fast(PAYLOAD, 'application/json; indent=4'), render_drf(PAYLOAD, 'application/json; indent=4'))
+        self.assertEqual(render_fast(PAYLOAD, renderer_context={'indent': 2}), render_drf(PAYLOAD, renderer_context={'indent': 2}))
+
+    def test_no_data(self):
+        """Test no data renders as an empty body."""
+        self.assertEqual(render_fast(None), b'')
+
+    def test_stdlib_fallback(self):
+        """Test the renderer works without orjson."""
+        with patch.object(fastjson, 'orjson', None):
+            self.assertEqual(render_fast(PAYLOAD), render_drf(PAYLOAD))
+
+@skipIf(fastjson.orjson is None, 'orjson is not installed')
+class FastJSONParserTests(SimpleTestCase):
+    """Test the orjson parser results and errors are the DRF parser ones."""
+
+    def assertSameParse(self, content, **parser_context):
+        drf = JSONParser().parse(io.BytesIO(content), parser_context=parser_context)
+        self.assertEqual(parse_fast(content, **parser_context), drf)
+
+    def test_same_result(self):
+        """Test documents parse to the same data."""
+        self.assertSameParse('{"a": [1, 2.5, "zażółć", null, true], "b": {"c": 18446744073709551616}}'.encode())
+        self.assertSameParse('"\\ud800"'.encode())
+        self.assertSameParse('{"a": 1}'.encode('utf-16'), encoding='utf-16')
+
+    def test_same_errors(self):
+        """Test invalid documents raise the DRF parse errors."""
+        for content in (b'', b'{"a": ', b'[NaN]', b'\xff'):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError) as drf:
+                    JSONParser().parse(io.BytesIO(content))
+                with self.assertRaises(ParseError) as fast:
+                    parse_fast(content)
+                self.assertEqual(str(fast.exception), str(drf.exception))
+
+    def test_stdlib_fallback(self):
+        """Test the parser works without orjson."""
+        with patch.object(fastjson, 'orjson', None):
+            self.assertEqual(parse_fast(b'{"a": [1, "b"]}'), {'a': [1, 'b']})
+
+class FastJSONApiTests(TestCase):
+    """Test the API responses with the renderer configured in the settings."""
+
+    def setUp(self):
+        category = create_category()
+        self.product = create_product(category=category, name='Zażółć shirt', slug='shirt', price=Decimal('10.50'))
+        models.Product.objects.filter(pk=self.product.pk).update(
+            image='products/01/10/2022/shirt.jpg',
+            image_variants={'thumbnail': {'webp': 'products/01/10/2022/shirt_thumbnail.webp', 'jpeg': 'products/01/10/2022/shirt_thumbnail.jpg'}},
+            updated=timezone.now(),
+        )
+
+    def test_configured(self):
+        """Test the views render JSON with the fast renderer."""
+        response = self.client.get(detail_url(product_slug='shirt'))
+
+        self.assertIsInstance(response.accepted_renderer, fastjson.FastJSONRenderer)
+
+    def test_product_output(self):
+        """Test products with image urls render to the DRF bytes."""
+        request = APIRequestFactory().get('/api/shop/products/')
+        product = models.Product.objects.select_related('category').get()
+        for data in (
+            ProductSerializer([product], many=True, context={'request': request}).data,
+            ProductDetailSerializer(product, context={'request': request}).data,
+        ):
+            self.assertIn('http://testserver/', render_fast(data).decode())
+            self.assertEqual(render_fast(data), render_drf(data))
+
+    def test_response_parses(self):
+        """Test a rendered response parses back to the data the view returned."""
+        response = self.client.get(detail_url(product_slug='shirt'))
+
+        self.assertEqual(parse_fast(response.content), response.json())
+        self.assertEqual(response.json()['price'], '10.50')
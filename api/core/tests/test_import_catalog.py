@@ -0,0 +1,131 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from core.cache import get_generations
+from shop import models
+
+CSV = """name,slug,category,category_name,price,available,description
+Linen shirt,linen-shirt,shirts,Shirts,30.00,true,Light and airy
+Wool coat,,coats,,120,no,
+"""
+
+class ImportCatalogTests(TestCase):
+    """
+    Test the import_catalog command.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def import_catalog(self, content, suffix='.csv', **options):
+        """Write `content` to a temporary file, import it and return the output."""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        output = StringIO()
+        call_command('import_catalog', path, stdout=output, **options)
+        return output.getvalue()
+
+    def test_import_csv(self):
+        """Test products and their missing categories are created from a CSV file."""
+        output = self.import_catalog(CSV)
+
+        self.assertIn('Imported 2 products, created 2 categories.', output)
+        shirt = models.Product.objects.select_related('category').get(slug='linen-shirt')
+        self.assertEqual((shirt.name, shirt.price, shirt.available, shirt.description), ('Linen shirt', Decimal('30.00'), True, 'Light and airy'))
+        self.assertEqual((shirt.category.slug, shirt.category.name), ('shirts', 'Shirts'))
+        coat = models.Product.objects.select_related('category').get(slug='wool-coat')
+        self.assertEqual((coat.available, coat.category.name), (False, 'coats'))
+
+    def test_import_jsonl(self):
+        """Test importing a JSON lines file."""
+        rows = [
+            {'name': 'Linen shirt', 'category': 'shirts', 'price': 30, 'available': True},
+            {'name': 'Silk shirt', 'category': 'shirts', 'price': '45.50'},
+        ]
+        self.import_catalog('\n'.join(json.dumps(row) for row in rows) + '\n', suffix='.jsonl')
+
+        self.assertEqual(list(models.Product.objects.values_list('slug', 'price')), [
+            ('linen-shirt', Decimal('30.00')),
+            ('silk-shirt', Decimal('45.50')),
+        ])
+
+    def test_existing_products_updated(self):
+        """Test products are matched on slug and existing categories reused."""
+        category = models.Category.objects.create(name='Shirts', slug='shirts')
+        product = models.Product.objects.create(category=category, name='Old shirt', slug='linen-shirt', price=Decimal('10.00'))
+
+        self.import_catalog(CSV, batch_size=1)
+
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.price), ('Linen shirt', Decimal('30.00')))
+        self.assertEqual(models.Product.objects.count(), 2)
+        self.assertEqual(models.Category.objects.count(), 2)
+
+    def test_duplicate_slugs_in_batch(self):
+        """Test the last row wins when a slug repeats."""
+        self.import_catalog(CSV + 'Linen shirt,linen-shirt,shirts,,35.00,,\n')
+
+        self.assertEqual(models.Product.objects.get(slug='linen-shirt').price, Decimal('35.00'))
+
+    def test_query_count_per_batch(self):
+        """Test the number of queries does not grow with the rows of a batch."""
+        rows = ''.join(f'Shirt {i},shirt-{i},shirts,,10,,\n' for i in range(50))
+        # PostgreSQL also reads the categories and updates the search vectors.
+        queries = 8 if connection.vendor == 'postgresql' else 6
+
+        with self.assertNumQueries(queries):
+            self.import_catalog('name,slug,category,category_name,price,available,description\n' + rows)
+
+    def test_invalid_row(self):
+        """Test an invalid row aborts the import with its line number."""
+        with self.assertRaisesMessage(CommandError, 'Line 3: invalid price'):
+            self.import_catalog(CSV.replace('120', 'free'))
+
+    def test_values_too_large(self):
+        """Test prices and texts that do not fit their columns are rejected with their line number."""
+        for old, new, message in (
+            ('120', '123456789', 'Line 3: invalid price'),
+            ('120', '99999999.999', 'Line 3: invalid price'),
+            ('Wool coat', 'c' * 201, 'Line 3: name longer than 200 characters'),
+            ('linen-shirt', 's' * 201, 'Line 2: slug longer than 200 characters'),
+            ('coats', 'o' * 201, 'Line 3: category longer than 200 characters'),
+        ):
+            with self.subTest(new=new):
+                with self.assertRaisesMessage(CommandError, message):
+                    self.import_catalog(CSV.replace(old, new))
+
+        self.assertFalse(models.Product.objects.exists())
+
+    def test_price_rounded(self):
+        """Test prices are rounded to cents like the column does."""
+        self.import_catalog(CSV.replace('120', '99999999.994'))
+
+        self.assertEqual(models.Product.objects.get(slug='wool-coat').price, Decimal('99999999.99'))
+
+    def test_invalid_row_rolls_back_batch(self):
+        """Test a failing batch writes nothing."""
+        models.Category.objects.create(name='coats', slug='outerwear')
+
+        with self.assertRaisesMessage(CommandError, 'Lines 2-3'):
+            self.import_catalog(CSV)
+
+        self.assertFalse(models.Product.objects.exists())
+
+    def test_invalidates_cached_responses(self):
+        """Test the generations are bumped, as the bulk writes skip the signals."""
+        before = get_generations((models.Product, models.Category))
+
+        self.import_catalog(CSV)
+
+        after = get_generations((models.Product, models.Category))
+        self.assertEqual([b - a for a, b in zip(before, after)], [1, 1])
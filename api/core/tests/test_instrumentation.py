@@ -0,0 +1,146 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import asyncio
+import json
+from decimal import Decimal
+
+from cart.tests.test_views import CART_ADD_URL, CART_URL
+from core import instrumentation
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product, detail_url
+
+def server_timing(response):
+    """Return the `Server-Timing` metrics of the response as `{name: (duration, description)}`."""
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, duration, *description = metric.split(';')
+        metrics[name] = (float(duration[len('dur='):]), description[0][len('desc='):].strip('"') if description else None)
+    return metrics
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_SERVER_TIMING=True)
+class InstrumentationMiddlewareTests(TestCase):
+    """Test the per-request timings and query counts."""
+
+    def setUp(self):
+        cache.clear()
+        category = create_category()
+        for i in range(5):
+            create_product(category=category, name=f'Shirt {i}', slug=f'shirt-{i}', price=Decimal('10.00'))
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_server_timing(self):
+        """Test the header holds the SQL count and time, the serializer time and the total."""
+        response, queries = self.get(PRODUCTS_URL)
+
+        metrics = server_timing(response)
+        self.assertEqual(set(metrics), {'db', 'serializer', 'total'})
+        self.assertEqual(metrics['db'][1], f'{queries} queries')
+        self.assertGreater(metrics['serializer'][0], 0)
+        self.assertGreaterEqual(metrics['total'][0], metrics['db'][0] + metrics['serializer'][0])
+
+    def test_log_line(self):
+        """Test each request is logged as one JSON line."""
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response, queries = self.get(detail_url(product_slug='shirt-0'))
+
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].metrics, record)
+        self.assertEqual(record['view'], 'shop:product-detail')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], queries)
+        self.assertEqual(record['size'], len(response.content))
+        self.assertEqual(record['over_budget'], [])
+
+    def test_session_queries_counted(self):
+        """Test queries made outside the view, like the session load, are counted."""
+        hat = create_product(category=create_category(name='hats', slug='hats'), slug='hat')
+        self.client.post(CART_ADD_URL, {'product_id': hat.id, 'quantity': 1})
+
+        response, queries = self.get(CART_URL)
+
+        self.assertEqual(server_timing(response)['db'][1], f'{queries} queries')
+
+    @override_settings(INSTRUMENTATION_QUERY_BUDGET=0)
+    def test_query_budget(self):
+        """Test requests over the query budget are logged as warnings."""
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.get(PRODUCTS_URL)
+
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertEqual(logs.records[0].metrics['over_budget'], ['queries'])
+
+    @override_settings(INSTRUMENTATION_TIME_BUDGET=0)
+    def test_time_budget(self):
+        """Test requests over the time budget are logged as warnings."""
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.get(PRODUCTS_URL)
+
+        self.assertEqual(logs.records[0].metrics['over_budget'], ['time'])
+
+    def test_async_view(self):
+        """Test the queries of the async views are counted too."""
+        with self.settings(ROOT_URLCONF='shop.tests.test_async'):
+            response, queries = self.get(PRODUCTS_URL)
+
+        self.assertGreater(queries, 0)
+        self.assertEqual(server_timing(response)['db'][1], f'{queries} queries')
+
+    async def test_async_chain(self):
+        """Test under ASGI the middleware stays async and counts the async view queries."""
+        async def get_response(request):
+            pass
+
+        self.assertTrue(asyncio.iscoroutinefunction(instrumentation.InstrumentationMiddleware(get_response)))
+        self.assertFalse(asyncio.iscoroutinefunction(instrumentation.InstrumentationMiddleware(lambda request: None)))
+
+        with self.settings(ROOT_URLCONF='shop.tests.test_async'):
+            response = await self.async_client.get(PRODUCTS_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(server_timing(response)['db'][1].split()[0]), 0)
+
+    @override_settings(INSTRUMENTATION_SERVER_TIMING=False)
+    def test_header_disabled(self):
+        """Test the header can be turned off, keeping the log line."""
+        with self.assertLogs('core.instrumentation', 'INFO'):
+            response, queries = self.get(PRODUCTS_URL)
+
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        """Test nothing is recorded when disabled."""
+        response, queries = self.get(PRODUCTS_URL)
+
+        self.assertNotIn('Server-Timing', response)
+
+class TimeSerializerTests(TestCase):
+    """Test serializer timing outside and inside requests."""
+
+    def test_outside_request(self):
+        """Test timing outside an instrumented request is a no-op."""
+        with instrumentation.time_serializer():
+            self.assertIsNone(instrumentation.get_metrics())
+
+    def test_nested_counted_once(self):
+        """Test nested serializers are not counted on top of the outer one."""
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation._metrics.set(metrics)
+        try:
+            with instrumentation.time_serializer():
+                with instrumentation.time_serializer():
+                    pass
+                inner = metrics.serializer_time
+        finally:
+            instrumentation._metrics.reset(token)
+
+        self.assertEqual(inner, 0)
+        self.assertGreater(metrics.serializer_time, 0)
@@ -0,0 +1,205 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+
+import os
+import re
+import shutil
+import tempfile
+from decimal import Decimal
+
+from cart.tests.test_views import CART_ADD_URL, CART_URL
+from core import metrics
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product, detail_url
+
+METRICS_URL = reverse('metrics')
+
+SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+LABEL = re.compile(r'(?P<name>[a-zA-Z_][a-zA-Z0-9_]*)="(?P<value>(?:[^"\\]|\\.)*)"')
+
+def parse(text):
+    """Parse the text exposition into `({family: (type, help)}, {(name, labels): value})`."""
+    families, samples = {}, {}
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            family, help_text = line[len('# HELP '):].split(' ', 1)
+            families[family] = (None, help_text)
+        elif line.startswith('# TYPE '):
+            family, kind = line[len('# TYPE '):].split(' ')
+            families[family] = (kind, families[family][1])
+        else:
+            match = SAMPLE.match(line)
+            if match is None:
+                raise ValueError(f'Invalid sample line: {line!r}')
+            labels = frozenset((label['name'], label['value']) for label in LABEL.finditer(match['labels'] or ''))
+            samples[(match['name'], labels)] = float(match['value'])
+    return families, samples
+
+def labels(**values):
+    return frozenset(values.items())
+
+@override_settings(METRICS_ENABLED=True, METRICS_DIR='', METRICS_TOKEN='', INSTRUMENTATION_ENABLED=True)
+class MetricsEndpointTests(TestCase):
+    """Test the request histograms served at /metrics."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        category = create_category()
+        self.product = create_product(category=category, name='Shirt', slug='shirt', price=Decimal('10.00'))
+
+    def tearDown(self):
+        metrics.reset()
+
+    def scrape(self):
+        response = self.client.get(METRICS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return parse(response.content.decode())
+
+    def test_families(self):
+        """Test every family is declared with its type and help."""
+        families, samples = self.scrape()
+
+        self.assertEqual(families['api_request_duration_seconds'][0], 'histogram')
+        self.assertEqual(families['api_request_queries'][0], 'histogram')
+        self.assertEqual(families['api_requests_total'][0], 'counter')
+        self.assertEqual(families['api_response_cache_hit_ratio'][0], 'gauge')
+        self.assertTrue(all(help_text for kind, help_text in families.values()))
+
+    def test_histograms(self):
+        """Test the buckets are cumulative and end with the request count."""
+        for _ in range(3):
+            self.client.get(PRODUCTS_URL)
+        self.client.get(detail_url(product_slug='missing'))
+
+        families, samples = self.scrape()
+
+        view = labels(view='shop:product-list')
+        self.assertEqual(samples[('api_request_duration_seconds_count', view)], 3)
+        self.assertGreater(samples[('api_request_duration_seconds_sum', view)], 0)
+        counts = [samples[('api_request_duration_seconds_bucket', view | {('le', str(bound))})] for bound in metrics.DURATION_BUCKETS]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(samples[('api_request_duration_seconds_bucket', view | {('le', '+Inf')})], 3)
+        self.assertEqual(samples[('api_request_queries_bucket', view | {('le', '+Inf')})], 3)
+        self.assertGreater(samples[('api_request_queries_sum', view)], 0)
+
+        self.assertEqual(samples[('api_requests_total', labels(view='shop:product-list', status='200'))], 3)
+        self.assertEqual(samples[('api_requests_total', labels(view='shop:product-detail', status='404'))], 1)
+
+    def test_cache_hit_ratio(self):
+        """Test response cache hits and misses are counted by url name."""
+        for _ in range(4):
+            self.client.get(detail_url(product_slug='shirt'))
+
+        families, samples = self.scrape()
+
+        view = 'shop:product-detail'
+        self.assertEqual(samples[('api_response_cache_requests_total', labels(view=view, result='hit'))], 3)
+        self.assertEqual(samples[('api_response_cache_requests_total', labels(view=view, result='miss'))], 1)
+        self.assertEqual(samples[('api_response_cache_hit_ratio', labels(view=view))], 0.75)
+
+    def test_cart_cache_counted(self):
+        """Test the cart detail cache is counted too."""
+        self.client.post(CART_ADD_URL, {'product_id': self.product.id, 'quantity': 1})
+        self.client.get(CART_URL)
+        self.client.get(CART_URL)
+
+        families, samples = self.scrape()
+
+        self.assertEqual(samples[('api_response_cache_hit_ratio', labels(view='cart:cart_detail'))], 0.5)
+        self.assertEqual(samples[('api_requests_total', labels(view='cart:cart_add', status='201'))], 1)
+
+    def test_other_routes_not_measured(self):
+        """Test only the shop, cart and user routes are measured."""
+        self.client.get(reverse('api-schema'))
+        self.client.get(METRICS_URL)
+
+        families, samples = self.scrape()
+
+        self.assertEqual([key for key in samples if key[0] == 'api_requests_total'], [])
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        """Test nothing is recorded when disabled."""
+        self.client.get(PRODUCTS_URL)
+
+        families, samples = self.scrape()
+
+        self.assertEqual(samples, {})
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        """Test the bearer token is required when set."""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 401)
+        self.assertEqual(self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+class MultiprocessTests(SimpleTestCase):
+    """Test the values of several processes are summed through METRICS_DIR."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_worker_values_summed(self):
+        """Test the requests of a forked worker are added to those of this process."""
+        metrics.observe_request('shop:product-list', 200, 0.02, 3, cache_hits=1)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                metrics.observe_request('shop:product-list', 200, 0.2, 5, cache_misses=1)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+        families, samples = parse(metrics.render())
+
+        view = labels(view='shop:product-list')
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertEqual(samples[('api_request_duration_seconds_count', view)], 2)
+        self.assertAlmostEqual(samples[('api_request_duration_seconds_sum', view)], 0.22)
+        self.assertEqual(samples[('api_request_duration_seconds_bucket', view | {('le', '0.025')})], 1)
+        self.assertEqual(samples[('api_request_duration_seconds_bucket', view | {('le', '0.25')})], 2)
+        self.assertEqual(samples[('api_request_queries_sum', view)], 8)
+        self.assertEqual(samples[('api_response_cache_hit_ratio', view)], 0.5)
+
+    def test_dead_workers_merged(self):
+        """Test the values of exited workers are kept in one aggregate file."""
+        metrics.observe_request('shop:product-list', 200, 0.02, 3)
+        for duration in (0.2, 0.3):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    metrics.observe_request('shop:product-list', 200, duration, 5)
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            metrics.mark_process_dead(pid, self.directory)
+
+        families, samples = parse(metrics.render())
+
+        view = labels(view='shop:product-list')
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([metrics.AGGREGATE_FILE, f'{os.getpid()}.db']))
+        self.assertEqual(samples[('api_request_duration_seconds_count', view)], 3)
+        self.assertAlmostEqual(samples[('api_request_duration_seconds_sum', view)], 0.52)
+        self.assertEqual(samples[('api_request_queries_sum', view)], 13)
+
+    def test_file_grows(self):
+        """Test a store file grows past its initial size and is read back whole."""
+        path = os.path.join(self.directory, 'values.db')
+        store = metrics.MmapValues(path)
+        for i in range(2000):
+            store.inc(f'key {i:04d} ' + 'x' * 40, i)
+        store.inc('key 0001 ' + 'x' * 40, 1)
+
+        values = dict(metrics.MmapValues.read(path))
+        self.assertGreater(os.path.getsize(path), metrics.MmapValues.INITIAL_SIZE)
+        self.assertEqual(len(values), 2000)
+        self.assertEqual(values['key 0001 ' + 'x' * 40], 2)
+        self.assertEqual(values['key 1999 ' + 'x' * 40], 1999)
+        self.assertEqual(dict(metrics.MmapValues(path).items()), values)
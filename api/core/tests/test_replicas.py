@@ -0,0 +1,160 @@
+from django.test import TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+import time
+from decimal import Decimal
+
+from core import replicas
+from core.cache import get_response_cache_timeout
+from shop import models
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product, detail_url
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Test reads are routed to the replica only inside `use_replica`. The replica
+    is a test mirror of the primary, a separate connection which only sees
+    committed rows, hence the transaction test cases.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.product = create_product(category=create_category())
+
+    def test_reads_routed(self):
+        """Test reads inside the block use the replica and writes the primary."""
+        with replicas.use_replica():
+            product = models.Product.objects.get(pk=self.product.pk)
+            product.name = 'Renamed'
+            product.save()
+            category = models.Category.objects.create(name='other', slug='other')
+
+        self.assertEqual(product._state.db, 'replica')
+        self.assertEqual(category._state.db, 'default')
+        self.assertEqual(models.Product.objects.get(pk=self.product.pk)._state.db, 'default')
+
+    def test_only_catalogue_routed(self):
+        """Test users and tokens are read from the primary inside the block."""
+        user = get_user_model().objects.create_user(email='user@example.com', first_name='John', last_name='Doe', password='test12345')
+        Token.objects.create(user=user)
+
+        with replicas.use_replica():
+            self.assertEqual(get_user_model().objects.get(pk=user.pk)._state.db, 'default')
+            self.assertEqual(Token.objects.get(user=user)._state.db, 'default')
+            self.assertEqual(models.Category.objects.get()._state.db, 'replica')
+
+    @override_settings(REPLICA_DATABASE='')
+    def test_no_replica_configured(self):
+        """Test reads stay on the primary when no replica is configured."""
+        with replicas.use_replica():
+            self.assertFalse(replicas.reading_from_replica())
+            self.assertEqual(models.Product.objects.get(pk=self.product.pk)._state.db, 'default')
+
+    def test_replica_not_migrated(self):
+        """Test migrations never run on the replica."""
+        router = replicas.ReplicaRouter()
+
+        self.assertFalse(router.allow_migrate('replica', 'shop'))
+        self.assertIsNone(router.allow_migrate('default', 'shop'))
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=300, REPLICA_CACHE_TIMEOUT=30)
+    def test_replica_reads_cached_shorter(self):
+        """Test what is read from the replica is cached for a shorter time."""
+        with replicas.use_replica():
+            self.assertEqual(get_response_cache_timeout(), 30)
+        self.assertEqual(get_response_cache_timeout(), 300)
+
+@override_settings(REPLICA_DATABASE='replica', REPLICA_PIN_SECONDS=5)
+class ReplicaApiTests(TransactionTestCase):
+    """Test catalogue reads go to the replica and writers are pinned to the primary."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = create_category(name='shirts', slug='shirts')
+        create_product(category=self.category, name='Shirt', slug='shirt', price=Decimal('10.00'))
+
+    def get(self, url):
+        """GET `url`, returning the response and the number of queries on each database."""
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_reads_from_replica(self):
+        """Test product list and detail are read from the replica."""
+        for url in (PRODUCTS_URL, detail_url(product_slug='shirt')):
+            cache.clear()
+            response, primary, replica = self.get(url)
+
+            self.assertEqual(primary, 0)
+            self.assertGreater(replica, 0)
+
+    def test_pinned_after_write(self):
+        """Test a successful write pins the client to the primary."""
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_authenticate(admin)
+        payload = {'name': 'Hat', 'slug': 'hat', 'category': {'name': 'shirts', 'slug': 'shirts'}, 'price': '5.00'}
+
+        response = self.client.post(PRODUCTS_URL, payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('pin_primary', response.cookies)
+        self.assertEqual(response.cookies['pin_primary']['max-age'], 5)
+
+        response, primary, replica = self.get(detail_url(product_slug='hat'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_failed_write_not_pinned(self):
+        """Test rejected writes do not pin the client."""
+        response = self.client.post(PRODUCTS_URL, {}, format='json')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('pin_primary', response.cookies)
+
+    def test_pin_expires(self):
+        """Test an expired pin sends reads back to the replica."""
+        self.client.cookies['pin_primary'] = str(int(time.time()) - 1)
+
+        response, primary, replica = self.get(PRODUCTS_URL)
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @override_settings(REPLICA_DATABASE='')
+    def test_no_replica_no_pin(self):
+        """Test writes set no pin when there is no replica."""
+        response = self.client.post(PRODUCTS_URL, {}, format='json')
+        response, primary, replica = self.get(PRODUCTS_URL)
+
+        self.assertNotIn('pin_primary', response.cookies)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_token_read_from_primary(self):
+        """Test the token of a catalogue read is looked up on the primary, and the catalogue on the replica."""
+        user = get_user_model().objects.create_user(email='user@example.com', first_name='John', last_name='Doe', password='test12345')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response, primary, _ = self.get(PRODUCTS_URL)
+
+        self.assertGreater(primary, 0)
+        self.assertFalse([query for query in replica.captured_queries if 'authtoken_token' in query['sql']])
+        self.assertTrue([query for query in replica.captured_queries if 'shop_product' in query['sql']])
+
+    def test_async_view_reads_from_replica(self):
+        """Test the async product detail reads from the replica too."""
+        with self.settings(ROOT_URLCONF='shop.tests.test_async'):
+            response, primary, replica = self.get(detail_url(product_slug='shirt'))
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
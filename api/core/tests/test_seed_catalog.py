@@ -0,0 +1,80 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+
+from io import StringIO
+
+from core.cache import get_generations
+from shop import models
+
+class SeedCatalogTests(TestCase):
+    """
+    Test the seed_catalog command.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def seed_catalog(self, **options):
+        output = StringIO()
+        call_command('seed_catalog', stdout=output, **options)
+        return output.getvalue()
+
+    def snapshot(self):
+        return list(models.Product.objects.order_by('slug').values_list('slug', 'name', 'category__slug', 'price', 'available', 'stock', 'description'))
+
+    def test_seed(self):
+        """Test the products are spread over the categories."""
+        output = self.seed_catalog(products=25, categories=4, batch_size=10)
+
+        self.assertIn('Seeded 25 products in 4 categories', output)
+        self.assertEqual(models.Product.objects.count(), 25)
+        self.assertEqual(
+            sorted(models.Category.objects.values_list('slug', flat=True)),
+            ['seed-category-0000', 'seed-category-0001', 'seed-category-0002', 'seed-category-0003'],
+        )
+        self.assertEqual(models.Product.objects.filter(category__slug='seed-category-0000').count(), 7)
+        self.assertTrue(models.Product.objects.filter(slug='seed-product-000024').exists())
+
+    def test_deterministic(self):
+        """Test the same options always give the same catalogue."""
+        self.seed_catalog(products=20, categories=3)
+        first = self.snapshot()
+        self.seed_catalog(products=20, categories=3, clear=True)
+
+        self.assertEqual(self.snapshot(), first)
+
+        self.seed_catalog(products=20, categories=3, seed=1, clear=True)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_rerun_keeps_existing(self):
+        """Test seeding again only adds the missing products."""
+        self.seed_catalog(products=10, categories=2)
+        first = self.snapshot()
+        self.seed_catalog(products=15, categories=2)
+
+        self.assertEqual(models.Product.objects.count(), 15)
+        self.assertEqual(self.snapshot()[:10], first)
+
+    def test_clear_keeps_other_products(self):
+        """Test clearing only deletes the seeded rows."""
+        category = models.Category.objects.create(name='Shirts', slug='shirts')
+        models.Product.objects.create(category=category, name='Linen shirt', slug='linen-shirt', price='30.00')
+        self.seed_catalog(products=10, categories=2)
+
+        self.seed_catalog(products=5, categories=1, clear=True)
+
+        self.assertEqual(models.Product.objects.filter(slug__startswith='seed-').count(), 5)
+        self.assertTrue(models.Product.objects.filter(slug='linen-shirt').exists())
+
+    def test_invalidates_cache(self):
+        """Test cached responses are invalidated."""
+        before = get_generations([models.Product])
+        self.seed_catalog(products=5, categories=1)
+
+        self.assertNotEqual(get_generations([models.Product]), before)
+
+    def test_invalid_options(self):
+        """Test invalid counts are rejected."""
+        with self.assertRaises(CommandError):
+            self.seed_catalog(products=5, categories=0)
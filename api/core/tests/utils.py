@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+class QueryCountMixin:
+    """TestCase mixin for asserting that an endpoint does not issue N+1 queries."""
+
+    def assertConstantQueries(self, url, populate, sizes=(1, 10, 50), expected=None):
+        """
+        Populate the database up to each of `sizes` rows, GET `url` and assert
+        that every response costs the same number of queries (or exactly
+        `expected` queries, if given).
+        """
+        counts = {}
+        for size in sizes:
+            populate(size)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts[size] = len(context.captured_queries)
+
+        if expected is None:
+            expected = counts[sizes[0]]
+        self.assertEqual(
+            counts, {size: expected for size in sizes},
+            f'Query count depends on the number of rows: {counts}',
+        )
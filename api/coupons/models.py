@@ -0,0 +1,56 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from django.db import models
+from django.db.models import F, Q
+
+from decimal import Decimal
+
+class Coupon(models.Model):
+    """Discount code applicable to a cart."""
+    PERCENTAGE = 'percentage'
+    FIXED = 'fixed'
+    KIND_CHOICES = [
+        (PERCENTAGE, 'Percentage'),
+        (FIXED, 'Fixed amount'),
+    ]
+
+    code = models.CharField(max_length=50, unique=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=PERCENTAGE)
+    value = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
+    # Only the lines of this category are discounted when set.
+    category = models.ForeignKey('shop.Category', related_name='coupons', on_delete=models.CASCADE, null=True, blank=True)
+    min_total = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0'), help_text='Minimum cart total.')
+    usage_limit = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty for unlimited use.')
+    used = models.PositiveIntegerField(default=0, editable=False)
+    active = models.BooleanField(default=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('code',)
+        constraints = [
+            models.CheckConstraint(check=Q(usage_limit__isnull=True) | Q(used__lte=F('usage_limit')), name='coupon_used_within_limit'),
+        ]
+
+    def __str__(self):
+        return self.code
+
+    def clean(self):
+        if self.kind == self.PERCENTAGE and self.value is not None and self.value > 100:
+            raise ValidationError({'value': 'A percentage cannot exceed 100.'})
+        if self.usage_limit is not None and self.usage_limit < self.used:
+            raise ValidationError({'usage_limit': f'The coupon has already been used {self.used} times.'})
+
+    def save(self, *args, **kwargs):
+        """
+        Save the coupon. Updates leave out `used` unless named in
+        `update_fields`, as redemptions change it with queryset updates and a
+        full save would write back the count the instance was loaded with.
+        """
+        self.code = self.code.upper()
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = {'used'} | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,110 @@
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from core.cache import bump_generation, get_generations
+from coupons.models import Coupon
+
+CENT = Decimal('0.01')
+
+class CartTotals:
+    """
+    Totals of a cart given as `(category_id, line_total)` pairs, computed once
+    so any number of coupons can be evaluated against them.
+    """
+    __slots__ = ('total', 'by_category')
+
+    def __init__(self, lines):
+        self.total = Decimal('0')
+        self.by_category = {}
+        for category_id, line_total in lines:
+            self.total += line_total
+            self.by_category[category_id] = self.by_category.get(category_id, Decimal('0')) + line_total
+
+class CompiledCoupon:
+    """Rules of a coupon turned into a plain object, so evaluating it against a cart needs no query."""
+    __slots__ = ('id', 'code', 'rate', 'amount', 'category_id', 'min_total')
+
+    def __init__(self, coupon):
+        self.id = coupon.id
+        self.code = coupon.code
+        self.rate = coupon.value / 100 if coupon.kind == Coupon.PERCENTAGE else None
+        self.amount = coupon.value if coupon.kind == Coupon.FIXED else None
+        self.category_id = coupon.category_id
+        self.min_total = coupon.min_total
+
+    def check(self, cart):
+        """Return why the coupon does not apply to the `CartTotals`, or None."""
+        if cart.total < self.min_total:
+            return f'The cart total must be at least {self.min_total}.'
+        if self.category_id is not None and self.category_id not in cart.by_category:
+            return 'The coupon does not apply to any product in the cart.'
+        return None
+
+    def discount(self, cart):
+        """Return the discount on the `CartTotals`, never more than the discounted lines are worth."""
+        if cart.total < self.min_total:
+            return Decimal('0.00')
+        eligible = cart.total if self.category_id is None else cart.by_category.get(self.category_id, Decimal('0'))
+        if self.rate is not None:
+            return (eligible * self.rate).quantize(CENT, rounding=ROUND_HALF_UP)
+        return min(self.amount, eligible).quantize(CENT)
+
+def compile_coupons():
+    """Return `{code: CompiledCoupon}` of the coupons which can still be used, with one query."""
+    coupons = Coupon.objects.filter(Q(usage_limit__isnull=True) | Q(used__lt=F('usage_limit')), active=True)
+    return {coupon.code: CompiledCoupon(coupon) for coupon in coupons}
+
+class CouponRegistry:
+    """
+    Compiled coupons of the process, recompiled when the coupon generation
+    changes. Signals bump it on every coupon save or delete, so a lookup costs
+    one cache read and no query while the coupons stay the same.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._generation = None
+        self._coupons = {}
+
+    def coupons(self):
+        generation, = get_generations((Coupon,))
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    self._coupons = compile_coupons()
+                    self._generation = generation
+        return self._coupons
+
+    def get(self, code):
+        """Return the compiled coupon of `code`, or None if there is no usable one."""
+        return self.coupons().get(code.upper()) if code else None
+
+registry = CouponRegistry()
+
+def get_coupon(code):
+    """Return the compiled coupon of `code`, or None if there is no usable one."""
+    return registry.get(code)
+
+def redeem(coupon):
+    """
+    Count one use of the coupon with a conditional update, so concurrent
+    redemptions can never exceed its usage limit. Return whether it was counted.
+    """
+    redeemed = Coupon.objects.filter(
+        Q(usage_limit__isnull=True) | Q(used__lt=F('usage_limit')), pk=coupon.id, active=True,
+    ).update(used=F('used') + 1)
+    if redeemed and Coupon.objects.filter(pk=coupon.id, used__gte=F('usage_limit')).exists():
+        # Used up: recompile without it once committed.
+        transaction.on_commit(lambda: bump_generation(Coupon))
+    return bool(redeemed)
+
+def release(coupon_id):
+    """Give back one use of the coupon."""
+    if Coupon.objects.filter(pk=coupon_id, used__gt=0).update(used=F('used') - 1):
+        transaction.on_commit(lambda: bump_generation(Coupon))
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+from coupons.models import Coupon
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_compiled_coupons(sender, **kwargs):
+    """Recompile the coupons, and drop cached carts using them, on every write."""
+    bump_generation(sender)
+    # Bump again once committed, so coupons compiled from another connection
+    # before the commit became visible are not kept.
+    transaction.on_commit(lambda: bump_generation(sender))
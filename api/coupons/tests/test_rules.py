@@ -0,0 +1,234 @@
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.urls import reverse
+
+import threading
+from decimal import Decimal
+
+from coupons import rules
+from coupons.models import Coupon
+from shop.tests.test_views import create_category
+
+def create_coupon(**params):
+    default = {
+        'code': 'SAVE10',
+        'kind': Coupon.PERCENTAGE,
+        'value': Decimal('10'),
+    }
+    default.update(params)
+
+    return Coupon.objects.create(**default)
+
+class CompiledCouponTests(TestCase):
+    """Test evaluating compiled coupon rules."""
+
+    def setUp(self):
+        self.shirts = create_category(name='shirts', slug='shirts')
+        self.pants = create_category(name='pants', slug='pants')
+        self.cart = rules.CartTotals([(self.shirts.id, Decimal('30.00')), (self.pants.id, Decimal('20.00'))])
+
+    def evaluate(self, **params):
+        coupon = rules.CompiledCoupon(create_coupon(**params))
+        return coupon.check(self.cart), coupon.discount(self.cart)
+
+    def test_cart_totals(self):
+        """Test cart totals sum the lines overall and per category."""
+        self.assertEqual(self.cart.total, Decimal('50.00'))
+        self.assertEqual(self.cart.by_category, {self.shirts.id: Decimal('30.00'), self.pants.id: Decimal('20.00')})
+
+    def test_percentage(self):
+        """Test a percentage coupon discounts the whole cart."""
+        self.assertEqual(self.evaluate(value=Decimal('15')), (None, Decimal('7.50')))
+
+    def test_percentage_rounded(self):
+        """Test percentage discounts are rounded to cents."""
+        coupon = rules.CompiledCoupon(create_coupon(value=Decimal('12.5')))
+
+        self.assertEqual(coupon.discount(rules.CartTotals([(None, Decimal('0.99'))])), Decimal('0.12'))
+
+    def test_fixed(self):
+        """Test a fixed coupon takes its amount off."""
+        self.assertEqual(self.evaluate(kind=Coupon.FIXED, value=Decimal('5')), (None, Decimal('5.00')))
+
+    def test_fixed_capped(self):
+        """Test a fixed coupon never takes more than the discounted lines are worth."""
+        self.assertEqual(self.evaluate(kind=Coupon.FIXED, value=Decimal('25'), category=self.pants)[1], Decimal('20.00'))
+
+    def test_category_scoped(self):
+        """Test a category coupon only discounts the lines of its category."""
+        self.assertEqual(self.evaluate(value=Decimal('50'), category=self.shirts), (None, Decimal('15.00')))
+
+    def test_category_missing_from_cart(self):
+        """Test a category coupon does not apply to a cart without the category."""
+        other = create_category(name='hats', slug='hats')
+
+        error, discount = self.evaluate(category=other)
+
+        self.assertEqual(error, 'The coupon does not apply to any product in the cart.')
+        self.assertEqual(discount, Decimal('0'))
+
+    def test_minimum_total(self):
+        """Test a coupon gives nothing below its minimum cart total."""
+        error, discount = self.evaluate(min_total=Decimal('50.01'))
+
+        self.assertEqual(error, 'The cart total must be at least 50.01.')
+        self.assertEqual(discount, Decimal('0'))
+
+class CouponRegistryTests(TestCase):
+    """Test compiled coupons are cached and recompiled on changes."""
+
+    def setUp(self):
+        cache.clear()
+        rules.registry.clear()
+
+    def test_codes_case_insensitive(self):
+        """Test codes are stored and looked up upper case."""
+        create_coupon(code='summer')
+
+        self.assertEqual(rules.get_coupon('Summer').code, 'SUMMER')
+
+    def test_lookups_cached(self):
+        """Test lookups after the first one make no query."""
+        create_coupon()
+        rules.get_coupon('SAVE10')
+
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(rules.get_coupon('SAVE10'))
+            self.assertIsNone(rules.get_coupon('MISSING'))
+
+    def test_recompiled_on_save(self):
+        """Test saving a coupon recompiles the coupons."""
+        coupon = create_coupon()
+        rules.get_coupon('SAVE10')
+
+        coupon.value = Decimal('20')
+        coupon.save()
+
+        self.assertEqual(rules.get_coupon('SAVE10').rate, Decimal('0.2'))
+
+    def test_unusable_coupons_skipped(self):
+        """Test inactive and used up coupons are not compiled."""
+        create_coupon(code='OFF', active=False)
+        create_coupon(code='GONE', usage_limit=1)
+        Coupon.objects.filter(code='GONE').update(used=1)
+
+        self.assertEqual(rules.compile_coupons(), {})
+
+class RedeemTests(TestCase):
+    """Test counting coupon uses."""
+
+    def setUp(self):
+        cache.clear()
+        rules.registry.clear()
+
+    def test_redeem_within_limit(self):
+        """Test uses are counted up to the usage limit."""
+        coupon = create_coupon(usage_limit=2)
+        compiled = rules.get_coupon('SAVE10')
+
+        self.assertTrue(rules.redeem(compiled))
+        self.assertTrue(rules.redeem(compiled))
+        self.assertFalse(rules.redeem(compiled))
+
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used, 2)
+
+    def test_used_up_coupon_dropped(self):
+        """Test a coupon reaching its limit is no longer compiled once committed."""
+        create_coupon(usage_limit=1)
+        compiled = rules.get_coupon('SAVE10')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                rules.redeem(compiled)
+
+        self.assertIsNone(rules.get_coupon('SAVE10'))
+
+    def test_release(self):
+        """Test releasing gives a use back."""
+        coupon = create_coupon(usage_limit=1, code='ONCE')
+        Coupon.objects.filter(pk=coupon.pk).update(used=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rules.release(coupon.pk)
+
+        self.assertIsNotNone(rules.get_coupon('ONCE'))
+
+    def test_save_keeps_used(self):
+        """Test saving a coupon loaded before redemptions does not write back its use count."""
+        coupon = create_coupon(usage_limit=2)
+        compiled = rules.get_coupon('SAVE10')
+        rules.redeem(compiled)
+        rules.redeem(compiled)
+
+        coupon.min_total = Decimal('10.00')
+        coupon.save()
+
+        coupon.refresh_from_db()
+        self.assertEqual((coupon.min_total, coupon.used), (Decimal('10.00'), 2))
+        self.assertIsNone(rules.get_coupon('SAVE10'))
+
+class CouponAdminTests(TestCase):
+    """Test editing coupons in the admin."""
+
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_login(admin)
+        self.coupon = create_coupon(usage_limit=5)
+        Coupon.objects.filter(pk=self.coupon.pk).update(used=3)
+
+    def change(self, usage_limit):
+        return self.client.post(reverse('admin:coupons_coupon_change', args=[self.coupon.pk]), {
+            'code': 'SAVE10', 'kind': Coupon.PERCENTAGE, 'value': '10', 'min_total': '0', 'usage_limit': usage_limit, 'active': 'on',
+        })
+
+    def test_usage_limit_below_used(self):
+        """Test a usage limit below the uses so far is a form error, not a failed write."""
+        response = self.change(2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'The coupon has already been used 3 times.')
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.usage_limit, 5)
+
+    def test_usage_limit_lowered(self):
+        """Test the usage limit can be lowered down to the uses so far."""
+        response = self.change(3)
+
+        self.assertEqual(response.status_code, 302)
+        self.coupon.refresh_from_db()
+        self.assertEqual((self.coupon.usage_limit, self.coupon.used), (3, 3))
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentRedeemTests(TransactionTestCase):
+    """
+    Test parallel redemptions never exceed the usage limit. Needs a database
+    with row-level locking, so it is skipped on SQLite.
+    """
+
+    def test_usage_limit_respected(self):
+        """Test only as many redemptions as the usage limit succeed."""
+        coupon = create_coupon(usage_limit=5)
+        compiled = rules.CompiledCoupon(coupon)
+        barrier = threading.Barrier(20)
+        redeemed = []
+
+        def redeem():
+            try:
+                barrier.wait()
+                if rules.redeem(compiled):
+                    redeemed.append(True)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=redeem) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        coupon.refresh_from_db()
+        self.assertEqual(len(redeemed), 5)
+        self.assertEqual(coupon.used, 5)
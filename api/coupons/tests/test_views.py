@@ -0,0 +1,153 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from decimal import Decimal
+
+from coupons import rules
+from coupons.models import Coupon
+from coupons.tests.test_rules import create_coupon
+from orders.models import Order
+from orders.tests.test_views import ORDERS_URL, cancel_url, create_user
+from shop.tests.test_views import create_category, create_product
+
+CART_URL = reverse('cart:cart_detail')
+CART_BATCH_URL = reverse('cart:cart_batch')
+CART_COUPON_URL = reverse('cart:cart_coupon')
+
+class CouponApiTests(TestCase):
+    """
+    Test applying coupons to the cart and redeeming them at checkout.
+    """
+
+    def setUp(self):
+        cache.clear()
+        rules.registry.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.shirts = create_category(name='shirts', slug='shirts')
+        self.pants = create_category(name='pants', slug='pants')
+        self.shirt = create_product(category=self.shirts, name='Super shirt', slug='super-shirt', price=Decimal('30.00'), stock=10)
+        self.trousers = create_product(category=self.pants, name='Super pants', slug='super-pants', price=Decimal('20.00'), stock=10)
+
+    def fill_cart(self, *lines):
+        """Add `(product, quantity)` lines to the cart."""
+        operations = [{'op': 'add', 'product_id': product.id, 'quantity': quantity} for product, quantity in lines]
+        self.client.post(CART_BATCH_URL, {'operations': operations}, format='json')
+
+    def test_apply_coupon(self):
+        """Test an applied coupon discounts the cart detail."""
+        create_coupon(value=Decimal('50'), category=self.shirts)
+        self.fill_cart((self.shirt, 1), (self.trousers, 1))
+
+        response = self.client.post(CART_COUPON_URL, {'code': 'save10'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(CART_URL)
+
+        self.assertEqual(response.data['coupon'], 'SAVE10')
+        self.assertEqual(response.data['total_price'], '50.00')
+        self.assertEqual(response.data['discount'], '15.00')
+        self.assertEqual(response.data['total_price_after_discount'], '35.00')
+
+    def test_apply_invalid_coupon(self):
+        """Test unknown and inactive coupons are rejected."""
+        create_coupon(active=False)
+
+        response = self.client.post(CART_COUPON_URL, {'code': 'SAVE10'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('code', response.data)
+
+    def test_remove_coupon(self):
+        """Test removing the coupon drops the discount."""
+        create_coupon()
+        self.fill_cart((self.shirt, 1))
+        self.client.post(CART_COUPON_URL, {'code': 'SAVE10'})
+        self.client.get(CART_URL)
+
+        response = self.client.delete(CART_COUPON_URL)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(CART_URL)
+
+        self.assertIsNone(response.data['coupon'])
+        self.assertEqual(response.data['discount'], '0.00')
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_detail_with_coupon_adds_no_query(self):
+        """Test evaluating a coupon adds no query to the cart detail, whatever the cart size."""
+        create_coupon(category=self.shirts)
+        hats = [create_product(category=self.shirts, name=f'Hat {i}', slug=f'hat-{i}') for i in range(10)]
+        self.fill_cart(*[(hat, 1) for hat in hats])
+        counts = []
+        for code in (None, 'SAVE10'):
+            if code:
+                self.client.post(CART_COUPON_URL, {'code': code})
+            self.client.get(CART_URL)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(CART_URL)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(response.data['discount'], '13.99')
+        self.assertEqual(counts[0], counts[1])
+
+    def test_detail_follows_coupon_changes(self):
+        """Test the cached detail follows changes to the applied coupon."""
+        coupon = create_coupon()
+        self.fill_cart((self.shirt, 1))
+        self.client.post(CART_COUPON_URL, {'code': 'SAVE10'})
+        self.client.get(CART_URL)
+
+        coupon.value = Decimal('20')
+        coupon.save()
+        response = self.client.get(CART_URL)
+
+        self.assertEqual(response.data['discount'], '6.00')
+
+    def test_checkout_with_coupon(self):
+        """Test the order gets the discount and counts a coupon use, given back on cancel."""
+        create_coupon(kind=Coupon.FIXED, value=Decimal('5'), usage_limit=3)
+        self.fill_cart((self.shirt, 1), (self.trousers, 1))
+        self.client.post(CART_COUPON_URL, {'code': 'SAVE10'})
+
+        response = self.client.post(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['discount'], '5.00')
+        self.assertEqual(response.data['total_price'], '45.00')
+        self.assertEqual(Coupon.objects.get().used, 1)
+        self.assertIsNone(self.client.get(CART_URL).data['coupon'])
+
+        self.client.post(cancel_url(response.data['id']))
+        self.assertEqual(Coupon.objects.get().used, 0)
+
+    def test_checkout_coupon_used_up(self):
+        """Test nothing is ordered when the coupon was used up meanwhile."""
+        coupon = create_coupon(usage_limit=1)
+        self.fill_cart((self.shirt, 1))
+        self.client.post(CART_COUPON_URL, {'code': 'SAVE10'})
+        Coupon.objects.filter(pk=coupon.pk).update(used=1)
+
+        response = self.client.post(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], {'coupon': ['Coupon usage limit reached.']})
+        self.shirt.refresh_from_db()
+        self.assertEqual(self.shirt.stock, 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_below_minimum(self):
+        """Test a coupon whose minimum the cart does not reach fails the checkout."""
+        create_coupon(min_total=Decimal('100'))
+        self.fill_cart((self.shirt, 1))
+        self.client.post(CART_COUPON_URL, {'code': 'SAVE10'})
+
+        response = self.client.post(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('coupon', response.data['errors'])
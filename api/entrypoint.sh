@@ -2,4 +2,9 @@
 python manage.py wait_for_db
 python manage.py migrate
 python manage.py collectstatic --noinput
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+
+if [ "$DJANGO_ENV" = "production" ]; then
+    exec gunicorn -c gunicorn.conf.py
+else
+    python manage.py runserver 0.0.0.0:8000
+fi
@@ -0,0 +1,55 @@
+"""
+Gunicorn settings for the production run mode (`DJANGO_ENV=production`):
+
+    gunicorn -c gunicorn.conf.py
+
+Serves the WSGI application with threaded workers, or the ASGI application
+with uvicorn workers when `ASYNC_VIEWS=1`.
+"""
+import multiprocessing
+import os
+import shutil
+
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+if ASYNC_VIEWS:
+    wsgi_app = 'api.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'api.wsgi:application'
+    worker_class = 'gthread'
+    # Requests waiting on the database release the GIL, so a few threads per
+    # worker keep the CPU busy without more processes.
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound memory growth.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# The worker heartbeat files are touched on every request, keep them off disk.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+
+def on_starting(server):
+    # Each worker writes its metrics to a file of METRICS_DIR, drop the files
+    # of a previous run so its counts are not added to this one.
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+def child_exit(server, worker):
+    # Fold the metrics of the exited worker into one file, so recycling
+    # workers with max_requests doesn't leave a file per worker behind.
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        from core import metrics
+        metrics.mark_process_dead(worker.pid, metrics_dir)
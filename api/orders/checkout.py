@@ -0,0 +1,95 @@
+from django.db import transaction
+
+from decimal import Decimal
+
+from coupons import rules
+from orders.models import Order, OrderItem
+from shop import inventory
+from shop.models import Product
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order, with errors keyed by product id."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+class _InsufficientStock(Exception):
+    pass
+
+def place_order(cart, user=None, coupon_code=None):
+    """
+    Turn the cart into an order and clear it. Prices and names are
+    snapshotted from the products with one query and stock is reserved in
+    the same transaction, so either the whole order is placed or nothing is.
+    A use of the coupon of `coupon_code` is counted in that transaction too.
+    """
+    quantities = {product_id: item['quantity'] for product_id, item in cart.items.items()}
+    if not quantities:
+        raise CheckoutError({'cart': ['The cart is empty.']})
+    coupon = rules.get_coupon(coupon_code)
+    if coupon_code and coupon is None:
+        raise CheckoutError({'coupon': ['Coupon is not valid.']})
+
+    try:
+        with transaction.atomic():
+            products = {
+                product['id']: product
+                for product in Product.objects.filter(pk__in=quantities, available=True).values('id', 'name', 'price', 'category_id', 'stock_shards')
+            }
+            unavailable = set(quantities) - set(products)
+            if unavailable:
+                raise CheckoutError({str(product_id): ['Product is not available.'] for product_id in sorted(unavailable)})
+
+            totals = rules.CartTotals(
+                (products[product_id]['category_id'], products[product_id]['price'] * quantity) for product_id, quantity in quantities.items()
+            )
+            discount = Decimal('0')
+            if coupon is not None:
+                error = coupon.check(totals)
+                if error:
+                    raise CheckoutError({'coupon': [error]})
+                discount = coupon.discount(totals)
+
+            if not inventory.reserve(quantities, sharded={product_id for product_id, product in products.items() if product['stock_shards']}):
+                raise _InsufficientStock
+            if coupon is not None and not rules.redeem(coupon):
+                raise CheckoutError({'coupon': ['Coupon usage limit reached.']})
+
+            order = Order.objects.create(
+                user=user,
+                coupon_id=coupon.id if coupon else None,
+                discount=discount,
+                total_price=totals.total - discount,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, name=products[product_id]['name'], price=products[product_id]['price'], quantity=quantity)
+                for product_id, quantity in sorted(quantities.items())
+            ])
+    except _InsufficientStock:
+        stock = inventory.stock_levels(quantities)
+        raise CheckoutError({
+            str(product_id): [f'Only {stock.get(product_id, 0)} left in stock.']
+            for product_id, quantity in sorted(quantities.items()) if stock.get(product_id, 0) < quantity
+        } or {'cart': ['Not enough stock, please try again.']})
+
+    cart.clear()
+    cart.save()
+    return order
+
+def cancel_order(order):
+    """Cancel a pending order and return its stock and coupon use. Return whether the order was cancelled."""
+    with transaction.atomic():
+        cancelled = Order.objects.filter(pk=order.pk, status=Order.PENDING).update(status=Order.CANCELLED)
+        if cancelled:
+            quantities = {}
+            for product_id, quantity in order.items.filter(product__isnull=False).values_list('product_id', 'quantity'):
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            if quantities:
+                inventory.release(quantities)
+            if order.coupon_id:
+                rules.release(order.coupon_id)
+
+    if cancelled:
+        order.status = Order.CANCELLED
+    return bool(cancelled)
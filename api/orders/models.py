@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import models
+
+class Order(models.Model):
+    """Order placed from the content of a cart."""
+    PENDING = 'pending'
+    PAID = 'paid'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PAID, 'Paid'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='orders', on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    coupon = models.ForeignKey('coupons.Coupon', related_name='orders', on_delete=models.SET_NULL, null=True, blank=True)
+    discount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_price = models.DecimalField(max_digits=15, decimal_places=2)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'Order {self.id}'
+
+class OrderItem(models.Model):
+    """Product line of an order, with the product name and price at checkout."""
+    order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey('shop.Product', related_name='+', on_delete=models.SET_NULL, null=True)
+    name = models.CharField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.quantity} x {self.name}'
+
+    @property
+    def total_price(self):
+        return self.price * self.quantity
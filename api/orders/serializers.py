@@ -0,0 +1,25 @@
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+from orders import models
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    """Serializer for order lines."""
+    total_price = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = models.OrderItem
+        fields = ['product', 'name', 'price', 'quantity', 'total_price']
+        read_only_fields = fields
+
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for orders."""
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = models.Order
+        fields = ['id', 'status', 'discount', 'total_price', 'created', 'items']
+        read_only_fields = fields
+
+class CheckoutErrorSerializer(serializers.Serializer):
+    errors = serializers.DictField(child=serializers.ListField(child=serializers.CharField()))
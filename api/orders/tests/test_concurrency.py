@@ -0,0 +1,119 @@
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.db import connections
+
+import threading
+from decimal import Decimal
+
+from orders import models
+from orders.checkout import CheckoutError, place_order
+from shop import inventory
+from shop.models import Product
+from shop.tests.test_views import create_category, create_product
+
+class StaticCart:
+    """Cart holding fixed items, standing in for a session cart in worker threads."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def clear(self):
+        self.items = {}
+
+    def save(self):
+        pass
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """
+    Test parallel checkouts never oversell. Needs a database with row-level
+    locking, so it is skipped on SQLite.
+    """
+
+    def checkout_in_parallel(self, carts):
+        """
+        Place an order for each cart in its own thread and return the number
+        placed, failing if a checkout raised anything but `CheckoutError`.
+        """
+        barrier = threading.Barrier(len(carts))
+        placed = []
+        errors = []
+
+        def checkout(cart):
+            try:
+                barrier.wait()
+                place_order(cart)
+                placed.append(cart)
+            except CheckoutError:
+                pass
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=checkout, args=(cart,)) for cart in carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        return len(placed)
+
+    def test_no_overselling(self):
+        """Test only as many orders as there is stock succeed."""
+        product = create_product(category=create_category(), price=Decimal('10.00'), stock=5)
+        carts = [StaticCart({product.id: {'quantity': 1, 'price': product.price}}) for _ in range(20)]
+
+        placed = self.checkout_in_parallel(carts)
+
+        product.refresh_from_db()
+        self.assertEqual(placed, 5)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(models.OrderItem.objects.filter(product=product).count(), 5)
+
+    def test_multi_line_orders_all_or_nothing(self):
+        """Test orders spanning several contended products reserve all their lines or none."""
+        category = create_category()
+        shirt = create_product(category=category, name='shirt', slug='shirt', stock=7)
+        pants = create_product(category=category, name='pants', slug='pants', stock=4)
+        carts = [
+            StaticCart({shirt.id: {'quantity': 1, 'price': shirt.price}, pants.id: {'quantity': 1, 'price': pants.price}})
+            if i % 2 else StaticCart({shirt.id: {'quantity': 1, 'price': shirt.price}})
+            for i in range(16)
+        ]
+
+        self.checkout_in_parallel(carts)
+
+        shirt.refresh_from_db()
+        pants.refresh_from_db()
+        sold = {
+            product_id: sum(models.OrderItem.objects.filter(product_id=product_id).values_list('quantity', flat=True))
+            for product_id in (shirt.id, pants.id)
+        }
+        self.assertEqual(sold[shirt.id] + shirt.stock, 7)
+        self.assertEqual(sold[pants.id] + pants.stock, 4)
+        self.assertGreaterEqual(shirt.stock, 0)
+        self.assertGreaterEqual(pants.stock, 0)
+
+    def test_no_overselling_sharded(self):
+        """Test a product with sharded stock is never oversold either."""
+        product = create_product(category=create_category(), price=Decimal('10.00'), stock=9)
+        inventory.rebalance(product, shards=4)
+        carts = [StaticCart({product.id: {'quantity': 2, 'price': product.price}}) for _ in range(12)]
+
+        placed = self.checkout_in_parallel(carts)
+
+        self.assertEqual(placed, 4)
+        self.assertEqual(inventory.stock_levels([product.id]), {product.id: 1})
+
+    def test_no_overselling_sharded_with_row_stock(self):
+        """Test stock left in the row of a sharded product is not oversold by competing fallbacks."""
+        product = create_product(category=create_category(), price=Decimal('10.00'), stock=9)
+        inventory.rebalance(product, shards=3)
+        Product.objects.filter(pk=product.pk).update(stock=2)
+        carts = [StaticCart({product.id: {'quantity': 2, 'price': product.price}}) for _ in range(12)]
+
+        placed = self.checkout_in_parallel(carts)
+
+        self.assertEqual(placed, 5)
+        self.assertEqual(inventory.stock_levels([product.id]), {product.id: 1})
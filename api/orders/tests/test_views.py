@@ -0,0 +1,161 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from decimal import Decimal
+
+from orders import models
+from shop.tests.test_views import create_category, create_product
+
+ORDERS_URL = reverse('orders:order-list')
+CART_URL = reverse('cart:cart_detail')
+CART_BATCH_URL = reverse('cart:cart_batch')
+
+def order_url(order_id):
+    """Create and return an order detail url."""
+    return reverse('orders:order-detail', args=[order_id])
+
+def cancel_url(order_id):
+    """Create and return an order cancel url."""
+    return reverse('orders:order-cancel', args=[order_id])
+
+def create_user(email='user@example.com'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email=email, first_name='John', last_name='Doe', password='test12345')
+
+class OrderApiTests(TestCase):
+    """
+    Test placing and viewing orders.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        category = create_category(name='shirts')
+        self.shirt = create_product(category=category, name='Super shirt', slug='super-shirt', price=Decimal('13.99'), stock=10)
+        self.pants = create_product(category=category, name='Super pants', slug='super-pants', price=Decimal('20.00'), stock=1)
+
+    def fill_cart(self, *lines):
+        """Add `(product, quantity)` lines to the cart."""
+        operations = [{'op': 'add', 'product_id': product.id, 'quantity': quantity} for product, quantity in lines]
+        response = self.client.post(CART_BATCH_URL, {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_place_order(self):
+        """Test an order is created from the cart, reserving stock and clearing the cart."""
+        self.fill_cart((self.shirt, 2), (self.pants, 1))
+
+        response = self.client.post(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], models.Order.PENDING)
+        self.assertEqual(response.data['total_price'], '47.98')
+        self.assertEqual([(item['name'], item['quantity'], item['price']) for item in response.data['items']], [
+            ('Super shirt', 2, '13.99'),
+            ('Super pants', 1, '20.00'),
+        ])
+        self.shirt.refresh_from_db()
+        self.pants.refresh_from_db()
+        self.assertEqual((self.shirt.stock, self.pants.stock), (8, 0))
+        self.assertEqual(self.client.get(CART_URL).data['products'], [])
+
+    def test_price_snapshot_from_product(self):
+        """Test the order uses the product price at checkout and keeps it afterwards."""
+        self.fill_cart((self.shirt, 1))
+        self.shirt.price = Decimal('15.00')
+        self.shirt.save()
+
+        response = self.client.post(ORDERS_URL)
+        self.shirt.price = Decimal('99.00')
+        self.shirt.save()
+
+        self.assertEqual(response.data['total_price'], '15.00')
+        self.assertEqual(self.client.get(order_url(response.data['id'])).data['items'][0]['price'], '15.00')
+
+    def test_checkout_query_count(self):
+        """Test the number of queries does not grow with the number of lines."""
+        category = create_category(name='hats')
+        products = [create_product(category=category, name=f'Hat {i}', slug=f'hat-{i}', stock=5) for i in range(10)]
+        counts = []
+        for lines in (products[:1], products):
+            self.fill_cart(*[(product, 1) for product in lines])
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(ORDERS_URL)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_insufficient_stock(self):
+        """Test nothing is ordered or reserved when a product is short."""
+        self.fill_cart((self.shirt, 2), (self.pants, 2))
+
+        response = self.client.post(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], {str(self.pants.id): ['Only 1 left in stock.']})
+        self.shirt.refresh_from_db()
+        self.assertEqual(self.shirt.stock, 10)
+        self.assertFalse(models.Order.objects.exists())
+        self.assertEqual(len(self.client.get(CART_URL).data['products']), 2)
+
+    def test_unavailable_product(self):
+        """Test products which are no longer available cannot be ordered."""
+        self.fill_cart((self.shirt, 1))
+        self.shirt.available = False
+        self.shirt.save()
+
+        response = self.client.post(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.shirt.id), response.data['errors'])
+
+    def test_empty_cart(self):
+        """Test an empty cart cannot be ordered."""
+        response = self.client.post(ORDERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cart', response.data['errors'])
+
+    def test_list_own_orders(self):
+        """Test users only see their own orders."""
+        other = models.Order.objects.create(user=create_user('other@example.com'), total_price=Decimal('1.00'))
+        self.fill_cart((self.shirt, 1))
+        order_id = self.client.post(ORDERS_URL).data['id']
+
+        response = self.client.get(ORDERS_URL)
+
+        self.assertEqual([order['id'] for order in response.data['results']], [order_id])
+        self.assertEqual(self.client.get(order_url(other.id)).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_order(self):
+        """Test cancelling a pending order returns its stock."""
+        self.fill_cart((self.shirt, 3))
+        order_id = self.client.post(ORDERS_URL).data['id']
+
+        response = self.client.post(cancel_url(order_id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], models.Order.CANCELLED)
+        self.shirt.refresh_from_db()
+        self.assertEqual(self.shirt.stock, 10)
+        response = self.client.post(cancel_url(order_id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.shirt.refresh_from_db()
+        self.assertEqual(self.shirt.stock, 10)
+
+    def test_auth_required(self):
+        """Test orders require authentication."""
+        self.client.force_authenticate(None)
+
+        response = self.client.get(ORDERS_URL)
+
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
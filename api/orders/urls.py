@@ -0,0 +1,14 @@
+from rest_framework import routers
+
+from django.urls import path, include
+
+from orders import views
+
+app_name = 'orders'
+
+router = routers.SimpleRouter()
+router.register('', views.OrderViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
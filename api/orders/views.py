@@ -0,0 +1,47 @@
+from rest_framework import mixins, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from drf_spectacular.utils import extend_schema
+
+from cart.cart import Cart
+from core.authentication import CachedTokenAuthentication
+from core.pagination import KeysetPagination
+from orders import checkout, models, serializers
+
+class OrderViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericViewSet):
+    """API view for placing and viewing the orders of the user."""
+    serializer_class = serializers.OrderSerializer
+    queryset = models.Order.objects.all()
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        """Return the orders of the user with their lines."""
+        return self.queryset.filter(user=self.request.user).prefetch_related('items')
+
+    @extend_schema(request=None, responses={201: serializers.OrderSerializer, 400: serializers.CheckoutErrorSerializer})
+    def create(self, request):
+        """Place an order with the content of the cart."""
+        try:
+            cart = Cart(request)
+            order = checkout.place_order(cart, user=request.user, coupon_code=cart.coupon_code)
+        except checkout.CheckoutError as error:
+            return Response({'errors': error.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        order = self.get_queryset().get(pk=order.pk)
+        return Response(self.get_serializer(order).data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(request=None, responses={200: serializers.OrderSerializer, 400: serializers.CheckoutErrorSerializer})
+    @action(methods=['POST'], detail=True)
+    def cancel(self, request, pk=None):
+        """Cancel a pending order and return its products to the stock."""
+        order = self.get_object()
+        if not checkout.cancel_order(order):
+            return Response({'errors': {'status': ['Only pending orders can be cancelled.']}}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(self.get_serializer(order).data, status=status.HTTP_200_OK)
@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.utils import timezone
+
+from collections import defaultdict
+
+from core.cache import batch_invalidation, bump_generation
+from shop.models import Category, Product
+
+# Fields feeding the search vector; changing one of them means recomputing it.
+SEARCH_FIELDS = {'name', 'category', 'description'}
+
+def row_results(rows, errors, status):
+    """
+    Return the per-row results, `status` being the status of the valid rows.
+    Nothing is applied when a row is invalid, so valid rows are then skipped.
+    """
+    if any(errors):
+        status = 'skipped'
+    results = []
+    for row, error in zip(rows, errors):
+        result = {'slug': row.get('slug'), 'status': 'error' if error else status}
+        if error:
+            result['errors'] = error
+        results.append(result)
+
+    return results
+
+def _check(rows, products, create):
+    """
+    Return the errors of each row that need the database: duplicate or
+    unknown slugs, unknown categories, names taken by other products and
+    stock set on products with sharded stock, which `Product.stock` only
+    holds part of. Categories are returned too, resolved with one query for
+    the batch.
+    """
+    categories = Category.objects.in_bulk({row['category'] for row in rows if 'category' in row}, field_name='slug')
+    names = {row['name'] for row in rows if 'name' in row}
+    taken = dict(Product.objects.filter(name__in=names).values_list('name', 'slug')) if names else {}
+
+    errors = []
+    seen_slugs, seen_names = set(), set()
+    for row in rows:
+        error = {}
+        slug = row['slug']
+        if slug in seen_slugs:
+            error['slug'] = ['Duplicate slug.']
+        elif create and slug in products:
+            error['slug'] = ['Product with this slug already exists.']
+        elif not create and slug not in products:
+            error['slug'] = ['Product not found.']
+        seen_slugs.add(slug)
+
+        if not create and 'stock' in row and slug in products and products[slug].stock_shards:
+            error['stock'] = ['Stock of a product with stock shards cannot be set, merge its shards first.']
+        if 'category' in row and row['category'] not in categories:
+            error['category'] = ['Category not found.']
+        if 'name' in row:
+            if row['name'] in seen_names or taken.get(row['name'], slug) != slug:
+                error['name'] = ['Product with this name already exists.']
+            seen_names.add(row['name'])
+        errors.append(error)
+
+    return categories, errors
+
+def create_products(rows):
+    """Create the products of `rows` and return `(results, applied)`."""
+    with batch_invalidation(), transaction.atomic():
+        existing = set(Product.objects.filter(slug__in=[row['slug'] for row in rows]).values_list('slug', flat=True))
+        categories, errors = _check(rows, existing, create=True)
+        if any(errors):
+            return row_results(rows, errors, 'created'), False
+
+        Product.objects.bulk_create([
+            Product(**{**row, 'category': categories[row['category']]}) for row in rows
+        ])
+        # bulk_create skips the signals maintaining the search vector and the response cache.
+        Product.objects.filter(slug__in=[row['slug'] for row in rows]).update_search_vector()
+        bump_generation(Product)
+
+    return row_results(rows, errors, 'created'), True
+
+def update_products(rows):
+    """
+    Update the products of `rows`, writing only the fields which changed
+    with one `bulk_update` per set of changed fields. Return `(results, applied)`.
+    """
+    with batch_invalidation(), transaction.atomic():
+        products = Product.objects.select_for_update().in_bulk([row['slug'] for row in rows], field_name='slug')
+        categories, errors = _check(rows, products, create=False)
+        if any(errors):
+            return row_results(rows, errors, 'updated'), False
+
+        now = timezone.now()
+        groups = defaultdict(list)
+        results = []
+        for row in rows:
+            product = products[row['slug']]
+            changed = []
+            for field, value in row.items():
+                if field == 'category':
+                    value = categories[value]
+                    if product.category_id != value.id:
+                        product.category = value
+                        changed.append(field)
+                elif field != 'slug' and getattr(product, field) != value:
+                    setattr(product, field, value)
+                    changed.append(field)
+            if changed:
+                # bulk_update does not apply auto_now.
+                product.updated = now
+                groups[tuple(sorted(changed)) + ('updated',)].append(product)
+            results.append({'slug': row['slug'], 'status': 'updated' if changed else 'unchanged', 'fields': changed})
+
+        for fields, group in groups.items():
+            Product.objects.bulk_update(group, fields)
+        reindex = [product.id for fields, group in groups.items() if SEARCH_FIELDS & set(fields) for product in group]
+        if reindex:
+            Product.objects.filter(id__in=reindex).update_search_vector()
+        if groups:
+            bump_generation(Product)
+
+    return results, True
+
+def delete_products(rows):
+    """Delete the products of `rows` and return `(results, applied)`."""
+    with batch_invalidation(), transaction.atomic():
+        products = Product.objects.filter(slug__in=[row['slug'] for row in rows])
+        existing = set(products.values_list('slug', flat=True))
+        _, errors = _check([{'slug': row['slug']} for row in rows], existing, create=False)
+        if any(errors):
+            return row_results(rows, errors, 'deleted'), False
+
+        products.delete()
+
+    return row_results(rows, errors, 'deleted'), True
@@ -0,0 +1,59 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# The columns read by `import_catalog`, so an export can be imported back.
+EXPORT_FIELDS = ('name', 'slug', 'category', 'category_name', 'price', 'available', 'description', 'updated')
+EXPORT_LOOKUPS = ('name', 'slug', 'category__slug', 'category__name', 'price', 'available', 'description', 'updated')
+CHUNK_SIZE = 2000
+# Lines are grouped into writes of about this many characters.
+BUFFER_SIZE = 64 * 1024
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield the export rows of `queryset` as tuples. Rows are fetched in chunks
+    from a server-side cursor where supported and are never turned into model
+    instances, so memory does not grow with the catalogue.
+    """
+    return queryset.order_by('id').values_list(*EXPORT_LOOKUPS).iterator(chunk_size=chunk_size)
+
+class _Echo:
+    """File-like object returning what is written, for `csv.writer`."""
+
+    def write(self, value):
+        return value
+
+def csv_lines(rows):
+    """Yield the CSV lines of the rows, header first."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+def ndjson_lines(rows):
+    """Yield one JSON object per row, with the prices as strings like in the API."""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+}
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Join `lines` into chunks of at least `size` characters."""
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk, length = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+def export_catalog(queryset, format, chunk_size=CHUNK_SIZE):
+    """Return the content type and an iterator over the export of `queryset` in `format`."""
+    content_type, render = EXPORT_FORMATS[format]
+    return content_type, buffered(render(export_rows(queryset, chunk_size)))
@@ -0,0 +1,79 @@
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+class ProductFilterSerializer(serializers.Serializer):
+    """Validates the product list filter parameters."""
+    category = serializers.SlugField(required=False, help_text='Slug of the product category.')
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, help_text='Minimum price, inclusive.')
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, help_text='Maximum price, inclusive.')
+    available = serializers.BooleanField(required=False, allow_null=True, default=None, help_text='Only available (true) or unavailable (false) products.')
+    updated_since = serializers.DateTimeField(required=False, help_text='Only products updated at or after this time.')
+
+class ProductFilter(BaseFilterBackend):
+    """Filter products by category, price range, availability and update time."""
+    lookups = {
+        'category': 'category__slug',
+        'min_price': 'price__gte',
+        'max_price': 'price__lte',
+        'available': 'available',
+        'updated_since': 'updated__gte',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = {name: request.query_params[name] for name in self.lookups if name in request.query_params}
+        if not params:
+            return queryset
+
+        serializer = ProductFilterSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        filters = {
+            self.lookups[name]: value for name, value in serializer.validated_data.items() if value is not None
+        }
+        return queryset.filter(**filters)
+
+    def get_schema_operation_parameters(self, view):
+        types = {
+            'category': {'type': 'string'},
+            'min_price': {'type': 'string', 'format': 'decimal'},
+            'max_price': {'type': 'string', 'format': 'decimal'},
+            'available': {'type': 'boolean'},
+            'updated_since': {'type': 'string', 'format': 'date-time'},
+        }
+        fields = ProductFilterSerializer().fields
+        return [
+            {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': str(fields[name].help_text),
+                'schema': types[name],
+            } for name in self.lookups
+        ]
+
+class ProductSearchFilter(BaseFilterBackend):
+    """Full-text search of products through the `search` query parameter."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+
+        return queryset.search(text)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Words to search for in the product name, category and description, matched as prefixes.',
+                'schema': {
+                    'type': 'string',
+                },
+            },
+        ]
+
+class ProductOrderingFilter(OrderingFilter):
+    """Order products by one of the indexed fields; `id` is added by the pagination."""
+    ordering_fields = ['name', 'price', 'updated']
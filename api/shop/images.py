@@ -0,0 +1,53 @@
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Longest side, in pixels, of each generated variant.
+VARIANTS = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1200,
+}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+def render_variants(data):
+    """
+    Render every variant of the image in `data` and return them as
+    `{variant: {format: bytes}}`.
+
+    Pillow only writes metadata it is explicitly given, so the outputs carry
+    no EXIF, ICC or XMP data; the EXIF orientation is applied to the pixels
+    first. This function does not touch Django, so it can run in a process pool.
+    """
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = _flatten(image)
+
+        rendered = {}
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            rendered[variant] = {}
+            for extension, (format, options) in FORMATS.items():
+                output = BytesIO()
+                resized.save(output, format, **options)
+                rendered[variant][extension] = output.getvalue()
+
+    return rendered
+
+def _flatten(image):
+    """Convert to RGB, putting transparent images on a white background."""
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+def variant_name(original, variant, extension):
+    """Return the storage name of a variant, next to the original file."""
+    stem = original.rsplit('.', 1)[0]
+    return f'{stem}_{variant}.{extension}'
@@ -0,0 +1,139 @@
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from shop.models import Product, StockShard
+
+# Stock of a product is `Product.stock` plus the stock of its shards. Products
+# with `stock_shards` set keep most of it in that many StockShard rows, so
+# concurrent checkouts of one hot product update different rows instead of
+# queueing on a single row lock. Writes go through queryset updates as stock
+# is not part of the cached product responses.
+
+def _quantity_case(quantities):
+    return Case(*[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()], output_field=IntegerField())
+
+def with_stock(queryset):
+    """Annotate the products of `queryset` with their total stock as `total_stock`."""
+    return queryset.annotate(total_stock=F('stock') + Coalesce(Sum('shards__stock'), 0))
+
+def stock_levels(product_ids):
+    """Return `{product_id: stock}` of the products, summing their shards."""
+    return dict(with_stock(Product.objects.filter(pk__in=product_ids)).values_list('id', 'total_stock'))
+
+class _Short(Exception):
+    pass
+
+def reserve(quantities, sharded=()):
+    """
+    Take `{product_id: quantity}` from the stock and return whether all of it
+    was reserved; nothing is taken otherwise. Products in `sharded` are taken
+    from their shards, the others with a single
+    `UPDATE ... SET stock = stock - n WHERE stock >= n`. Rows stay locked
+    until the surrounding transaction ends.
+    """
+    single = {product_id: quantity for product_id, quantity in quantities.items() if product_id not in sharded}
+    try:
+        with transaction.atomic():
+            if single:
+                wanted = _quantity_case(single)
+                if Product.objects.filter(pk__in=single, stock__gte=wanted).update(stock=F('stock') - wanted) != len(single):
+                    raise _Short
+            # Sorted, so transactions reserving the same products lock them in the same order.
+            for product_id in sorted(set(quantities) - set(single)):
+                if not _reserve_sharded(product_id, quantities[product_id]):
+                    raise _Short
+    except _Short:
+        return False
+
+    return True
+
+def _reserve_sharded(product_id, quantity):
+    # A random shard no other transaction holds, so concurrent checkouts spread over the rows.
+    shard = (
+        StockShard.objects.select_for_update(skip_locked=True)
+        .filter(product_id=product_id, stock__gte=quantity)
+        .order_by('?').values_list('pk', flat=True).first()
+    )
+    if shard is not None:
+        StockShard.objects.filter(pk=shard).update(stock=F('stock') - quantity)
+        return True
+
+    # Every shard is busy or short: wait for their locks and take from as many counters as needed,
+    # product row first. Shards are locked in pk order and the product row only by its conditional
+    # UPDATE, never FOR UPDATE: checkouts holding a shard take a KEY SHARE lock on the product row
+    # when they insert their order lines, which FOR UPDATE conflicts with, so locking the row first
+    # would deadlock with them.
+    counters = list(
+        StockShard.objects.select_for_update().filter(product_id=product_id, stock__gt=0)
+        .order_by('pk').values_list('pk', 'stock')
+    )
+    stock = Product.objects.filter(pk=product_id).values_list('stock', flat=True).first() or 0
+    if stock + sum(count for _, count in counters) < quantity:
+        return False
+
+    taken = min(stock, quantity)
+    if taken and not Product.objects.filter(pk=product_id, stock__gte=taken).update(stock=F('stock') - taken):
+        # Another checkout took the units of the row meanwhile.
+        return False
+    remaining = quantity - taken
+    for shard, count in counters:
+        if not remaining:
+            break
+        taken = min(count, remaining)
+        StockShard.objects.filter(pk=shard).update(stock=F('stock') - taken)
+        remaining -= taken
+
+    return True
+
+def release(quantities):
+    """Give `{product_id: quantity}` back to the stock, into a random shard for sharded products."""
+    sharded = dict(Product.objects.filter(pk__in=quantities, stock_shards__gt=0).values_list('id', 'stock_shards'))
+    single = {product_id: quantity for product_id, quantity in quantities.items() if product_id not in sharded}
+    for product_id, shards in sharded.items():
+        quantity = quantities[product_id]
+        if not StockShard.objects.filter(product_id=product_id, shard=random.randrange(shards)).update(stock=F('stock') + quantity):
+            # The product was merged or resharded meanwhile.
+            single[product_id] = quantity
+    if single:
+        Product.objects.filter(pk__in=single).update(stock=F('stock') + _quantity_case(single))
+
+def rebalance(product, shards=None):
+    """
+    Spread the whole stock of `product` evenly over `shards` rows, defaulting
+    to `INVENTORY_SHARDS`. Return the stock that was spread.
+    """
+    shards = settings.INVENTORY_SHARDS if shards is None else shards
+    if shards < 1:
+        raise ValueError('A product needs at least one stock shard.')
+
+    with transaction.atomic():
+        total = _lock_stock(product)
+        size, extra = divmod(total, shards)
+        StockShard.objects.filter(product=product).delete()
+        StockShard.objects.bulk_create([
+            StockShard(product=product, shard=shard, stock=size + (shard < extra)) for shard in range(shards)
+        ])
+        Product.objects.filter(pk=product.pk).update(stock=0, stock_shards=shards)
+
+    product.stock, product.stock_shards = 0, shards
+    return total
+
+def merge(product):
+    """Move the stock of the shards of `product` back into its row. Return its stock."""
+    with transaction.atomic():
+        total = _lock_stock(product)
+        StockShard.objects.filter(product=product).delete()
+        Product.objects.filter(pk=product.pk).update(stock=total, stock_shards=0)
+
+    product.stock, product.stock_shards = total, 0
+    return total
+
+def _lock_stock(product):
+    """Lock the shards of `product` and then its row, in the order reservations lock them, and return the total stock."""
+    shards = list(StockShard.objects.select_for_update().filter(product=product).order_by('pk').values_list('stock', flat=True))
+    stock = Product.objects.select_for_update().filter(pk=product.pk).values_list('stock', flat=True).get()
+    return stock + sum(shards)
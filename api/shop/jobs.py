@@ -0,0 +1,69 @@
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import bump_generation
+from shop.images import render_variants, variant_name
+from shop.models import Product, ProductImageJob
+
+def enqueue_image_job(product):
+    """Queue the generation of the variants of the current product image."""
+    return ProductImageJob.objects.create(product=product, source=product.image.name)
+
+def process_image_jobs(limit=10, executor=None):
+    """
+    Claim up to `limit` jobs and process them, rendering in `executor` when
+    given. Return the number of jobs claimed.
+    """
+    jobs = ProductImageJob.objects.claim(limit)
+    if not jobs:
+        return 0
+
+    storage = Product._meta.get_field('image').storage
+    pending = []
+    for job in jobs:
+        try:
+            with storage.open(job.source) as source:
+                data = source.read()
+        except OSError as error:
+            _fail(job, error)
+            continue
+
+        render = executor.submit(render_variants, data) if executor is not None else None
+        pending.append((job, data, render))
+
+    for job, data, render in pending:
+        try:
+            rendered = render.result() if render is not None else render_variants(data)
+            _finish(job, storage, rendered)
+        except Exception as error:
+            _fail(job, error)
+
+    return len(jobs)
+
+def _finish(job, storage, rendered):
+    variants = {
+        variant: {
+            extension: storage.save(variant_name(job.source, variant, extension), ContentFile(content))
+            for extension, content in formats.items()
+        }
+        for variant, formats in rendered.items()
+    }
+    with transaction.atomic():
+        # Only attach the variants if the image has not been replaced meanwhile.
+        updated = Product.objects.filter(pk=job.product_id, image=job.source).update(
+            image_variants=variants,
+            updated=timezone.now(),
+        )
+        ProductImageJob.objects.filter(pk=job.pk).update(status=ProductImageJob.DONE, error='', updated=timezone.now())
+
+    if updated:
+        # The update bypasses the signals that invalidate cached responses.
+        bump_generation(Product)
+    else:
+        for formats in variants.values():
+            for name in formats.values():
+                storage.delete(name)
+
+def _fail(job, error):
+    ProductImageJob.objects.filter(pk=job.pk).update(status=ProductImageJob.FAILED, error=str(error), updated=timezone.now())
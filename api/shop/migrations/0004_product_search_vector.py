@@ -0,0 +1,48 @@
+# Generated by Django 4.1.2 on 2026-10-18 03:15
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Fill the search vectors and index them, on PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        """
+        UPDATE shop_product
+        SET search_vector =
+            setweight(to_tsvector('english', coalesce(shop_product.name, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(shop_category.name, '')), 'B')
+            || setweight(to_tsvector('english', coalesce(shop_product.description, '')), 'C')
+        FROM shop_category
+        WHERE shop_category.id = shop_product.category_id
+        """
+    )
+    schema_editor.execute(
+        'CREATE INDEX shop_product_search_vector_gin ON shop_product USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS shop_product_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_category_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
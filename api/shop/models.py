@@ -1,9 +1,20 @@
-from django.db import models
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db import connections, models
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+import re
+
+SEARCH_CONFIG = 'english'
+# `ts_rank` is a float4, which the keyset cursor cannot give back exactly, so
+# the rank is rounded to a decimal that compares equal after the round trip.
+SEARCH_RANK_FIELD = models.DecimalField(max_digits=12, decimal_places=6)
 
 class Category(models.Model):
     """Products category model."""
     name = models.CharField(max_length=200, unique=True)
     slug = models.SlugField(max_length=200, unique=True)
+    updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('name',)
@@ -13,21 +24,176 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    """Queryset of products with full-text search."""
+
+    def _is_postgresql(self):
+        return connections[self.db].vendor == 'postgresql'
+
+    def update_search_vector(self):
+        """Recompute the stored search vector of the products, one UPDATE per category."""
+        if not self._is_postgresql():
+            return
+
+        categories = Category.objects.filter(id__in=self.values('category_id')).values_list('id', 'name')
+        for category_id, category_name in categories:
+            self.filter(category_id=category_id).update(search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector(models.Value(category_name), weight='B', config=SEARCH_CONFIG)
+                + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+            ))
+
+    def search(self, text):
+        """
+        Filter products matching every word of `text` as a prefix, best matches
+        first, then by name. Databases other than PostgreSQL fall back to substring matching
+        ordered by name.
+        """
+        terms = re.findall(r'\w+', text.lower())
+        if not terms:
+            return self.none()
+
+        if not self._is_postgresql():
+            queryset = self
+            for term in terms:
+                queryset = queryset.filter(
+                    models.Q(name__icontains=term)
+                    | models.Q(description__icontains=term)
+                    | models.Q(category__name__icontains=term)
+                )
+            return queryset
+
+        query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+        return (
+            self.filter(search_vector=query)
+            .annotate(rank=Cast(SearchRank(models.F('search_vector'), query), SEARCH_RANK_FIELD))
+            .order_by('-rank', 'name')
+        )
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    """Product manager that never loads the search vector unless asked to."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
 class Product(models.Model):
     """Products model."""
     category = models.ForeignKey(Category, related_name='products', on_delete=models.CASCADE)
     name = models.CharField(max_length=200, unique=True)
     slug = models.SlugField(max_length=200, unique=True)
     image = models.ImageField(upload_to='products/%d/%m/%Y', blank=True)
+    # Storage names of the resized copies of `image`, written by the image jobs.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     available = models.BooleanField(default=True)
+    # Units left to sell, plus the StockShard rows when `stock_shards` is set (see shop.inventory).
+    stock = models.PositiveIntegerField(default=0)
+    stock_shards = models.PositiveSmallIntegerField(default=0, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    # Maintained by shop.signals; indexed with GIN on PostgreSQL only (see migration 0004).
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductManager()
 
     class Meta:
         ordering = ('name',)
-        index_together = (('id', 'slug'),)
+        # Each index ends with `id`, the tiebreaker of the keyset pagination.
+        indexes = [
+            models.Index(fields=('category', 'available', 'name', 'id'), name='product_cat_avail_name_idx'),
+            models.Index(fields=('name', 'id'), condition=models.Q(available=True), name='product_available_name_idx'),
+            models.Index(fields=('price', 'id'), name='product_price_idx'),
+            models.Index(fields=('updated', 'id'), name='product_updated_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        """
+        Save the product. Updates leave out the stock columns unless named in
+        `update_fields`, as checkouts change them with queryset updates and a
+        full save would write back the stock the instance was loaded with.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = {'stock', 'stock_shards'} | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+class StockShard(models.Model):
+    """One of the counters a hot product's stock is spread over."""
+    product = models.ForeignKey(Product, related_name='shards', on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('product', 'shard')
+        constraints = [
+            models.UniqueConstraint(fields=('product', 'shard'), name='unique_product_shard'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}#{self.shard}: {self.stock}'
+
+class ProductImageJobQuerySet(models.QuerySet):
+    """Queue operations of image jobs."""
+
+    def claim(self, limit):
+        """
+        Mark up to `limit` pending jobs as processing and return them.
+        Each job is claimed with a conditional UPDATE, so concurrent workers
+        never pick the same job.
+        """
+        claimed = []
+        for job_id in self.filter(status=ProductImageJob.PENDING).values_list('id', flat=True)[:limit]:
+            updated = self.filter(pk=job_id, status=ProductImageJob.PENDING).update(
+                status=ProductImageJob.PROCESSING,
+                attempts=models.F('attempts') + 1,
+                updated=timezone.now(),
+            )
+            if updated:
+                claimed.append(job_id)
+
+        return list(self.filter(pk__in=claimed).select_related('product'))
+
+    def requeue_stale(self, older_than, max_attempts):
+        """Return jobs stuck in processing, e.g. after a worker crash, to the queue."""
+        stale = self.filter(status=ProductImageJob.PROCESSING, updated__lt=timezone.now() - older_than)
+        stale.filter(attempts__gte=max_attempts).update(status=ProductImageJob.FAILED, error='Too many attempts.')
+        return stale.filter(attempts__lt=max_attempts).update(status=ProductImageJob.PENDING)
+
+class ProductImageJob(models.Model):
+    """Queued generation of the image variants of a product."""
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    product = models.ForeignKey(Product, related_name='image_jobs', on_delete=models.CASCADE)
+    # Name of the product image when the job was queued; a newer upload supersedes the job.
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = ProductImageJobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=('status', 'id'), name='image_job_status_idx'),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f'{self.product} ({self.status})'
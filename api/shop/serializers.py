@@ -1,9 +1,14 @@
 from rest_framework import serializers
 from rest_framework import validators
 
+from drf_spectacular.utils import extend_schema_field
+
+from core.instrumentation import TimedSerializerMixin
 from shop import models
 
-class CategorySerializer(serializers.ModelSerializer):
+BULK_MAX_PRODUCTS = 1000
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for category objects."""
 
     class Meta:
@@ -17,13 +22,39 @@ class ProductCategorySerializer(serializers.Serializer):
     name = serializers.CharField(max_length=200)
     slug = serializers.SlugField(max_length=200)
 
-class ProductSerializer(serializers.ModelSerializer):
+@extend_schema_field({
+    'type': 'object',
+    'additionalProperties': {'type': 'object', 'additionalProperties': {'type': 'string', 'format': 'uri'}},
+    'example': {'thumbnail': {'webp': 'http://example.com/static/media/products/shirt_thumbnail.webp'}},
+})
+class ImageVariantsField(serializers.Field):
+    """Read-only field rendering the product image variants as `{variant: {format: url}}`."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', 'image_variants')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = models.Product._meta.get_field('image').storage
+        request = self.context.get('request')
+        urls = {}
+        for variant, formats in value.items():
+            urls[variant] = {}
+            for extension, name in formats.items():
+                url = storage.url(name)
+                urls[variant][extension] = request.build_absolute_uri(url) if request is not None else url
+
+        return urls
+
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for products."""
     category = ProductCategorySerializer(required=True)
+    images = ImageVariantsField()
 
     class Meta:
         model = models.Product
-        fields = ['id', 'name', 'category', 'slug', 'price', 'available', 'image']
+        fields = ['id', 'name', 'category', 'slug', 'price', 'available', 'image', 'images']
         lookup_field = 'slug'
         extra_kwargs = {
             'url': {
@@ -61,10 +92,11 @@ class ProductDetailSerializer(ProductSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to products."""
+    images = ImageVariantsField()
 
     class Meta:
         model = models.Product
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'images']
         read_only_fields = ('id',)
         lookup_field = 'slug'
         extra_kwargs = {
@@ -74,4 +106,33 @@ class ProductImageSerializer(serializers.ModelSerializer):
             'image': {
                 'required': True
             },
-        }
\ No newline at end of file
+        }
+
+class ProductBulkItemSerializer(serializers.Serializer):
+    """A product of a bulk request, keyed by slug and referencing its category by slug."""
+    slug = serializers.SlugField(max_length=200)
+    name = serializers.CharField(max_length=200)
+    category = serializers.SlugField(max_length=200)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    available = serializers.BooleanField(required=False)
+    stock = serializers.IntegerField(required=False, min_value=0)
+    description = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        """Require the slug even in partial updates."""
+        if 'slug' not in attrs:
+            raise serializers.ValidationError({'slug': ['This field is required.']}, code='required')
+
+        return attrs
+
+class ProductBulkSerializer(serializers.Serializer):
+    products = ProductBulkItemSerializer(many=True, allow_empty=False, max_length=BULK_MAX_PRODUCTS)
+
+class ProductBulkResultSerializer(serializers.Serializer):
+    slug = serializers.CharField(required=False)
+    status = serializers.ChoiceField(choices=[(status, status) for status in ('created', 'updated', 'unchanged', 'deleted', 'skipped', 'error')])
+    fields = serializers.ListField(child=serializers.CharField(), required=False)
+    errors = serializers.DictField(required=False)
+
+class ProductBulkResponseSerializer(serializers.Serializer):
+    results = ProductBulkResultSerializer(many=True)
\ No newline at end of file
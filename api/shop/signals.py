@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+from shop.models import Category, Product
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_cached_responses(sender, **kwargs):
+    """
+    Invalidate cached catalogue responses on every write, including admin
+    `list_editable` edits which save each changed row.
+    """
+    bump_generation(sender)
+    # Bump again once committed, so a response cached from another connection
+    # before the commit became visible is not served afterwards.
+    transaction.on_commit(lambda: bump_generation(sender))
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, raw=False, **kwargs):
+    """Refresh the search vector of the saved product."""
+    if not raw:
+        Product.objects.filter(pk=instance.pk).update_search_vector()
+
+@receiver(post_save, sender=Category)
+def update_category_search_vectors(sender, instance, created=False, raw=False, **kwargs):
+    """Refresh the search vectors of the products, which include the category name."""
+    if not raw and not created:
+        instance.products.all().update_search_vector()
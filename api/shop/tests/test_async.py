@@ -0,0 +1,119 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import include, path
+
+from rest_framework import routers
+from rest_framework.authtoken.models import Token
+
+import asyncio
+from decimal import Decimal
+
+from shop import models, views
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product, detail_url
+
+with override_settings(ASYNC_VIEWS=True):
+    router = routers.DefaultRouter()
+    router.register('products', views.ProductViewSet)
+    router.register('categories', views.CategoryViewSet)
+    routes = router.urls
+
+# Served as ROOT_URLCONF, so the async views answer at the usual urls.
+urlpatterns = [
+    path('api/shop/', include((routes, 'shop'))),
+]
+
+class AsyncProductViewTests(TestCase):
+    """Test the async product list and detail match the sync views."""
+
+    def setUp(self):
+        cache.clear()
+        self.shirts = create_category(name='shirts', slug='shirts')
+        self.pants = create_category(name='pants', slug='pants')
+        for i in range(5):
+            create_product(category=self.shirts, name=f'Shirt {i}', slug=f'shirt-{i}', price=Decimal(10 + i))
+        create_product(category=self.pants, name='Jeans', slug='jeans', price=Decimal('50.00'))
+
+    async def get_both(self, url, **extra):
+        """Return the responses of the sync and the async view to the same request."""
+        sync_response = await self.async_client.get(url, **extra)
+        with self.settings(ROOT_URLCONF=__name__):
+            async_response = await self.async_client.get(url, **extra)
+        return sync_response, async_response
+
+    def test_views_are_async(self):
+        """Test the read routes get coroutine views and the others keep the sync ones."""
+        callbacks = {pattern.name: pattern.callback for pattern in routes}
+
+        self.assertTrue(asyncio.iscoroutinefunction(callbacks['product-list']))
+        self.assertTrue(asyncio.iscoroutinefunction(callbacks['product-detail']))
+        self.assertFalse(asyncio.iscoroutinefunction(callbacks['product-export']))
+        self.assertFalse(asyncio.iscoroutinefunction(callbacks['category-list']))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    async def test_list_matches_sync(self):
+        """Test filtered, ordered and paginated lists are identical."""
+        url = f'{PRODUCTS_URL}?category=shirts&ordering=-price&page_size=2'
+        sync_response, async_response = await self.get_both(url)
+
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+
+        sync_response, async_response = await self.get_both(async_response.json()['next'])
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual([product['slug'] for product in async_response.json()['results']], ['shirt-2', 'shirt-1'])
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    async def test_detail_matches_sync(self):
+        """Test the product detail is identical."""
+        sync_response, async_response = await self.get_both(detail_url(product_slug='jeans'))
+
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    async def test_detail_not_found(self):
+        """Test a missing product is a 404."""
+        sync_response, async_response = await self.get_both(detail_url(product_slug='missing'))
+
+        self.assertEqual(async_response.status_code, 404)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    async def test_invalid_filter(self):
+        """Test invalid filters are rejected like in the sync view."""
+        sync_response, async_response = await self.get_both(f'{PRODUCTS_URL}?min_price=cheap')
+
+        self.assertEqual(async_response.status_code, 400)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    async def test_cache_shared_with_sync(self):
+        """Test the async view serves the responses cached by the sync view."""
+        sync_response, async_response = await self.get_both(PRODUCTS_URL)
+
+        self.assertEqual(sync_response['X-Cache'], 'MISS')
+        self.assertEqual(async_response['X-Cache'], 'HIT')
+        self.assertEqual(async_response.content, sync_response.content)
+
+    async def test_not_modified(self):
+        """Test a current ETag gets a 304."""
+        with self.settings(ROOT_URLCONF=__name__):
+            etag = (await self.async_client.get(PRODUCTS_URL))['ETag']
+            # AsyncClient takes header names as they are sent.
+            response = await self.async_client.get(PRODUCTS_URL, **{'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_use_sync_view(self):
+        """Test non-read methods on the async routes run the sync actions."""
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        token = Token.objects.create(user=admin)
+        payload = {'name': 'Hat', 'slug': 'hat', 'category': {'name': 'shirts', 'slug': 'shirts'}, 'price': '5.00'}
+
+        with self.settings(ROOT_URLCONF=__name__):
+            response = self.client.post(PRODUCTS_URL, payload, content_type='application/json', HTTP_AUTHORIZATION=f'Token {token.key}')
+            anonymous = self.client.post(PRODUCTS_URL, payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertTrue(models.Product.objects.filter(slug='hat').exists())
@@ -0,0 +1,185 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from shop import inventory, models
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product
+
+BULK_URL = reverse('shop:product-bulk')
+
+class BulkProductApiTests(TestCase):
+    """
+    Test the bulk product endpoint.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_authenticate(self.admin)
+        self.shirts = create_category(name='shirts')
+        self.coats = create_category(name='coats')
+        self.linen = create_product(category=self.shirts, name='Linen shirt', slug='linen-shirt', price=Decimal('30.00'))
+        self.wool = create_product(category=self.shirts, name='Wool shirt', slug='wool-shirt', price=Decimal('45.00'))
+
+    def test_bulk_create(self):
+        """Test creating products in bulk."""
+        payload = {'products': [
+            {'slug': 'rain-coat', 'name': 'Rain coat', 'category': 'coats', 'price': '99.90'},
+            {'slug': 'silk-shirt', 'name': 'Silk shirt', 'category': 'shirts', 'price': '60.00', 'available': False},
+        ]}
+
+        response = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'created'])
+        coat = models.Product.objects.get(slug='rain-coat')
+        self.assertEqual((coat.category, coat.price, coat.available), (self.coats, Decimal('99.90'), True))
+        self.assertFalse(models.Product.objects.get(slug='silk-shirt').available)
+
+    def test_bulk_create_errors(self):
+        """Test nothing is created when a row is invalid, with an error for each invalid row."""
+        payload = {'products': [
+            {'slug': 'rain-coat', 'name': 'Rain coat', 'category': 'coats', 'price': '99.90'},
+            {'slug': 'linen-shirt', 'name': 'Other shirt', 'category': 'shirts', 'price': '10.00'},
+            {'slug': 'new-shirt', 'name': 'Wool shirt', 'category': 'hats', 'price': '10.00'},
+        ]}
+
+        response = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['skipped', 'error', 'error'])
+        self.assertIn('slug', results[1]['errors'])
+        self.assertEqual(set(results[2]['errors']), {'name', 'category'})
+        self.assertFalse(models.Product.objects.filter(slug='rain-coat').exists())
+
+    def test_bulk_create_field_errors(self):
+        """Test field validation errors are reported per row."""
+        payload = {'products': [
+            {'slug': 'rain-coat', 'name': 'Rain coat', 'category': 'coats', 'price': '99.90'},
+            {'slug': 'bad-coat', 'category': 'coats', 'price': '-1'},
+        ]}
+
+        response = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['skipped', 'error'])
+        self.assertEqual(set(results[1]['errors']), {'name', 'price'})
+
+    def test_bulk_update_changed_fields_only(self):
+        """Test updates only write the fields which changed."""
+        payload = {'products': [
+            {'slug': 'linen-shirt', 'price': '35.00'},
+            {'slug': 'wool-shirt', 'price': '45.00', 'category': 'coats'},
+        ]}
+
+        with patch.object(models.Product.objects, 'bulk_update', wraps=models.Product.objects.bulk_update) as bulk_update:
+            response = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'slug': 'linen-shirt', 'status': 'updated', 'fields': ['price']},
+            {'slug': 'wool-shirt', 'status': 'updated', 'fields': ['category']},
+        ])
+        self.assertEqual(sorted(call.args[1] for call in bulk_update.call_args_list), [
+            ('category', 'updated'),
+            ('price', 'updated'),
+        ])
+        self.linen.refresh_from_db()
+        self.wool.refresh_from_db()
+        self.assertEqual(self.linen.price, Decimal('35.00'))
+        self.assertGreater(self.linen.updated, self.linen.created)
+        self.assertEqual(self.wool.category, self.coats)
+
+    def test_bulk_update_unchanged(self):
+        """Test rows matching the stored values are not written."""
+        updated = self.linen.updated
+
+        response = self.client.patch(BULK_URL, {'products': [{'slug': 'linen-shirt', 'price': '30'}]}, format='json')
+
+        self.assertEqual(response.data['results'], [{'slug': 'linen-shirt', 'status': 'unchanged', 'fields': []}])
+        self.linen.refresh_from_db()
+        self.assertEqual(self.linen.updated, updated)
+
+    def test_bulk_update_query_count(self):
+        """Test the number of queries does not grow with the number of rows."""
+        for i in range(20):
+            create_product(category=self.shirts, name=f'Shirt {i}', slug=f'shirt-{i}')
+        payload = {'products': [{'slug': f'shirt-{i}', 'price': '12.00', 'category': 'coats'} for i in range(20)]}
+
+        # Categories, products, the bulk update and the savepoint, plus on
+        # PostgreSQL the categories and the update of the search vectors.
+        queries = 7 if connection.vendor == 'postgresql' else 5
+
+        with self.assertNumQueries(queries):
+            response = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_update_errors(self):
+        """Test unknown products and missing slugs are reported."""
+        payload = {'products': [{'slug': 'missing', 'price': '1.00'}, {'price': '1.00'}]}
+
+        response = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('slug', response.data['results'][1]['errors'])
+
+    def test_bulk_update_stock_of_sharded_product(self):
+        """Test stock cannot be set on a product with stock shards, as the row only holds part of it."""
+        models.Product.objects.filter(pk=self.linen.pk).update(stock=100)
+        inventory.rebalance(self.linen, shards=4)
+        payload = {'products': [{'slug': 'linen-shirt', 'stock': 50}, {'slug': 'wool-shirt', 'stock': 5}]}
+
+        response = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('stock', response.data['results'][0]['errors'])
+        self.assertEqual(response.data['results'][1]['status'], 'skipped')
+        self.assertEqual(inventory.stock_levels([self.linen.id, self.wool.id]), {self.linen.id: 100, self.wool.id: 0})
+
+    def test_bulk_delete(self):
+        """Test deleting products in bulk."""
+        response = self.client.delete(BULK_URL, {'products': [{'slug': 'linen-shirt'}, {'slug': 'wool-shirt'}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']], ['deleted', 'deleted'])
+        self.assertFalse(models.Product.objects.exists())
+
+    def test_bulk_delete_unknown(self):
+        """Test nothing is deleted when a product does not exist."""
+        response = self.client.delete(BULK_URL, {'products': [{'slug': 'linen-shirt'}, {'slug': 'missing'}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(models.Product.objects.count(), 2)
+
+    def test_invalidates_once_per_batch(self):
+        """Test cached responses are invalidated once for a whole batch."""
+        self.client.get(PRODUCTS_URL)
+
+        with patch.object(caches['default'], 'incr', wraps=caches['default'].incr) as incr:
+            self.client.delete(BULK_URL, {'products': [{'slug': 'linen-shirt'}, {'slug': 'wool-shirt'}]}, format='json')
+
+        self.assertEqual(incr.call_count, 1)
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_not_staff(self):
+        """Test users which are not staff cannot use the bulk endpoint."""
+        user = get_user_model().objects.create_user(email='user@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_authenticate(user)
+
+        response = self.client.patch(BULK_URL, {'products': [{'slug': 'linen-shirt', 'price': '1.00'}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,119 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from decimal import Decimal
+
+from core.cache import stats
+from shop.tests.test_views import CATEGORIES_URL, PRODUCTS_URL, create_category, create_product, detail_url
+
+class ResponseCacheTests(TestCase):
+    """
+    Test the catalogue response cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        self.client = APIClient()
+        self.category = create_category(name='shirts')
+        self.product = create_product(category=self.category)
+
+    def test_second_request_served_from_cache(self):
+        """Test a repeated list request does not touch the database."""
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual((stats.hits, stats.misses), (1, 1))
+
+    def test_query_parameters_are_part_of_the_key(self):
+        """Test different query strings are cached separately."""
+        self.client.get(PRODUCTS_URL)
+
+        response = self.client.get(PRODUCTS_URL, {'page_size': 1})
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_product_save_invalidates(self):
+        """Test saving a product invalidates the cached list and detail."""
+        self.client.get(PRODUCTS_URL)
+        self.client.get(detail_url(product_slug=self.product.slug))
+
+        self.product.price = Decimal('20.00')
+        self.product.save()
+
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['price'], '20.00')
+        response = self.client.get(detail_url(product_slug=self.product.slug))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['price'], '20.00')
+
+    def test_category_save_invalidates_products(self):
+        """Test renaming a category invalidates the product list it is nested in."""
+        self.client.get(PRODUCTS_URL)
+        self.client.get(CATEGORIES_URL)
+
+        self.category.name = 'tops'
+        self.category.save()
+
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response.data['results'][0]['category']['name'], 'tops')
+        response = self.client.get(CATEGORIES_URL)
+        self.assertEqual(response.data['results'][0]['name'], 'tops')
+
+    def test_product_delete_invalidates(self):
+        """Test deleting a product removes it from the cached list."""
+        self.client.get(PRODUCTS_URL)
+
+        self.product.delete()
+
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response.data['results'], [])
+
+    def test_product_save_keeps_category_cache(self):
+        """Test product writes do not invalidate the category list."""
+        self.client.get(CATEGORIES_URL)
+
+        self.product.save()
+
+        response = self.client.get(CATEGORIES_URL)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_admin_list_editable_invalidates(self):
+        """Test a price edit from the admin changelist invalidates the list."""
+        self.client.get(PRODUCTS_URL)
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_login(admin)
+        payload = {
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': str(self.product.id),
+            'form-0-price': '25.00',
+            'form-0-available': 'on',
+            'form-0-stock': '0',
+            '_save': 'Save',
+        }
+
+        response = self.client.post(reverse('admin:shop_product_changelist'), payload)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+        response = self.client.get(PRODUCTS_URL)
+        self.assertEqual(response.data['results'][0]['price'], '25.00')
+
+    def test_cache_disabled(self):
+        """Test the cache can be switched off."""
+        with self.settings(RESPONSE_CACHE_ENABLED=False):
+            self.client.get(PRODUCTS_URL)
+            response = self.client.get(PRODUCTS_URL)
+
+        self.assertNotIn('X-Cache', response)
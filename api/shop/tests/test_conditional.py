@@ -0,0 +1,133 @@
+from django.test import TestCase
+from django.core.cache import cache
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from decimal import Decimal
+
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product, detail_url
+
+class ConditionalGetTests(TestCase):
+    """
+    Test ETag and Last-Modified handling of the catalogue endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = create_category(name='shirts')
+        self.product = create_product(category=self.category)
+
+    def test_list_has_validators(self):
+        """Test the product list returns an ETag, but no Last-Modified which deletions would not move."""
+        response = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertNotIn('Last-Modified', response)
+
+    def test_detail_has_validators(self):
+        """Test the product detail returns an ETag and Last-Modified."""
+        response = self.client.get(detail_url(product_slug=self.product.slug))
+
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_if_none_match_not_modified(self):
+        """Test a matching If-None-Match returns 304 without a body or queries."""
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_none_match_without_cache(self):
+        """Test the 304 costs a single aggregate query when responses are not cached."""
+        with self.settings(RESPONSE_CACHE_ENABLED=False):
+            etag = self.client.get(PRODUCTS_URL)['ETag']
+
+            with self.assertNumQueries(1):
+                response = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_not_modified(self):
+        """Test a current If-Modified-Since returns 304."""
+        url = detail_url(product_slug=self.product.slug)
+        last_modified = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_after_delete(self):
+        """Test a list is returned again after a deletion to a client sending only If-Modified-Since."""
+        other = create_product(category=self.category, name='Other shirt', slug='other-shirt')
+        last_modified = self.client.get(detail_url(product_slug=other.slug))['Last-Modified']
+
+        other.delete()
+        response = self.client.get(PRODUCTS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['slug'] for product in response.data['results']], [self.product.slug])
+
+    def test_etag_changes_on_product_update(self):
+        """Test updating a product changes the ETag and returns the new body."""
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+
+        self.product.price = Decimal('20.00')
+        self.product.save()
+        response = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_on_category_update(self):
+        """Test renaming the category changes the product ETag."""
+        etag = self.client.get(detail_url(product_slug=self.product.slug))['ETag']
+
+        self.category.name = 'tops'
+        self.category.save()
+        response = self.client.get(detail_url(product_slug=self.product.slug), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['category']['name'], 'tops')
+
+    def test_etag_changes_on_delete(self):
+        """Test deleting a product changes the list ETag."""
+        other = create_product(category=self.category, name='Other shirt', slug='other-shirt')
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+
+        other.delete()
+        response = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_pages_have_distinct_etags(self):
+        """Test different query strings get different ETags."""
+        create_product(category=self.category, name='Other shirt', slug='other-shirt')
+
+        first = self.client.get(PRODUCTS_URL, {'page_size': 1})
+        second = self.client.get(first.data['next'])
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_category_detail_not_modified(self):
+        """Test the category detail supports conditional requests."""
+        url = detail_url(category_slug=self.category.slug)
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_detail_not_found(self):
+        """Test a missing object is still a 404 without validators."""
+        response = self.client.get(detail_url(product_slug='missing'), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
@@ -0,0 +1,100 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+import csv
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from shop import models
+from shop.tests.test_views import create_category, create_product
+
+def export_url(export_format):
+    """Create and return the export url for a format."""
+    return reverse('shop:product-export', args=[export_format])
+
+class ExportTests(TestCase):
+    """
+    Test streaming the catalogue export.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_authenticate(self.admin)
+        self.category = create_category(name='shirts')
+        create_product(category=self.category, name='Linen shirt', slug='linen-shirt', price=Decimal('30.00'), description='Light, "airy"')
+        create_product(category=self.category, name='Wool shirt', slug='wool-shirt', price=Decimal('45.50'), available=False)
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_export_csv(self):
+        """Test exporting the catalogue as CSV."""
+        response = self.client.get(export_url('csv'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="catalog.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(self.content(response))))
+        self.assertEqual([row['slug'] for row in rows], ['linen-shirt', 'wool-shirt'])
+        self.assertEqual(rows[0]['description'], 'Light, "airy"')
+        self.assertEqual((rows[1]['category'], rows[1]['price'], rows[1]['available']), ('shirts', '45.50', 'False'))
+
+    def test_export_ndjson(self):
+        """Test exporting the catalogue as NDJSON."""
+        response = self.client.get(export_url('ndjson'))
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(rows[0]['price'], '30.00')
+        self.assertEqual(rows[1]['available'], False)
+        self.assertEqual(rows[1]['category_name'], 'shirts')
+
+    def test_export_filtered(self):
+        """Test the list filters apply to the export."""
+        response = self.client.get(export_url('ndjson'), {'available': 'false'})
+
+        self.assertEqual([json.loads(line)['slug'] for line in self.content(response).splitlines()], ['wool-shirt'])
+
+    def test_export_single_query(self):
+        """Test the export reads the catalogue with one query."""
+        with self.assertNumQueries(1):
+            self.content(self.client.get(export_url('csv')))
+
+    def test_export_staff_only(self):
+        """Test users which are not staff cannot export."""
+        user = get_user_model().objects.create_user(email='user@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_authenticate(user)
+
+        response = self.client.get(export_url('csv'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_catalog_command_round_trip(self):
+        """Test the command output can be imported back."""
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command('export_catalog', output=path, stderr=StringIO())
+        models.Product.objects.update(price=Decimal('1.00'))
+        call_command('import_catalog', path, stdout=StringIO())
+
+        self.assertEqual(list(models.Product.objects.values_list('price', flat=True)), [Decimal('30.00'), Decimal('45.50')])
+
+    def test_export_catalog_command_stdout(self):
+        """Test the command writes NDJSON to standard output."""
+        output = StringIO()
+
+        call_command('export_catalog', format='ndjson', stdout=output)
+
+        self.assertEqual(len(output.getvalue().splitlines()), 2)
@@ -0,0 +1,150 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test.client import RequestFactory
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from datetime import timedelta
+from decimal import Decimal
+
+from shop import models
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product
+from shop.views import ProductViewSet
+
+class ProductFilterTests(TestCase):
+    """
+    Test filtering and ordering the product list.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        shirts = create_category(name='shirts')
+        shoes = create_category(name='shoes')
+        create_product(category=shirts, name='Linen shirt', slug='linen-shirt', price=Decimal('30.00'))
+        create_product(category=shirts, name='Flannel shirt', slug='flannel-shirt', price=Decimal('45.00'), available=False)
+        create_product(category=shoes, name='Running shoe', slug='running-shoe', price=Decimal('80.00'))
+
+    def slugs(self, **params):
+        """Return the slugs of the listed products, in order."""
+        response = self.client.get(PRODUCTS_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['slug'] for product in response.data['results']]
+
+    def test_filter_by_category(self):
+        """Test filtering by category slug."""
+        self.assertEqual(self.slugs(category='shirts'), ['flannel-shirt', 'linen-shirt'])
+
+    def test_filter_by_price_range(self):
+        """Test filtering by minimum and maximum price, inclusive."""
+        self.assertEqual(self.slugs(min_price='30', max_price='45.00'), ['flannel-shirt', 'linen-shirt'])
+
+    def test_filter_by_availability(self):
+        """Test filtering by availability."""
+        self.assertEqual(self.slugs(available='true'), ['linen-shirt', 'running-shoe'])
+        self.assertEqual(self.slugs(available='false'), ['flannel-shirt'])
+
+    def test_filter_by_updated_since(self):
+        """Test filtering products updated since a given time."""
+        since = timezone.now()
+        product = models.Product.objects.get(slug='running-shoe')
+        product.save()
+
+        self.assertEqual(self.slugs(updated_since=since.isoformat()), ['running-shoe'])
+
+    def test_filters_combined(self):
+        """Test filters can be combined."""
+        self.assertEqual(self.slugs(category='shirts', available='true'), ['linen-shirt'])
+
+    def test_invalid_filter(self):
+        """Test an invalid filter value returns bad request."""
+        response = self.client.get(PRODUCTS_URL, {'min_price': 'cheap'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_price', response.data)
+
+    def test_ordering(self):
+        """Test ordering by a whitelisted field."""
+        self.assertEqual(self.slugs(ordering='-price'), ['running-shoe', 'flannel-shirt', 'linen-shirt'])
+
+    def test_ordering_not_whitelisted(self):
+        """Test ordering by other fields is ignored."""
+        self.assertEqual(self.slugs(ordering='description'), ['flannel-shirt', 'linen-shirt', 'running-shoe'])
+
+    def test_ordering_paginated(self):
+        """Test cursors follow the requested ordering."""
+        response = self.client.get(PRODUCTS_URL, {'ordering': '-price', 'page_size': 2})
+        response = self.client.get(response.data['next'])
+
+        self.assertEqual([product['slug'] for product in response.data['results']], ['linen-shirt'])
+
+    def test_ordering_by_updated_paginated(self):
+        """Test cursors on a timestamp keep their full precision."""
+        seen = []
+        url = f'{PRODUCTS_URL}?ordering=updated&page_size=1'
+        while url:
+            response = self.client.get(url)
+            seen += [product['slug'] for product in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(sorted(seen), ['flannel-shirt', 'linen-shirt', 'running-shoe'])
+
+class ProductIndexTests(TestCase):
+    """
+    Test every supported filter combination is served by an index.
+    """
+
+    def setUp(self):
+        category = create_category(name='shirts')
+        models.Product.objects.bulk_create([
+            models.Product(category=category, name=f'shirt {i}', slug=f'shirt-{i}', price=Decimal(i), available=i % 2 == 0)
+            for i in range(200)
+        ])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def get_plan(self, **params):
+        """Return the query plan of the list page the view runs for `params`."""
+        request = Request(RequestFactory().get(PRODUCTS_URL, params))
+        view = ProductViewSet(action='list', request=request, format_kwarg=None, kwargs={})
+        queryset = view.filter_queryset(view.get_queryset())
+        queryset = view.paginator.get_page_queryset(queryset, request, view)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, **params):
+        plan = self.get_plan(**params)
+        if connection.vendor == 'sqlite':
+            product_steps = [line for line in plan.splitlines() if 'shop_product' in line]
+            self.assertTrue(product_steps, plan)
+            for step in product_steps:
+                self.assertIn('INDEX', step, f'{params} scans shop_product:\n{plan}')
+        else:
+            self.assertNotIn('Seq Scan on shop_product', plan, f'{params} scans shop_product:\n{plan}')
+            self.assertIn('Index', plan)
+
+    def test_filters_use_indexes(self):
+        """Test each filter combination and ordering uses an index on products."""
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        combinations = [
+            {},
+            {'category': 'shirts'},
+            {'category': 'shirts', 'available': 'true'},
+            {'category': 'shirts', 'available': 'false'},
+            {'available': 'true'},
+            {'min_price': '10', 'max_price': '20', 'ordering': 'price'},
+            {'min_price': '10', 'ordering': '-price'},
+            {'updated_since': since, 'ordering': 'updated'},
+            {'ordering': '-updated'},
+        ]
+        for params in combinations:
+            with self.subTest(params=params):
+                self.assertUsesIndex(**params)
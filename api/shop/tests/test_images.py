@@ -0,0 +1,193 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from PIL import Image
+
+from shop import models
+from shop.images import VARIANTS, render_variants
+from shop.jobs import enqueue_image_job, process_image_jobs
+from shop.tests.test_views import create_category, create_product, detail_url
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+def upload_url(product_slug):
+    """Create and return an image upload url for a product."""
+    return reverse('shop:product-upload-image', args=[product_slug])
+
+def create_image(size=(2000, 1000), mode='RGB', format='JPEG', **options):
+    """Return the bytes of a generated image."""
+    output = BytesIO()
+    Image.new(mode, size, 'red').save(output, format, **options)
+    return output.getvalue()
+
+class RenderVariantsTests(TestCase):
+    """
+    Test rendering image variants.
+    """
+
+    def test_variant_sizes_and_formats(self):
+        """Test every variant is rendered in WebP and JPEG within its size."""
+        rendered = render_variants(create_image())
+
+        for variant, size in VARIANTS.items():
+            self.assertEqual(set(rendered[variant]), {'webp', 'jpeg'})
+            for extension, format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+                with Image.open(BytesIO(rendered[variant][extension])) as image:
+                    self.assertEqual(image.format, format)
+                    self.assertEqual(image.size, (size, size // 2))
+
+    def test_metadata_stripped(self):
+        """Test EXIF data is not copied to the variants."""
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+        rendered = render_variants(create_image(exif=exif.tobytes()))
+
+        with Image.open(BytesIO(rendered['card']['jpeg'])) as image:
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertNotIn('exif', image.info)
+
+    def test_transparent_image(self):
+        """Test transparent images are flattened."""
+        rendered = render_variants(create_image(mode='RGBA', format='PNG'))
+
+        with Image.open(BytesIO(rendered['thumbnail']['jpeg'])) as image:
+            self.assertEqual(image.mode, 'RGB')
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImagePipelineTests(TestCase):
+    """
+    Test queueing and processing product images.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_authenticate(self.admin)
+        self.product = create_product(category=create_category())
+
+    def upload(self, data=None):
+        image = ContentFile(data or create_image(), name='shirt.jpg')
+        return self.client.post(upload_url(self.product.slug), {'image': image}, format='multipart')
+
+    def test_upload_is_queued(self):
+        """Test an upload is accepted and queued without rendering variants."""
+        response = self.upload()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['images'], {})
+        job = models.ProductImageJob.objects.get()
+        self.product.refresh_from_db()
+        self.assertEqual(job.source, self.product.image.name)
+        self.assertEqual(job.status, models.ProductImageJob.PENDING)
+
+    def test_invalid_upload(self):
+        """Test a file which is not an image is rejected and not queued."""
+        response = self.upload(b'not an image')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.ProductImageJob.objects.exists())
+
+    def test_process_jobs(self):
+        """Test processing stores the variants next to the original and exposes their urls."""
+        self.upload()
+        self.client.get(reverse('shop:product-list'))
+
+        self.assertEqual(process_image_jobs(), 1)
+
+        self.product.refresh_from_db()
+        self.assertEqual(models.ProductImageJob.objects.get().status, models.ProductImageJob.DONE)
+        stem = self.product.image.name.rsplit('.', 1)[0]
+        self.assertEqual(self.product.image_variants['thumbnail']['webp'], f'{stem}_thumbnail.webp')
+        for formats in self.product.image_variants.values():
+            for name in formats.values():
+                self.assertTrue(default_storage.exists(name))
+
+        response = self.client.get(reverse('shop:product-list'))
+        images = response.data['results'][0]['images']
+        self.assertEqual(set(images), set(VARIANTS))
+        self.assertTrue(images['thumbnail']['webp'].startswith('http://testserver/'))
+        self.assertTrue(images['thumbnail']['webp'].endswith('_thumbnail.webp'))
+        response = self.client.get(detail_url(product_slug=self.product.slug))
+        self.assertEqual(response.data['images'], images)
+
+    def test_process_jobs_in_pool(self):
+        """Test variants can be rendered in worker processes."""
+        self.upload()
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            process_image_jobs(executor=executor)
+
+        self.product.refresh_from_db()
+        self.assertEqual(set(self.product.image_variants), set(VARIANTS))
+
+    def test_superseded_job(self):
+        """Test a job whose image was replaced before processing does not attach its variants."""
+        self.upload()
+        self.upload()
+
+        process_image_jobs()
+
+        self.product.refresh_from_db()
+        jobs = models.ProductImageJob.objects.all()
+        self.assertEqual([job.status for job in jobs], [models.ProductImageJob.DONE] * 2)
+        self.assertEqual(self.product.image_variants['full']['jpeg'].rsplit('_', 1)[0], self.product.image.name.rsplit('.', 1)[0])
+
+    def test_failed_job(self):
+        """Test a job whose source cannot be rendered is marked as failed."""
+        self.product.image.save('broken.jpg', ContentFile(b'broken'))
+        enqueue_image_job(self.product)
+
+        process_image_jobs()
+
+        job = models.ProductImageJob.objects.get()
+        self.assertEqual(job.status, models.ProductImageJob.FAILED)
+        self.assertTrue(job.error)
+
+    def test_claimed_job_not_claimed_again(self):
+        """Test a job being processed is not handed to another worker."""
+        job = enqueue_image_job(self.product)
+
+        self.assertEqual(models.ProductImageJob.objects.claim(10), [job])
+        self.assertEqual(models.ProductImageJob.objects.claim(10), [])
+
+    def test_requeue_stale(self):
+        """Test jobs left processing by a crashed worker are requeued until they run out of attempts."""
+        job = enqueue_image_job(self.product)
+        models.ProductImageJob.objects.claim(1)
+
+        self.assertEqual(models.ProductImageJob.objects.requeue_stale(timedelta(seconds=-1), max_attempts=2), 1)
+        models.ProductImageJob.objects.claim(1)
+        models.ProductImageJob.objects.requeue_stale(timedelta(seconds=-1), max_attempts=2)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (models.ProductImageJob.FAILED, 2))
+
+    def test_process_images_command(self):
+        """Test the worker command drains the queue."""
+        self.upload()
+        output = StringIO()
+
+        call_command('process_images', workers=0, once=True, stdout=output)
+
+        self.assertIn('Processed 1 image jobs.', output.getvalue())
+        self.assertEqual(models.ProductImageJob.objects.get().status, models.ProductImageJob.DONE)
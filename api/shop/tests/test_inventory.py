@@ -0,0 +1,222 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.urls import reverse
+
+from decimal import Decimal
+
+from orders.checkout import CheckoutError, cancel_order, place_order
+from orders.tests.test_concurrency import StaticCart
+from shop import inventory, models
+from shop.tests.test_views import create_category, create_product
+
+def shard_stock(product):
+    return list(product.shards.order_by('shard').values_list('stock', flat=True))
+
+class InventoryTests(TestCase):
+    """Test sharded stock counters."""
+
+    def setUp(self):
+        self.product = create_product(category=create_category(), stock=10)
+
+    def test_rebalance_spreads_stock(self):
+        """Test rebalancing spreads the whole stock evenly over the shards."""
+        total = inventory.rebalance(self.product, shards=4)
+
+        self.product.refresh_from_db()
+        self.assertEqual(total, 10)
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual(self.product.stock_shards, 4)
+        self.assertEqual(shard_stock(self.product), [3, 3, 2, 2])
+
+    def test_rebalance_changes_shard_count(self):
+        """Test rebalancing again folds the row stock in and resizes the shards."""
+        inventory.rebalance(self.product, shards=4)
+        models.Product.objects.filter(pk=self.product.pk).update(stock=5)
+
+        inventory.rebalance(self.product, shards=2)
+
+        self.assertEqual(shard_stock(self.product), [8, 7])
+        self.assertEqual(inventory.stock_levels([self.product.id]), {self.product.id: 15})
+
+    def test_rebalance_needs_a_shard(self):
+        """Test rebalancing over no shard fails."""
+        with self.assertRaises(ValueError):
+            inventory.rebalance(self.product, shards=0)
+
+    def test_merge(self):
+        """Test merging moves the shard stock back into the product row."""
+        inventory.rebalance(self.product, shards=4)
+
+        self.assertEqual(inventory.merge(self.product), 10)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+        self.assertEqual(self.product.stock_shards, 0)
+        self.assertFalse(self.product.shards.exists())
+
+    def test_stock_levels_sum_shards(self):
+        """Test stock levels add the shards to the product row."""
+        other = create_product(category=self.product.category, name='Other', slug='other', stock=3)
+        inventory.rebalance(self.product, shards=3)
+
+        self.assertEqual(inventory.stock_levels([self.product.id, other.id]), {self.product.id: 10, other.id: 3})
+
+    def test_reserve_takes_one_shard(self):
+        """Test a reservation which fits in a shard takes from one shard only."""
+        inventory.rebalance(self.product, shards=2)
+
+        self.assertTrue(inventory.reserve({self.product.id: 2}, sharded={self.product.id}))
+
+        self.assertIn(shard_stock(self.product), ([3, 5], [5, 3]))
+
+    def test_reserve_across_shards(self):
+        """Test a reservation larger than any shard takes from several of them."""
+        inventory.rebalance(self.product, shards=4)
+
+        self.assertTrue(inventory.reserve({self.product.id: 8}, sharded={self.product.id}))
+
+        self.assertEqual(sum(shard_stock(self.product)), 2)
+
+    def test_reserve_uses_product_row(self):
+        """Test stock left in the product row of a sharded product can be reserved."""
+        inventory.rebalance(self.product, shards=2)
+        models.Product.objects.filter(pk=self.product.pk).update(stock=4)
+
+        self.assertTrue(inventory.reserve({self.product.id: 13}, sharded={self.product.id}))
+
+        self.assertEqual(inventory.stock_levels([self.product.id]), {self.product.id: 1})
+
+    def test_reserve_short_takes_nothing(self):
+        """Test a reservation the stock cannot cover leaves every counter unchanged."""
+        other = create_product(category=self.product.category, name='Other', slug='other', stock=3)
+        inventory.rebalance(self.product, shards=4)
+
+        self.assertFalse(inventory.reserve({other.id: 1, self.product.id: 11}, sharded={self.product.id}))
+
+        self.assertEqual(inventory.stock_levels([self.product.id, other.id]), {self.product.id: 10, other.id: 3})
+
+    def test_release_into_shard(self):
+        """Test released stock goes back into a shard of a sharded product."""
+        inventory.rebalance(self.product, shards=2)
+
+        inventory.release({self.product.id: 3})
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual(sum(shard_stock(self.product)), 13)
+
+    def test_checkout_sharded_product(self):
+        """Test orders of a sharded product reserve and return shard stock."""
+        inventory.rebalance(self.product, shards=4)
+        cart = StaticCart({self.product.id: {'quantity': 6, 'price': self.product.price}})
+
+        order = place_order(cart)
+
+        self.assertEqual(inventory.stock_levels([self.product.id]), {self.product.id: 4})
+        with self.assertRaises(CheckoutError) as context:
+            place_order(StaticCart({self.product.id: {'quantity': 5, 'price': self.product.price}}))
+        self.assertEqual(context.exception.errors, {str(self.product.id): ['Only 4 left in stock.']})
+
+        cancel_order(order)
+        self.assertEqual(inventory.stock_levels([self.product.id]), {self.product.id: 10})
+
+class InventoryAdminTests(TestCase):
+    """Test the stock admin and the stock shard admin actions."""
+
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_login(admin)
+        self.product = create_product(category=create_category(), price=Decimal('10.00'), stock=9)
+
+    @override_settings(INVENTORY_SHARDS=3)
+    def test_rebalance_action(self):
+        """Test the rebalance action shards the selected products."""
+        response = self.client.post(reverse('admin:shop_product_changelist'), {
+            'action': 'rebalance_stock_shards',
+            '_selected_action': [self.product.pk],
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(shard_stock(self.product), [3, 3, 3])
+
+    def test_merge_action(self):
+        """Test the merge action moves the shards back into the product row."""
+        inventory.rebalance(self.product, shards=3)
+
+        self.client.post(reverse('admin:shop_product_changelist'), {
+            'action': 'merge_stock_shards',
+            '_selected_action': [self.product.pk],
+        })
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 9)
+        self.assertEqual(self.product.stock_shards, 0)
+
+    def test_changelist_shows_total_stock(self):
+        """Test the changelist shows the stock summed over the shards."""
+        inventory.rebalance(self.product, shards=3)
+
+        response = self.client.get(reverse('admin:shop_product_changelist'))
+
+        self.assertContains(response, '<td class="field-total_stock">9</td>', html=True)
+
+    def change(self, **data):
+        """Post the product change form with `data` over the current values."""
+        fields = {'name': self.product.name, 'slug': self.product.slug, 'category': self.product.category_id, 'price': '10.00', 'available': 'on'}
+        return self.client.post(reverse('admin:shop_product_change', args=[self.product.pk]), {**fields, **data})
+
+    def test_change_form_adds_stock(self):
+        """Test stock added in the change form keeps units sold since the form was loaded."""
+        models.Product.objects.filter(pk=self.product.pk).update(stock=F('stock') - 2)
+
+        response = self.change(price='11.00', add_stock='5', stock='100')
+
+        self.assertEqual(response.status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.price, self.product.stock), (Decimal('11.00'), 12))
+
+    def test_change_form_removes_stock(self):
+        """Test removing more units than are left empties the stock."""
+        self.change(add_stock='-20')
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    def test_changelist_stock_not_editable(self):
+        """Test saving the changelist does not write the stock back."""
+        models.Product.objects.filter(pk=self.product.pk).update(stock=F('stock') - 2)
+
+        response = self.client.post(reverse('admin:shop_product_changelist'), {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': self.product.pk, 'form-0-price': '12.00', 'form-0-available': 'on', 'form-0-stock': '9',
+            '_save': 'Save',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.price, self.product.stock), (Decimal('12.00'), 7))
+
+class ProductSaveTests(TestCase):
+    """Test saving products leaves the stock to the inventory updates."""
+
+    def test_save_keeps_stock(self):
+        """Test a full save does not write back the stock the instance was loaded with."""
+        product = create_product(category=create_category(), stock=10)
+        models.Product.objects.filter(pk=product.pk).update(stock=F('stock') - 3)
+
+        product.price = Decimal('20.00')
+        product.save()
+
+        product.refresh_from_db()
+        self.assertEqual((product.price, product.stock), (Decimal('20.00'), 7))
+
+    def test_save_with_update_fields(self):
+        """Test naming the stock in `update_fields` still writes it."""
+        product = create_product(category=create_category(), stock=10)
+
+        product.stock = 4
+        product.save(update_fields=['stock'])
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 4)
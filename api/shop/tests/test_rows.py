@@ -0,0 +1,150 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from decimal import Decimal
+
+from shop import models, rows, serializers
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product, detail_url
+
+VARIANTS = {
+    'thumbnail': {'webp': 'products/01/10/2022/shirt_thumbnail.webp', 'jpeg': 'products/01/10/2022/shirt_thumbnail.jpg'},
+    'full': {'webp': 'products/01/10/2022/shirt_full.webp', 'jpeg': 'products/01/10/2022/shirt_full.jpg'},
+}
+
+def create_catalogue():
+    """Create products covering the values the representation formats."""
+    shirts = create_category(name='Koszule', slug='koszule')
+    hats = create_category(name='Hats & caps', slug='hats')
+    create_product(category=shirts, name='Zażółć shirt', slug='shirt', price=Decimal('13.99'), description='Linen "light"\nshirt')
+    create_product(category=shirts, name='Cheap shirt', slug='cheap-shirt', price=Decimal('0.50'), available=False)
+    create_product(category=hats, name='Top hat', slug='top-hat', price=Decimal('1000.00'))
+    models.Product.objects.filter(slug__in=['shirt', 'top-hat']).update(image='products/01/10/2022/shirt.jpg', image_variants=VARIANTS)
+
+class ProductRowsContractTests(TestCase):
+    """Test the row renderer gives the serializer output byte for byte."""
+
+    def setUp(self):
+        create_catalogue()
+        self.request = APIRequestFactory().get(PRODUCTS_URL)
+
+    def assertSameBytes(self, rows_data, serializer_data):
+        self.assertEqual(JSONRenderer().render(rows_data), JSONRenderer().render(serializer_data))
+
+    def test_list(self):
+        """Test the list rows render like `ProductSerializer`."""
+        for context in ({'request': self.request}, {}):
+            with self.subTest(context=context):
+                products = models.Product.objects.select_related('category').order_by('id')
+                product_rows = rows.product_rows(models.Product.objects.order_by('id'))
+
+                self.assertSameBytes(
+                    rows.ProductRows(list(product_rows), many=True, context=context).data,
+                    serializers.ProductSerializer(products, many=True, context=context).data,
+                )
+
+    def test_detail(self):
+        """Test the detail rows render like `ProductDetailSerializer`."""
+        for product in models.Product.objects.select_related('category'):
+            with self.subTest(slug=product.slug):
+                row = rows.product_rows(models.Product.objects.all(), detail=True).get(pk=product.pk)
+
+                self.assertSameBytes(
+                    rows.ProductRows(row, detail=True, context={'request': self.request}).data,
+                    serializers.ProductDetailSerializer(product, context={'request': self.request}).data,
+                )
+
+class MediaUrlsTests(TestCase):
+    """Test the media urls are the ones `storage.url` and `build_absolute_uri` give."""
+    NAMES = (
+        'products/shirt.jpg', 'products/zażółć shirt (1).jpg', 'products/50%/a?b#c;d.jpg', 'products/~x!*\'.jpg',
+        '/products/shirt.jpg', 'products//shirt.jpg', 'products/./shirt.jpg', 'products/../shirt.jpg', './shirt.jpg',
+        'products/.shirt.jpg', 'products/..shirt', 'products/', 'a:b.jpg', 'products\\shirt.jpg',
+    )
+
+    def test_same_urls(self):
+        """Test plain and unusual names under plain and unusual media urls."""
+        storage = models.Product._meta.get_field('image').storage
+        request = APIRequestFactory().get(PRODUCTS_URL)
+        for media_url in ('/static/media/', '/', '/media/./files/', '//cdn.example.com/media/', 'https://cdn.example.com/media/'):
+            with self.settings(MEDIA_URL=media_url):
+                for name in self.NAMES:
+                    with self.subTest(media_url=media_url, name=name):
+                        self.assertEqual(rows.MediaUrls().url(name), storage.url(name))
+                        self.assertEqual(rows.MediaUrls(request).url(name), request.build_absolute_uri(storage.url(name)))
+
+    def test_prefix(self):
+        """Test plain names are not parsed with the default media url."""
+        urls = rows.MediaUrls(APIRequestFactory().get(PRODUCTS_URL))
+
+        self.assertEqual(urls.prefix, 'http://testserver/static/media/')
+        self.assertEqual(urls.url('products/shirt.jpg'), 'http://testserver/static/media/products/shirt.jpg')
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ProductRowsApiTests(TestCase):
+    """Test the product list and detail responses are the same with and without the row renderer."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_catalogue()
+
+    def assertSameResponse(self, url, urlconf=None):
+        contents = []
+        for fast in (True, False):
+            with self.settings(FAST_PRODUCT_READS=fast, **({'ROOT_URLCONF': urlconf} if urlconf else {})):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            contents.append(response.content)
+
+        self.assertEqual(contents[0], contents[1])
+        return response
+
+    def test_list(self):
+        """Test list pages, filtered, ordered and paginated, are the same."""
+        for query in ('', '?ordering=-price', '?ordering=-updated', '?category=koszule', '?available=true&min_price=1', '?search=shirt'):
+            with self.subTest(query=query):
+                self.assertSameResponse(PRODUCTS_URL + query)
+
+        response = self.assertSameResponse(PRODUCTS_URL + '?page_size=1&ordering=price')
+        self.assertSameResponse(response.json()['next'])
+
+    def test_rows_rendered(self):
+        """Test the reads render rows rather than serializing instances."""
+        response = self.client.get(PRODUCTS_URL)
+
+        self.assertIs(type(response.data['results'][0]), dict)
+        self.assertIs(type(self.client.get(detail_url(product_slug='shirt')).data), dict)
+
+    def test_detail(self):
+        """Test product details are the same."""
+        for slug in ('shirt', 'cheap-shirt', 'top-hat'):
+            with self.subTest(slug=slug):
+                self.assertSameResponse(detail_url(product_slug=slug))
+
+    def test_async_views(self):
+        """Test the async list and detail are the same."""
+        self.assertSameResponse(PRODUCTS_URL, urlconf='shop.tests.test_async')
+        self.assertSameResponse(detail_url(product_slug='shirt'), urlconf='shop.tests.test_async')
+
+    def test_missing_product(self):
+        """Test a missing product is still a 404."""
+        response = self.client.get(detail_url(product_slug='missing'))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_use_serializers(self):
+        """Test updates are validated and rendered by the serializers."""
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
+        self.client.force_authenticate(admin)
+
+        response = self.client.patch(detail_url(product_slug='shirt'), {'price': '15.00'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data, ReturnDict)
+        self.assertEqual(response.data['price'], '15.00')
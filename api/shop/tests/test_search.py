@@ -0,0 +1,108 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from unittest import skipUnless
+
+from shop import models
+from shop.tests.test_views import PRODUCTS_URL, create_category, create_product
+
+class ProductSearchTests(TestCase):
+    """
+    Test searching products.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        shirts = create_category(name='shirts')
+        shoes = create_category(name='shoes')
+        create_product(category=shirts, name='Linen shirt', slug='linen-shirt', description='Light summer fabric.')
+        create_product(category=shirts, name='Flannel shirt', slug='flannel-shirt', description='Warm winter fabric.')
+        create_product(category=shoes, name='Running shoe', slug='running-shoe', description='Light and fast.')
+
+    def search(self, text):
+        """Return the slugs of the products found for `text`."""
+        response = self.client.get(PRODUCTS_URL, {'search': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {product['slug'] for product in response.data['results']}
+
+    def test_search_by_name(self):
+        """Test products are found by a word of their name."""
+        self.assertEqual(self.search('linen'), {'linen-shirt'})
+
+    def test_search_by_description(self):
+        """Test products are found by a word of their description."""
+        self.assertEqual(self.search('summer'), {'linen-shirt'})
+
+    def test_search_by_category(self):
+        """Test products are found by their category name."""
+        self.assertEqual(self.search('shoes'), {'running-shoe'})
+
+    def test_search_prefix(self):
+        """Test words are matched as prefixes."""
+        self.assertEqual(self.search('flan'), {'flannel-shirt'})
+
+    def test_search_all_words(self):
+        """Test every word has to match."""
+        self.assertEqual(self.search('light shirt'), {'linen-shirt'})
+
+    def test_search_without_words(self):
+        """Test a search without any word returns nothing."""
+        self.assertEqual(self.search('!!'), set())
+
+    def test_search_follows_product_changes(self):
+        """Test the search sees renamed products."""
+        product = models.Product.objects.get(slug='running-shoe')
+        product.name = 'Trail shoe'
+        product.save()
+
+        self.assertEqual(self.search('trail'), {'running-shoe'})
+
+    def test_search_follows_category_changes(self):
+        """Test the search sees renamed categories."""
+        category = models.Category.objects.get(name='shoes')
+        category.name = 'sneakers'
+        category.save()
+
+        self.assertEqual(self.search('sneakers'), {'running-shoe'})
+
+    @skipUnless(connection.vendor == 'postgresql', 'Ranking needs PostgreSQL full-text search.')
+    def test_search_ranked(self):
+        """Test name matches rank above description matches."""
+        create_product(category=models.Category.objects.get(name='shoes'), name='Summer sandal', slug='summer-sandal')
+
+        response = self.client.get(PRODUCTS_URL, {'search': 'summer'})
+
+        self.assertEqual([product['slug'] for product in response.data['results']], ['summer-sandal', 'linen-shirt'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Ranking needs PostgreSQL full-text search.')
+    def test_search_pages(self):
+        """Test walking the pages of a ranked search returns every match once, in rank order."""
+        shirts = models.Category.objects.get(name='shirts')
+        for i in range(7):
+            create_product(category=shirts, name=f'Linen shirt {i}', slug=f'linen-shirt-{i}', description='Linen. ' * (i % 3))
+
+        slugs = []
+        url = PRODUCTS_URL + '?search=linen&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            slugs += [product['slug'] for product in response.data['results']]
+            url = response.data['next']
+            self.assertLessEqual(len(slugs), 8)
+
+        ranked = models.Product.objects.search('linen').order_by('-rank', 'name', '-id').values_list('slug', flat=True)
+        self.assertEqual(slugs, list(ranked))
+
+    @skipUnless(connection.vendor == 'postgresql', 'Search vectors are only stored on PostgreSQL.')
+    def test_search_vector_uses_index(self):
+        """Test the search can use the GIN index."""
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = models.Product.objects.search('shirt').explain()
+
+        self.assertIn('shop_product_search_vector_gin', plan)
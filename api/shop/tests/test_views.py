@@ -1,12 +1,18 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from decimal import Decimal
+from unittest.mock import patch
 
+from core.pagination import KeysetPagination
+from core.tests.utils import QueryCountMixin
 from shop import models, serializers
 
 CATEGORIES_URL = reverse('shop:category-list')
@@ -46,6 +52,7 @@ class PublicShopApiTests(TestCase):
     """
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_get_category_list(self):
@@ -59,7 +66,7 @@ class PublicShopApiTests(TestCase):
         serializer = serializers.CategorySerializer(categories, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(serializer.data, response.data)
+        self.assertEqual(serializer.data, response.data['results'])
 
     def test_get_product_list(self):
         """Test retrieving a list of products."""
@@ -72,7 +79,7 @@ class PublicShopApiTests(TestCase):
         serializer = serializers.ProductSerializer(products, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(serializer.data, response.data)
+        self.assertEqual(serializer.data, response.data['results'])
 
     def test_get_category_detail(self):
         """Test retrieving a single category."""
@@ -132,12 +139,125 @@ class PublicShopApiTests(TestCase):
         reponse = self.client.delete(detail_url(product_slug=product.slug))
         self.assertEqual(reponse.status_code, status.HTTP_401_UNAUTHORIZED)
 
+class PaginationApiTests(TestCase):
+    """
+    Test keyset pagination of the list endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = create_category(name='shirts')
+        for i in range(7):
+            create_product(category=category, name=f'shirt {i}', slug=f'shirt-{i}')
+
+    def test_product_list_pages_forward_and_back(self):
+        """Test following next and previous cursors walks the whole list in order."""
+        expected = list(models.Product.objects.values_list('slug', flat=True))
+
+        pages = []
+        url = f'{PRODUCTS_URL}?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([product['slug'] for product in response.data['results']])
+            url = response.data['next']
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([product['slug'] for product in response.data['results']], pages[1])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([product['slug'] for product in response.data['results']], pages[0])
+        self.assertIsNone(response.data['previous'])
+
+    def test_cursor_is_stable_after_insert(self):
+        """Test rows inserted before the cursor do not shift the next page."""
+        response = self.client.get(f'{PRODUCTS_URL}?page_size=3')
+        next_url = response.data['next']
+        create_product(category=models.Category.objects.get(), name='a shirt', slug='a-shirt')
+
+        response = self.client.get(next_url)
+
+        self.assertEqual([product['slug'] for product in response.data['results']], ['shirt-3', 'shirt-4', 'shirt-5'])
+
+    def test_page_size_is_capped(self):
+        """Test the requested page size cannot exceed the configured maximum."""
+        with patch.object(KeysetPagination, 'max_page_size', 2):
+            response = self.client.get(f'{PRODUCTS_URL}?page_size=100')
+
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns not found."""
+        response = self.client.get(f'{PRODUCTS_URL}?cursor=garbage')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_category_list_paginated(self):
+        """Test the category list is paginated as well."""
+        create_category(name='pants')
+
+        response = self.client.get(f'{CATEGORIES_URL}?page_size=1')
+
+        self.assertEqual([category['slug'] for category in response.data['results']], ['pants'])
+        self.assertIsNotNone(response.data['next'])
+
+class QueryCountApiTests(QueryCountMixin, TestCase):
+    """
+    Test the list endpoints do not issue a query per row.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def populate_products(self, size):
+        """Top the catalogue up to `size` products spread over several categories."""
+        for i in range(models.Product.objects.count(), size):
+            category, _ = models.Category.objects.get_or_create(name=f'category {i % 5}', slug=f'category-{i % 5}')
+            create_product(category=category, name=f'product {i}', slug=f'product-{i}')
+
+    def test_product_list_query_count(self):
+        """Test the product list costs the same queries whatever its size."""
+        # One aggregate for the ETag validators and one for the page itself.
+        self.assertConstantQueries(PRODUCTS_URL, self.populate_products, expected=2)
+
+    def test_category_list_query_count(self):
+        """Test the category list costs the same queries whatever its size."""
+        def populate(size):
+            for i in range(models.Category.objects.count(), size):
+                create_category(name=f'category {i}')
+
+        self.assertConstantQueries(CATEGORIES_URL, populate, expected=2)
+
+    def test_product_detail_query_count(self):
+        """Test the product detail fetches the category in the same query."""
+        self.populate_products(1)
+        product = models.Product.objects.get()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(detail_url(product_slug=product.slug))
+
+        self.assertEqual(response.data['category']['slug'], product.category.slug)
+
+    def test_product_list_skips_description(self):
+        """Test the product list does not load the description column."""
+        self.populate_products(1)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(PRODUCTS_URL)
+
+        self.assertNotIn('description', context.captured_queries[-1]['sql'])
+
 class AuthenticatedShopApiTests(TestCase):
     """
     Test authenticated API requests.
     """
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(email='user@example.com', first_name='John', last_name='Doe', password='test12345')
         self.client.force_authenticate(self.user)
@@ -185,6 +305,7 @@ class StaffShopApiTests(TestCase):
     """
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.admin = get_user_model().objects.create_superuser(email='admin@example.com', first_name='John', last_name='Doe', password='test12345')
         self.client.force_authenticate(self.admin)
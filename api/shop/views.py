@@ -1,23 +1,60 @@
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 
-from drf_spectacular.utils import extend_schema_view
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 
 from core import permissions
-from shop import serializers, models
+from core.async_views import AsyncReadMixin
+from core.authentication import CachedTokenAuthentication
+from core.cache import CachedResponseMixin
+from core.conditional import ConditionalGetMixin
+from core.pagination import KeysetPagination
+from core.replicas import ReplicaReadMixin
+from shop import bulk, filters, rows, serializers, models
+from shop.export import EXPORT_FORMATS, export_catalog
+from shop.jobs import enqueue_image_job
 
 @extend_schema_view()
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(ReplicaReadMixin, AsyncReadMixin, ConditionalGetMixin, CachedResponseMixin, ModelViewSet):
     """API view for managing products."""
     serializer_class = serializers.ProductDetailSerializer
     queryset = models.Product.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    filter_backends = [filters.ProductFilter, filters.ProductSearchFilter, filters.ProductOrderingFilter]
+    cache_dependencies = (models.Product, models.Category)
+    conditional_fields = ('updated', 'category__updated')
     lookup_field = 'slug'
 
+    def reads_rows(self):
+        """Whether the action renders `values()` rows with `shop.rows` rather than serializing instances."""
+        return (
+            settings.FAST_PRODUCT_READS
+            and self.action in ('list', 'retrieve')
+            and not getattr(self, 'swagger_fake_view', False)
+        )
+
+    def get_queryset(self):
+        """Return the queryset tuned for the request action."""
+        if self.reads_rows():
+            return rows.product_rows(self.queryset, detail=self.action == 'retrieve')
+
+        queryset = self.queryset.select_related('category')
+        if self.action == 'list':
+            # The list serializer does not render these columns.
+            return queryset.defer('description', 'created', 'updated')
+
+        return queryset
+
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'list':
@@ -27,22 +64,85 @@ class ProductViewSet(ModelViewSet):
 
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, or the row renderer for the read actions."""
+        if self.reads_rows():
+            return rows.ProductRows(*args, detail=self.action == 'retrieve', context=self.get_serializer_context(), **kwargs)
+
+        return super().get_serializer(*args, **kwargs)
+
+    @extend_schema(
+        request=serializers.ProductBulkSerializer,
+        responses={
+            200: serializers.ProductBulkResponseSerializer,
+            201: serializers.ProductBulkResponseSerializer,
+            400: serializers.ProductBulkResponseSerializer,
+        },
+    )
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """
+        Create (POST), update (PATCH) or delete (DELETE) products keyed by slug.
+        Either every row is applied or, if any is invalid, none is.
+        """
+        # Updates and deletions only require the slug of each row.
+        serializer = serializers.ProductBulkSerializer(data=request.data, partial=request.method != 'POST')
+        if not serializer.is_valid():
+            errors = serializer.errors.get('products')
+            if not isinstance(errors, list):
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            items = [data if isinstance(data, dict) else {} for data in request.data['products']]
+            return Response({'results': bulk.row_results(items, errors, 'skipped')}, status=status.HTTP_400_BAD_REQUEST)
+
+        operation = {'POST': bulk.create_products, 'PATCH': bulk.update_products, 'DELETE': bulk.delete_products}[request.method]
+        results, applied = operation(serializer.validated_data['products'])
+        if not applied:
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'results': results}, status=status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[OpenApiParameter('export_format', OpenApiTypes.STR, OpenApiParameter.PATH, enum=list(EXPORT_FORMATS))],
+        responses={(200, content_type.split(';')[0]): OpenApiTypes.BINARY for content_type, _ in EXPORT_FORMATS.values()},
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path=r'export/(?P<export_format>%s)' % '|'.join(EXPORT_FORMATS),
+        permission_classes=[IsAdminUser],
+        pagination_class=None,
+    )
+    def export(self, request, export_format=None):
+        """Stream the filtered catalogue as CSV or NDJSON to staff users."""
+        queryset = self.filter_queryset(self.get_queryset())
+        content_type, content = export_catalog(queryset, export_format)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="catalog.{export_format}"'
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
-    def upload_image(self, request, pk=None):
-        """Upload an image for the product."""
+    def upload_image(self, request, slug=None):
+        """
+        Upload an image for the product. The resized variants are generated
+        by the `process_images` worker, so the upload is only accepted here.
+        """
         product = self.get_object()
         serializer = self.get_serializer(product, data=request.data)
-        
+
         if serializer.is_valid():
-            serializer.save(product=product)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            with transaction.atomic():
+                serializer.save(image_variants={})
+                enqueue_image_job(product)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
         return Response(serializer.errors, status.HTTP_400_BAD_REQUEST)
 
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, ConditionalGetMixin, CachedResponseMixin, ModelViewSet):
     """API view for managing categories."""
     serializer_class = serializers.CategorySerializer
     queryset = models.Category.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    cache_dependencies = (models.Category,)
     lookup_field = 'slug'
\ No newline at end of file